@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2018 Fetch.AI Limited
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+
+"""
+Agent fleet benchmark
+~~~~~~~~~~~~~~~~~~~~~
+This script runs an :class:`~oef.fleet.AgentFleet` of idle agents against a minimal OEF Node emulator,
+started in a child process, which accepts every handshake and pings every agent periodically.
+It reports the connection throughput, the memory per agent, and the pongs sent during the run.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import struct
+import time
+import tracemalloc
+
+from oef.src.python.agents import OEFAgent
+from oef.src.python.fleet import AgentFleet
+from protocol.src.proto import agent_pb2
+
+
+def rss() -> int:
+    import resource
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * resource.getpagesize()
+
+
+async def _read(reader):
+    size = struct.unpack("I", await reader.readexactly(4))[0]
+    return await reader.readexactly(size)
+
+
+def _write(writer, msg):
+    data = msg.SerializeToString()
+    writer.write(struct.pack("I", len(data)) + data)
+
+
+def run_node(port, ping_interval: float, ready) -> None:
+    """A minimal OEF Node: it accepts every handshake, pings the agents, and counts the pongs."""
+    async def ping(writer):
+        answer_id = 0
+        while not writer.is_closing():
+            await asyncio.sleep(ping_interval)
+            answer_id += 1
+            msg = agent_pb2.Server.AgentMessage()
+            msg.answer_id = answer_id
+            msg.ping.dummy = 1
+            _write(writer, msg)
+
+    async def handle(reader, writer):
+        pinger = None
+        try:
+            await _read(reader)
+            phrase = agent_pb2.Server.Phrase()
+            phrase.phrase = "phrase"
+            _write(writer, phrase)
+            await _read(reader)
+            connected = agent_pb2.Server.Connected()
+            connected.status = True
+            _write(writer, connected)
+            pinger = asyncio.ensure_future(ping(writer))
+            while True:
+                await _read(reader)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            if pinger is not None:
+                pinger.cancel()
+            writer.close()
+
+    async def serve():
+        server = await asyncio.start_server(handle, "127.0.0.1", 0, backlog=4096)
+        port.value = server.sockets[0].getsockname()[1]
+        ready.set()
+        await asyncio.Event().wait()
+
+    asyncio.run(serve())
+
+
+def run(count: int, max_connecting: int, stagger: float, duration: float, ping_interval: float, trace: bool) -> None:
+    port = multiprocessing.Value("i", 0)
+    ready = multiprocessing.Event()
+    node = multiprocessing.Process(target=run_node, args=(port, ping_interval, ready), daemon=True)
+    node.start()
+    ready.wait()
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    if trace:
+        tracemalloc.start()
+    base = rss()
+    agents = [OEFAgent("agent{}".format(i).replace("0", "z").replace("l", "L"), "127.0.0.1", port.value, loop=loop)
+              for i in range(count)]
+    created = rss()
+    fleet = AgentFleet(agents, loop=loop, max_connecting=max_connecting, stagger=stagger)
+    start = time.perf_counter()
+    failed = loop.run_until_complete(fleet.async_start())
+    connect_time = time.perf_counter() - start
+    connected = rss()
+    loop.run_until_complete(asyncio.sleep(duration))
+    pongs = sum(agent._oef_proxy.outbound_stats.sent.total() for agent in agents if agent._oef_proxy.outbound_stats)
+    if trace:
+        snapshot = tracemalloc.take_snapshot()
+    loop.run_until_complete(fleet.async_stop())
+    node.terminate()
+
+    print("agents:               {} ({} failed)".format(count, len(failed)))
+    print("connect:              {:.2f} s ({:.0f} agents/s)".format(connect_time, count / connect_time))
+    print("memory per agent:     {:.0f} B created, {:.0f} B connected".format(
+        (created - base) / count, (connected - base) / count))
+    print("frames sent:          {} ({:.0f}/s)".format(pongs, pongs / duration))
+    print("fleet:                {}".format(fleet.stats))
+    if trace:
+        for stat in snapshot.statistics("lineno")[:15]:
+            print(stat)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark many agents running on one event loop.")
+    parser.add_argument("--agents", type=int, default=10000)
+    parser.add_argument("--max-connecting", type=int, default=64)
+    parser.add_argument("--stagger", type=float, default=0.0)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--ping-interval", type=float, default=1.0)
+    parser.add_argument("--trace", action="store_true", help="show the top allocation sites")
+    args = parser.parse_args()
+
+    run(args.agents, args.max_connecting, args.stagger, args.duration, args.ping_interval, args.trace)
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2018 Fetch.AI Limited
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+
+
+"""
+Parallel query evaluation benchmark
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+This script measures the throughput of :class:`~oef.parallel.ParallelQueryEvaluator` for an increasing
+number of worker processes, against a sequential loop over ``Query.check``.
+"""
+import argparse
+import random
+import time
+
+from oef.src.python.parallel import ColumnarDescriptions, ParallelQueryEvaluator
+from oef.src.python.query import Query, Constraint, Or, Eq, Lt, Range, Distance
+from oef.src.python.schema import Description
+from protocol.src.python.Wrappers import Location
+
+AUTHORS = ["Austen", "Borges", "Calvino", "Dickens", "Eco", "Flaubert", "Gogol", "Hugo"]
+
+
+def build_descriptions(n: int, rng: random.Random):
+    return [Description({"author": rng.choice(AUTHORS),
+                         "price": rng.randint(0, 1000),
+                         "rating": rng.random() * 5.0,
+                         "position": Location(rng.uniform(40.0, 50.0), rng.uniform(0.0, 10.0))})
+            for _ in range(n)]
+
+
+def build_queries(n: int, rng: random.Random):
+    return [Query([Or([Constraint("author", Eq(rng.choice(AUTHORS))), Constraint("rating", Lt(rng.random()))]),
+                   Constraint("price", Range((rng.randint(0, 500), rng.randint(500, 1000)))),
+                   Constraint("position", Distance(Location(45.0, 5.0), rng.uniform(100.0, 500.0)))])
+            for _ in range(n)]
+
+
+def run(descriptions: int, queries: int, workers, sequential: bool) -> None:
+    rng = random.Random(0)
+    data = build_descriptions(descriptions, rng)
+    query_list = build_queries(queries, rng)
+    pairs = descriptions * queries
+
+    print("{:>10} {:>12} {:>16}".format("workers", "time (s)", "pairs/s"))
+    if sequential:
+        start = time.perf_counter()
+        for query in query_list:
+            [i for i, d in enumerate(data) if query.check(d)]
+        elapsed = time.perf_counter() - start
+        print("{:>10} {:>12.3f} {:>16.0f}".format("check", elapsed, pairs / elapsed))
+
+    with ColumnarDescriptions(data) as columns:
+        for n in workers:
+            with ParallelQueryEvaluator(columns, query_list, max_workers=n) as evaluator:
+                evaluator.run()  # warm up the pool
+                start = time.perf_counter()
+                evaluator.run()
+                elapsed = time.perf_counter() - start
+            print("{:>10} {:>12.3f} {:>16.0f}".format(n, elapsed, pairs / elapsed))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the parallel evaluation of queries.")
+    parser.add_argument("--descriptions", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=10)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--sequential", action="store_true", help="Also time a loop over Query.check.")
+    args = parser.parse_args()
+
+    run(args.descriptions, args.queries, args.workers, args.sequential)
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2018 Fetch.AI Limited
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+
+"""
+Query encoding benchmark
+~~~~~~~~~~~~~~~~~~~~~~~~
+This script measures the time spent encoding deep ``And``/``Or``/``Not`` query trees into
+``ConstructQueryObjectRequest`` objects, and copying the underlying ``QueryBuildingBlocks`` trees.
+Every level of the generated tree is ``And([c, Or([c, Not(<next level>)])])``, so a tree of depth ``d``
+has ``3 * d`` branches and ``2 * d + 1`` leaves.
+"""
+import argparse
+import timeit
+
+from oef.src.python.query import Query, Constraint, And, Or, Not, Eq, Lt, ConstraintExpr
+
+
+def build_tree(depth: int) -> ConstraintExpr:
+    """Build a query tree of the given depth."""
+    expr = Constraint("price", Lt(float(depth)))
+    for level in range(depth):
+        expr = And([Constraint("level_{}".format(level), Eq(level)),
+                    Or([Constraint("name_{}".format(level), Eq("x" * level)), Not(expr)])])
+    return expr
+
+
+def run(depths, repeat: int) -> None:
+    print("{:>6} {:>16} {:>16} {:>16}".format("depth", "to_pb (us)", "copy (us)", "size (bytes)"))
+    for depth in depths:
+        query = Query([build_tree(depth)])
+        to_pb = min(timeit.repeat(query.to_pb, number=1, repeat=repeat))
+        copy = min(timeit.repeat(query.root.Copy, number=1, repeat=repeat))
+        size = len(query.to_pb().SerializeToString())
+        print("{:>6} {:>16.1f} {:>16.1f} {:>16}".format(depth, to_pb * 1e6, copy * 1e6, size))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the encoding of deep query trees.")
+    parser.add_argument("--depths", type=int, nargs="+", default=[1, 10, 50, 100, 200])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    run(args.depths, args.repeat)
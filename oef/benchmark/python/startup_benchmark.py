@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2018 Fetch.AI Limited
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+
+"""
+Agent startup benchmark
+~~~~~~~~~~~~~~~~~~~~~~~
+This script measures, in fresh interpreters, the time to import :mod:`oef.agents` and the resident memory
+it adds, and checks that the optional dependencies are not imported with it.
+It exits with status 1 if a budget is exceeded, so that it can run in CI.
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+"""modules that must only be imported when the feature that needs them is used"""
+LAZY_MODULES = ["graphviz", "colorlog", "http.server"]
+
+PROBE = """
+import json, sys, time
+
+def rss():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * {page_size}
+
+before = rss()
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"time": elapsed, "rss": rss() - before, "loaded": [m for m in {lazy} if m in sys.modules]}}))
+"""
+
+
+def measure(module: str, runs: int) -> dict:
+    import resource
+    probe = PROBE.format(module=module, lazy=LAZY_MODULES, page_size=resource.getpagesize())
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, "-c", probe], check=True, stdout=subprocess.PIPE).stdout
+        samples.append(json.loads(output.decode()))
+    return {
+        "time": statistics.median(s["time"] for s in samples),
+        "rss": statistics.median(s["rss"] for s in samples),
+        "loaded": sorted({m for s in samples for m in s["loaded"]}),
+    }
+
+
+def run(module: str, runs: int, time_budget: float, rss_budget: float) -> bool:
+    result = measure(module, runs)
+    print("{:>24} {:>12} {:>12}   {}".format("module", "import (ms)", "RSS (MiB)", "lazy modules loaded"))
+    print("{:>24} {:>12.1f} {:>12.1f}   {}".format(module, result["time"] * 1e3, result["rss"] / 2 ** 20,
+                                                  ", ".join(result["loaded"]) or "-"))
+    ok = True
+    if result["time"] * 1e3 > time_budget:
+        print("FAIL: import time {:.1f} ms > budget {:.1f} ms".format(result["time"] * 1e3, time_budget))
+        ok = False
+    if result["rss"] / 2 ** 20 > rss_budget:
+        print("FAIL: RSS {:.1f} MiB > budget {:.1f} MiB".format(result["rss"] / 2 ** 20, rss_budget))
+        ok = False
+    if result["loaded"]:
+        print("FAIL: imported eagerly: {}".format(", ".join(result["loaded"])))
+        ok = False
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the import time and memory of an agent process.")
+    parser.add_argument("--module", default="oef.src.python.agents")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--time-budget", type=float, default=100.0, help="median import time, in ms")
+    parser.add_argument("--rss-budget", type=float, default=18.0, help="median RSS added by the import, in MiB")
+    args = parser.parse_args()
+
+    sys.exit(0 if run(args.module, args.runs, args.time_budget, args.rss_budget) else 1)
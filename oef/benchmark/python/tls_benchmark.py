@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2018 Fetch.AI Limited
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+
+"""
+TLS connection benchmark
+~~~~~~~~~~~~~~~~~~~~~~~~
+This script connects :class:`~oef.proxy.OEFSecureNetworkProxy` instances, one after the other, to a local TLS
+server started in a child process, which answers the handshake of the secure proxies. It compares:
+
+- ``fresh``: a new SSL context for every connection, as before the contexts were cached;
+- ``cached``: the cached SSL context, with a full TLS handshake for every connection;
+- ``resumed``: the cached SSL context, resuming the TLS session of the previous connection.
+
+It reports the wall-clock and CPU time per connection, and the fraction of resumed sessions.
+Without ``--cert``, a self-signed certificate is generated with the ``openssl`` command.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import ssl
+import struct
+import subprocess
+import tempfile
+import time
+
+from oef.src.python.proxy import OEFSecureNetworkProxy, clear_ssl_contexts, ssl_context
+from protocol.src.proto import agent_pb2
+
+
+def run_node(cert: str, port, ready) -> None:
+    """A TLS server that accepts the handshake of every secure proxy."""
+    async def handle(reader, writer):
+        try:
+            size = struct.unpack("I", await reader.readexactly(4))[0]
+            await reader.readexactly(size)
+            data = agent_pb2.Server.Connected(status=True).SerializeToString()
+            writer.write(struct.pack("I", len(data)) + data)
+            await reader.read()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve():
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(cert)
+        server = await asyncio.start_server(handle, "127.0.0.1", 0, ssl=context)
+        port.value = server.sockets[0].getsockname()[1]
+        ready.set()
+        await asyncio.Event().wait()
+
+    asyncio.run(serve())
+
+
+def generate_cert(directory: str) -> str:
+    key, cert = os.path.join(directory, "key.pem"), os.path.join(directory, "cert.pem")
+    subprocess.run(["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-keyout", key, "-out", cert,
+                    "-days", "1", "-subj", "/CN=oef-benchmark"], check=True, capture_output=True)
+    path = os.path.join(directory, "agent.pem")
+    with open(path, "w") as f:
+        for part in (key, cert):
+            with open(part) as p:
+                f.write(p.read())
+    return path
+
+
+def measure(mode: str, cert: str, port: int, count: int):
+    loop = asyncio.new_event_loop()
+    clear_ssl_contexts()
+    resumed = 0
+    wall = cpu = 0.0
+    for _ in range(count):
+        if mode == "fresh":
+            clear_ssl_contexts()
+        elif mode == "cached":
+            ssl_context(cert, cert).sessions.clear()
+        proxy = OEFSecureNetworkProxy(cert, "127.0.0.1", cert, port, loop=loop)
+        start, start_cpu = time.perf_counter(), time.process_time()
+        loop.run_until_complete(proxy.connect())
+        wall += time.perf_counter() - start
+        cpu += time.process_time() - start_cpu
+        resumed += proxy.tls_session_reused
+        loop.run_until_complete(proxy.stop())
+    loop.close()
+    return wall / count, cpu / count, resumed / count
+
+
+def run(count: int, cert: str) -> None:
+    port = multiprocessing.Value("i", 0)
+    ready = multiprocessing.Event()
+    node = multiprocessing.Process(target=run_node, args=(cert, port, ready), daemon=True)
+    node.start()
+    ready.wait()
+    try:
+        print("{:10} {:>12} {:>12} {:>8}".format("mode", "wall (ms)", "cpu (ms)", "resumed"))
+        for mode in ("fresh", "cached", "resumed"):
+            wall, cpu, resumed = measure(mode, cert, port.value, count)
+            print("{:10} {:12.3f} {:12.3f} {:8.0%}".format(mode, wall * 1000, cpu * 1000, resumed))
+    finally:
+        node.terminate()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the connection of secure proxies.")
+    parser.add_argument("--connections", type=int, default=200)
+    parser.add_argument("--cert", help="PEM file with the private key and the certificate, for both sides")
+    args = parser.parse_args()
+
+    if args.cert is not None:
+        run(args.connections, args.cert)
+    else:
+        with tempfile.TemporaryDirectory() as directory:
+            run(args.connections, generate_cert(directory))
@@ -1,11 +1,42 @@
+import copy
+
 from utils.src.python.Logging import has_logger
 from protocol.src.proto import dap_interface_pb2
 from protocol.src.python import TypeHelpers
+from protocol.src.python import ProtoHelpers
+
+
+def _digraph(name):
+    """A new graphviz graph, or ``None`` if graphviz is not installed. It is imported on first use only."""
+    try:
+        from graphviz import Digraph
+    except ImportError:
+        return None
+    return Digraph(name)
+
+
+class Placeholder(object):
+    """
+    A named stand-in for a constraint value, filled in later by a prepared query.
+    """
+
+    def __init__(self, name, value_type):
+        self.name = name
+        self.value_type = value_type
+        self.type_string = ProtoHelpers.pythonTypeToTypeString(value_type)
+        if self.type_string is None:
+            raise ValueError("Invalid input value for type 'Placeholder': type {} not supported.".format(value_type))
 
-try:
-    from graphviz import Digraph
-except ImportError:
-    Digraph = None
+    def __repr__(self):
+        return "Placeholder({}, {})".format(self.name, self.value_type.__name__)
+
+    def __eq__(self, other):
+        if type(other) != Placeholder:
+            return False
+        return self.name == other.name and self.value_type == other.value_type
+
+    def __hash__(self):
+        return hash((self.name, self.value_type))
 
 
 class Branch(object):
@@ -27,7 +58,26 @@ class Branch(object):
         self.subnodes = []
 
     def Copy(self):
-        return Branch().fromProto(self.toProto())
+        # Structural copy; done with an explicit stack so that deep trees do not hit the recursion limit.
+        root = self._copyNode()
+        stack = [(self, root)]
+        while stack:
+            source, target = stack.pop()
+            for n in source.subnodes:
+                new_node = n._copyNode()
+                target.subnodes.append(new_node)
+                stack.append((n, new_node))
+        return root
+
+    def _copyNode(self):
+        new_branch = Branch(combiner=self.combiner)
+        new_branch.type = self.type
+        new_branch.name = self.name
+        new_branch.mementos = list(self.mementos)
+        new_branch.dap_names = set(self.dap_names) if self.dap_names is not None else None
+        new_branch.dap_field_candidates = dict(self.dap_field_candidates)
+        new_branch.leaves = [leaf.Copy() for leaf in self.leaves]
+        return new_branch
 
     def printable(self):
         tablenames = [
@@ -92,35 +142,36 @@ class Branch(object):
     def fromProto(self, pb):
         self.combiner = pb.operator
         self.dap_names = set(pb.dap_names)
-        if pb.HasField('node_name'):
+        if pb.node_name:
             self.name = pb.node_name
 
         self.leaves = [Leaf().fromProto(x) for x in pb.constraints]
         self.subnodes = [Branch().fromProto(x) for x in pb.children]
         return self
 
-    def toProto(self, dap_name=""):
-        pb = dap_interface_pb2.ConstructQueryObjectRequest()
+    def toProto(self, dap_name="", pb=None):
+        # Leaves and children are written straight into the repeated fields of the parent,
+        # so every node of the tree is encoded exactly once.
+        if pb is None:
+            pb = dap_interface_pb2.ConstructQueryObjectRequest()
         pb.operator = self.combiner
-        pb.dap_names.extend(list(self.dap_names))
+        if self.dap_names:
+            pb.dap_names.extend(self.dap_names)
         if self.name != None:
             pb.node_name = self.name
 
         for leaf in self.leaves:
-            new_leaf = pb.constraints.add()
-            new_leaf.CopyFrom(leaf.toProto(dap_name))
+            leaf.toProto(dap_name, pb.constraints.add())
 
         for child in self.subnodes:
-            new_child = pb.children.add()
-            new_child.CopyFrom(child.toProto(dap_name))
+            child.toProto(dap_name, pb.children.add())
 
         return pb
 
     def graphVisualization(self, g=None, node_id=1):
         if g is None:
-            if Digraph:
-                g = Digraph("Branch")
-            else:
+            g = _digraph("Branch")
+            if g is None:
                 return None
         g.node(f"node_{node_id}", self.combiner)
         children = []
@@ -168,20 +219,31 @@ class Leaf(object):
         self.name = "?"
         self.mementos = []
 
-    def toProto(self, dap_name):
-        pb = dap_interface_pb2.ConstructQueryConstraintObjectRequest()
-
-        v = TypeHelpers.encodeConstraintValue(self.query_field_value, self.query_field_type, self.log)
-
-        pb.query_field_value.CopyFrom(v)
-        pb.node_name = self.name
+    def Copy(self):
+        # A shallow copy keeps the logger of this leaf instead of creating a new one.
+        new_leaf = copy.copy(self)
+        new_leaf.dap_names = set(self.dap_names)
+        new_leaf.dap_field_candidates = dict(self.dap_field_candidates)
+        new_leaf.mementos = list(self.mementos)
+        return new_leaf
+
+    def toProto(self, dap_name, pb=None):
+        if pb is None:
+            pb = dap_interface_pb2.ConstructQueryConstraintObjectRequest()
+
+        if isinstance(self.query_field_value, Placeholder):
+            pb.query_field_value.typecode = self.query_field_type
+        else:
+            TypeHelpers.encodeConstraintValueInto(pb.query_field_value, self.query_field_value,
+                                                  self.query_field_type, self.log)
 
         pb.operator = self.operator
         pb.query_field_type = self.query_field_type
         pb.target_field_name = self.target_field_name
 
-        pb.target_field_type = self.dap_field_candidates.get(dap_name, {}).get('target_field_type', "")
-        pb.target_table_name = self.dap_field_candidates.get(dap_name, {}).get('target_table_name', "")
+        candidate = self.dap_field_candidates.get(dap_name, {})
+        pb.target_field_type = candidate.get('target_field_type', "")
+        pb.target_table_name = candidate.get('target_table_name', "")
 
         pb.dap_name = dap_name
 
@@ -197,7 +259,7 @@ class Leaf(object):
         self.target_field_type = pb.target_field_type
         self.target_table_name = pb.target_table_name
         self.dap_name = pb.dap_name
-        if pb.HasField('node_name'):
+        if pb.node_name:
             self.name = pb.node_name
         return self
 
@@ -214,9 +276,8 @@ class Leaf(object):
 
     def graphVisualization(self, g=None, node_id=1):
         if g is None:
-            if Digraph is None:
+            g = _digraph("Branch")
+            if g is None:
                 return
-            else:
-                g = Digraph("Branch")
         g.node(f"node_{node_id}", f"{self.target_field_name} {self.operator} {self.query_field_value}")
 
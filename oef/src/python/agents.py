@@ -28,14 +28,20 @@ import asyncio
 
 import logging
 from abc import ABC
-from typing import List, Optional
+from typing import List, Optional, Sequence, Union
 import re
 
 from oef.src.python.core import OEFProxy, AgentInterface
+from oef.src.python.failover import ENDPOINT, OEFMultiNodeProxy
 from oef.src.python.messages import OEFErrorOperation
+from oef.src.python.metrics import MetricsRegistry
 from oef.src.python.proxy import OEFNetworkProxy, OEFSecureNetworkProxy, PROPOSE_TYPES, CFP_TYPES, OEFConnectionError
 from oef.src.python.query import Query, SearchResultItem
+from oef.src.python.reconnect import ReconnectPolicy, ReconnectStats
+from oef.src.python.remote import RemoteCores
 from oef.src.python.schema import Description
+from oef.src.python.tracing import DialogueTracer
+from oef.src.python.watchdog import LoopWatchdog
 from utils.src.python import uri
 from protocol.src.proto import agent_pb2 as agent_pb2
 
@@ -83,15 +89,49 @@ class Agent(AgentInterface, ABC):
     def getErrorDetail(self, answer_id):
         return self._oef_proxy.getErrorDetail(answer_id)
 
+    def enable_metrics(self, registry: Optional[MetricsRegistry] = None) -> MetricsRegistry:
+        """Record metrics about the agent and its proxy. See :func:`~oef.core.OEFProxy.enable_metrics`."""
+        return self._oef_proxy.enable_metrics(registry)
+
+    @property
+    def metrics(self) -> Optional[MetricsRegistry]:
+        """The registry of the metrics, if they are enabled."""
+        return self._oef_proxy.metrics
+
+    def enable_tracing(self, tracer: Optional[DialogueTracer] = None) -> DialogueTracer:
+        """Trace the dialogues of the agent. See :func:`~oef.core.OEFProxy.enable_tracing`."""
+        return self._oef_proxy.enable_tracing(tracer)
+
+    @property
+    def tracer(self) -> Optional[DialogueTracer]:
+        """The tracer of the dialogues, if the tracing is enabled."""
+        return self._oef_proxy.tracer
+
+    def enable_remote_cores(self, manager: RemoteCores) -> None:
+        """
+        Send the messages to agents on other cores through these cores.
+        See :func:`~oef.proxy.OEFNetworkProxy.enable_remote_cores`. Only the network proxies support it.
+        """
+        self._oef_proxy.enable_remote_cores(manager, self)
+
+    def enable_reconnect(self, policy: Optional[ReconnectPolicy] = None) -> ReconnectStats:
+        """
+        Reconnect automatically when the connection drops. See :func:`~oef.proxy.OEFNetworkProxy.enable_reconnect`.
+        Only the network proxies support it.
+        """
+        return self._oef_proxy.enable_reconnect(policy)
+
     def call_later(self, seconds: float, function, *params):
         self._loop.call_later(seconds, function, *params)
 
-    def run(self) -> None:
+    def run(self, watchdog: Optional[LoopWatchdog] = None) -> None:
         """
         Run the agent synchronously. That is, until :func:`~oef.agents.Agent.stop` is not called.
+        :param watchdog: if given, it watches the event loop and the handlers while the agent runs.
+                       | See :mod:`~oef.watchdog`.
         :return: ``None``
         """
-        self._loop.run_until_complete(self.async_run())
+        self._loop.run_until_complete(self.async_run(watchdog))
 
     def sendPong(self, answer_id: int) -> None:
         reply = agent_pb2.Envelope()
@@ -99,20 +139,29 @@ class Agent(AgentInterface, ABC):
         reply.pong.dummy = 1
         self._oef_proxy._send(reply)
 
-    async def async_run(self) -> None:
+    async def async_run(self, watchdog: Optional[LoopWatchdog] = None) -> None:
         """
         Run the agent asynchronously.
+        :param watchdog: if given, it watches the event loop and the handlers while the agent runs.
+                       | See :mod:`~oef.watchdog`.
         :return: ``None``
         """
         if self._task:
             logger.warning("Agent {} already scheduled for running.".format(self.public_key))
             return
         self._oef_proxy._active_loop = True
+        if watchdog is not None:
+            watchdog.start(self._loop)
+            self._oef_proxy._watchdog = watchdog
         try:
             self._task = asyncio.ensure_future(self._oef_proxy.loop(self), loop=self._loop)
             await self._task
         except asyncio.CancelledError:
             pass
+        finally:
+            if watchdog is not None:
+                self._oef_proxy._watchdog = None
+                watchdog.stop()
 
     def halt_loop(self):
         self._loop.stop()
@@ -146,10 +195,10 @@ class Agent(AgentInterface, ABC):
         The asynchronous counterpart of :func:`~oef.agents.Agent.connect`.
         :return: True if the connection has been established successfully, False otherwise.
         """
-        logger.debug("{}: Connecting...".format(self.public_key))
+        logger.debug("%s: Connecting...", self.public_key)
         status = await self._oef_proxy.connect()
         if status:
-            logger.debug("{}: Connection established.".format(self.public_key))
+            logger.debug("%s: Connection established.", self.public_key)
         else:
             #TODO fix this
             raise OEFConnectionError("Public key already in use.")
@@ -170,105 +219,105 @@ class Agent(AgentInterface, ABC):
         if self._oef_proxy.is_connected():
             await self._oef_proxy.stop()
 
-    def register_agent(self, msg_id: int, agent_description: Description) -> None:
+    def register_agent(self, msg_id: int, agent_description: Description) -> Optional[asyncio.Future]:
         """Register an agent. See :func:`~oef.core.OEFCoreInterface.register_agent`."""
-        self._oef_proxy.register_agent(msg_id, agent_description)
+        return self._oef_proxy.register_agent(msg_id, agent_description)
 
-    def unregister_agent(self, msg_id: int) -> None:
+    def unregister_agent(self, msg_id: int) -> Optional[asyncio.Future]:
         """Unregister an agent. See :func:`~oef.core.OEFCoreInterface.unregister_agent`."""
-        self._oef_proxy.unregister_agent(msg_id)
+        return self._oef_proxy.unregister_agent(msg_id)
 
-    def register_service(self, msg_id: int, service_description: Description, service_id: str = "") -> None:
+    def register_service(self, msg_id: int, service_description: Description, service_id: str = "") -> Optional[asyncio.Future]:
         """Unregister a service. See :func:`~oef.core.OEFCoreInterface.register_service`."""
-        self._oef_proxy.register_service(msg_id, service_description, service_id)
+        return self._oef_proxy.register_service(msg_id, service_description, service_id)
 
-    def unregister_service(self, msg_id: int, service_description: Description, service_id: str = "") -> None:
+    def unregister_service(self, msg_id: int, service_description: Description, service_id: str = "") -> Optional[asyncio.Future]:
         """Unregister a service. See :func:`~oef.core.OEFCoreInterface.unregister_service`."""
-        self._oef_proxy.unregister_service(msg_id, service_description, service_id)
+        return self._oef_proxy.unregister_service(msg_id, service_description, service_id)
 
-    def search_agents(self, search_id: int, query: Query) -> None:
+    def search_agents(self, search_id: int, query: Query) -> Optional[asyncio.Future]:
         """Search agents. See :func:`~oef.core.OEFCoreInterface.search_agents`."""
-        self._oef_proxy.search_agents(search_id, query)
+        return self._oef_proxy.search_agents(search_id, query)
 
-    def search_services(self, search_id: int, query: Query) -> None:
+    def search_services(self, search_id: int, query: Query) -> Optional[asyncio.Future]:
         """Search services. See :func:`~oef.core.OEFCoreInterface.search_services`."""
-        self._oef_proxy.search_services(search_id, query)
+        return self._oef_proxy.search_services(search_id, query)
 
-    def search_services_wide(self, search_id: int, query: Query) -> None:
+    def search_services_wide(self, search_id: int, query: Query) -> Optional[asyncio.Future]:
         """Search services widely. See :func:`~oef.core.OEFCoreInterface.search_services_wide`."""
-        self._oef_proxy.search_services_wide(search_id, query)
+        return self._oef_proxy.search_services_wide(search_id, query)
 
-    def send_message(self, msg_id: int, dialogue_id: int, destination: str, msg: bytes, context=uri.Context()) -> None:
+    def send_message(self, msg_id: int, dialogue_id: int, destination: str, msg: bytes, context: Optional[uri.Context] = None) -> Optional[asyncio.Future]:
         """Send a simple message. See :func:`~oef.core.OEFCoreInterface.send_message`."""
-        logger.debug("Agent {}: msg_id={}, dialogue_id={}, destination={}, msg={}"
-                     .format(self.public_key, msg_id, dialogue_id, destination, msg))
-        self._oef_proxy.send_message(msg_id, dialogue_id, destination, msg, context)
+        logger.debug("Agent %s: msg_id=%s, dialogue_id=%s, destination=%s, msg=%s",
+                     self.public_key, msg_id, dialogue_id, destination, msg)
+        return self._oef_proxy.send_message(msg_id, dialogue_id, destination, msg, context)
 
-    def send_cfp(self, msg_id: int, dialogue_id: int, destination: str, target: int, query: CFP_TYPES, context=uri.Context()) -> None:
+    def send_cfp(self, msg_id: int, dialogue_id: int, destination: str, target: int, query: CFP_TYPES, context: Optional[uri.Context] = None) -> Optional[asyncio.Future]:
         """Send a CFP. See :func:`~oef.core.OEFCoreInterface.send_cfp`."""
-        logger.debug("Agent {}: msg_id={}, dialogue_id={}, destination={}, target={}, query={}"
-                     .format(self.public_key, dialogue_id, destination, query, msg_id, target))
-        self._oef_proxy.send_cfp(msg_id, dialogue_id, destination, target, query, context)
+        logger.debug("Agent %s: msg_id=%s, dialogue_id=%s, destination=%s, target=%s, query=%s",
+                     self.public_key, msg_id, dialogue_id, destination, target, query)
+        return self._oef_proxy.send_cfp(msg_id, dialogue_id, destination, target, query, context)
 
     def send_propose(self, msg_id: int, dialogue_id: int, destination: str, target: int,
-                     proposals: PROPOSE_TYPES, context=uri.Context()) -> None:
+                     proposals: PROPOSE_TYPES, context: Optional[uri.Context] = None) -> Optional[asyncio.Future]:
         """Send a Propose. See :func:`~oef.core.OEFCoreInterface.send_propose`."""
-        logger.debug("Agent {}: msg_id={}, dialogue_id={}, destination={}, target={}, proposals={}"
-                     .format(self.public_key, msg_id, dialogue_id, destination, target, proposals))
-        self._oef_proxy.send_propose(msg_id, dialogue_id, destination, target, proposals, context)
+        logger.debug("Agent %s: msg_id=%s, dialogue_id=%s, destination=%s, target=%s, proposals=%s",
+                     self.public_key, msg_id, dialogue_id, destination, target, proposals)
+        return self._oef_proxy.send_propose(msg_id, dialogue_id, destination, target, proposals, context)
 
-    def send_accept(self, msg_id: int, dialogue_id: int, destination: str, target: int, context=uri.Context()) -> None:
+    def send_accept(self, msg_id: int, dialogue_id: int, destination: str, target: int, context: Optional[uri.Context] = None) -> Optional[asyncio.Future]:
         """Send an Accept. See :func:`~oef.core.OEFCoreInterface.send_accept`."""
-        logger.debug("Agent {}: dialogue_id={}, destination={}, msg_id={}, target={}"
-                     .format(self.public_key, msg_id, dialogue_id, destination, target))
-        self._oef_proxy.send_accept(msg_id, dialogue_id, destination, target, context)
+        logger.debug("Agent %s: msg_id=%s, dialogue_id=%s, destination=%s, target=%s",
+                     self.public_key, msg_id, dialogue_id, destination, target)
+        return self._oef_proxy.send_accept(msg_id, dialogue_id, destination, target, context)
 
-    def send_decline(self, msg_id: int, dialogue_id: int, destination: str, target: int, context=uri.Context()) -> None:
+    def send_decline(self, msg_id: int, dialogue_id: int, destination: str, target: int, context: Optional[uri.Context] = None) -> Optional[asyncio.Future]:
         """Send a Decline. See :func:`~oef.core.OEFCoreInterface.send_decline`."""
-        logger.debug("Agent {}: dialogue_id={}, destination={}, msg_id={}, target={}"
-                     .format(self.public_key, msg_id, dialogue_id, destination, target))
-        self._oef_proxy.send_decline(msg_id, dialogue_id, destination, target, context)
+        logger.debug("Agent %s: msg_id=%s, dialogue_id=%s, destination=%s, target=%s",
+                     self.public_key, msg_id, dialogue_id, destination, target)
+        return self._oef_proxy.send_decline(msg_id, dialogue_id, destination, target, context)
 
     def on_message(self, msg_id: int, dialogue_id: int, origin: str, content: bytes):
-        logger.debug("on_message: msg_id={}, dialogue_id={}, origin={}, content={}"
-                     .format(msg_id, dialogue_id, origin, content))
+        logger.debug("on_message: msg_id=%s, dialogue_id=%s, origin=%s, content=%s",
+                     msg_id, dialogue_id, origin, content)
         _warning_not_implemented_method(self.on_message.__name__)
 
     def on_cfp(self, msg_id: int, dialogue_id: int, origin: str, target: int, query: CFP_TYPES):
-        logger.debug("on_cfp: msg_id={}, dialogue_id={}, origin={}, target={}, query={}"
-                     .format(msg_id, dialogue_id, origin, target, query))
+        logger.debug("on_cfp: msg_id=%s, dialogue_id=%s, origin=%s, target=%s, query=%s",
+                     msg_id, dialogue_id, origin, target, query)
         _warning_not_implemented_method(self.on_cfp.__name__)
 
     def on_propose(self, msg_id: int, dialogue_id: int, origin: str, target: int, proposals: PROPOSE_TYPES):
-        logger.debug("on_propose: msg_id={}, dialogue_id={}, origin={}, target={}, proposals={}"
-                     .format(msg_id, dialogue_id, origin, target, proposals))
+        logger.debug("on_propose: msg_id=%s, dialogue_id=%s, origin=%s, target=%s, proposals=%s",
+                     msg_id, dialogue_id, origin, target, proposals)
         _warning_not_implemented_method(self.on_propose.__name__)
 
     def on_accept(self, msg_id: int, dialogue_id: int, origin: str, target: int):
-        logger.debug("on_accept: msg_id={}, dialogue_id={}, origin={}, target={}"
-                     .format(msg_id, dialogue_id, origin, target))
+        logger.debug("on_accept: msg_id=%s, dialogue_id=%s, origin=%s, target=%s",
+                     msg_id, dialogue_id, origin, target)
         _warning_not_implemented_method(self.on_accept.__name__)
 
     def on_decline(self, msg_id: int, dialogue_id: int, origin: str, target: int):
-        logger.debug("on_accept: msg_id={}, dialogue_id={}, origin={}, target={}"
-                     .format(msg_id, dialogue_id, origin, target))
+        logger.debug("on_decline: msg_id=%s, dialogue_id=%s, origin=%s, target=%s",
+                     msg_id, dialogue_id, origin, target)
         _warning_not_implemented_method(self.on_decline.__name__)
 
     def on_oef_error(self, answer_id: int, operation: OEFErrorOperation):
-        logger.debug("on_oef_error: answer_id={}, operation={}".format(answer_id, operation))
+        logger.debug("on_oef_error: answer_id=%s, operation=%s", answer_id, operation)
         _warning_not_implemented_method(self.on_oef_error.__name__)
 
     def on_dialogue_error(self, answer_id: int, dialogue_id: int, origin: str):
-        logger.debug("on_dialogue_error: answer_id={}, dialogue_id={}, origin={}"
-                     .format(answer_id, dialogue_id, origin))
+        logger.debug("on_dialogue_error: answer_id=%s, dialogue_id=%s, origin=%s",
+                     answer_id, dialogue_id, origin)
         _warning_not_implemented_method(self.on_dialogue_error.__name__)
 
     def on_search_result(self, search_id: int, agents: List[str]):
-        logger.debug("on_search_result: search_id={}, agents={}".format(search_id, agents))
+        logger.debug("on_search_result: search_id=%s, agents=%s", search_id, agents)
         _warning_not_implemented_method(self.on_search_result.__name__)
 
     def on_search_result_wide(self, search_id: int, agents: List[SearchResultItem]):
-        logger.debug("on_search_result_wide: search_id={}, agents={}".format(search_id, agents))
+        logger.debug("on_search_result_wide: search_id=%s, agents=%s", search_id, agents)
         _warning_not_implemented_method(self.on_search_result_wide.__name__)
 
 
@@ -282,20 +331,29 @@ class OEFAgent(Agent):
     It provides a nicer constructor that does not require to instantiate :class:`~oef.proxy.OEFLocalProxy` explicitly.
     """
 
-    def __init__(self, public_key: str, oef_addr: str, oef_port: int = 3333,
-                 loop: Optional[asyncio.AbstractEventLoop] = None):
+    def __init__(self, public_key: str, oef_addr: Union[str, Sequence[ENDPOINT]], oef_port: int = 3333,
+                 loop: Optional[asyncio.AbstractEventLoop] = None, heartbeat_timeout: Optional[float] = None):
         """
         Initialize an OEF network agent.
         :param public_key: the public key (identifier) of the agent
-        :param oef_addr: the IP address of the OEF Node.
-        :param oef_port: the port for the connection.
+        :param oef_addr: the IP address of the OEF Node, or the address and port of several OEF Nodes: the agent then
+                       | connects to the fastest one, and fails over to another one when it drops
+                       | (see :class:`~oef.failover.OEFMultiNodeProxy`).
+        :param oef_port: the port for the connection, with a single OEF Node.
         :param loop: the event loop.
+        :param heartbeat_timeout: with several OEF Nodes, the time (in seconds) without any message from the
+                                | current node after which the agent fails over.
         """
         if not self.validate_pubkey(public_key):
             raise InvalidPublicKeyException("Public key contains invalid characters! Only base58 characters supported!")
-        self._oef_addr = oef_addr
-        self._oef_port = oef_port
-        super().__init__(OEFNetworkProxy(public_key, str(self._oef_addr), self._oef_port, loop=loop))
+        if isinstance(oef_addr, str):
+            self._oef_addr = oef_addr
+            self._oef_port = oef_port
+            proxy = OEFNetworkProxy(public_key, str(self._oef_addr), self._oef_port, loop=loop)
+        else:
+            proxy = OEFMultiNodeProxy(public_key, oef_addr, loop=loop, heartbeat_timeout=heartbeat_timeout)
+            self._oef_addr, self._oef_port = proxy.endpoints[0]
+        super().__init__(proxy)
 
     def validate_pubkey(self, public_key: str):
         """
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2018 Fetch.AI Limited
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+
+"""
+oef.bulk
+~~~~~~~~
+This module connects many proxies to their OEF Nodes at once.
+
+The handshake of :func:`~oef.proxy.OEFNetworkProxy.connect` takes a TCP connection and two round trips.
+:func:`~oef.bulk.bulk_connect` runs many handshakes concurrently, under a cap and a timeout per handshake,
+and resolves the address of every node only once, instead of once per proxy.
+"""
+
+import asyncio
+import logging
+import socket
+import struct
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from oef.src.python.proxy import OEFConnectionError, OEFNetworkProxy
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_HANDSHAKES = 64
+DEFAULT_HANDSHAKE_TIMEOUT = 10.0
+
+
+class ConnectOutcome:
+    """The outcome of the connection of a proxy by :func:`~oef.bulk.bulk_connect`."""
+
+    __slots__ = ("proxy", "connected", "error", "elapsed")
+
+    def __init__(self, proxy: OEFNetworkProxy, connected: bool, error: Optional[BaseException],
+                 elapsed: float) -> None:
+        """
+        :param proxy: the proxy.
+        :param connected: whether the proxy is connected.
+        :param error: why the proxy is not connected, if it is not.
+        :param elapsed: the time (in seconds) of the connection, handshake included.
+        """
+        self.proxy = proxy
+        self.connected = connected
+        self.error = error
+        self.elapsed = elapsed
+
+    @property
+    def public_key(self) -> str:
+        return self.proxy.public_key
+
+    def __repr__(self):
+        return "ConnectOutcome({}, connected={}, error={!r}, elapsed={:.6f})" \
+            .format(self.public_key, self.connected, self.error, self.elapsed)
+
+
+async def resolve_addresses(proxies: Iterable[OEFNetworkProxy],
+                            loop: Optional[asyncio.AbstractEventLoop] = None) -> Dict[OEFNetworkProxy, OSError]:
+    """
+    Resolve the address of the OEF Node of each proxy, once per distinct node, and make the proxies connect
+    to the resolved address from now on.
+
+    :param proxies: the proxies.
+    :param loop: the event loop.
+    :return: the proxies whose node could not be resolved, with the error.
+    """
+    loop = loop if loop is not None else asyncio.get_event_loop()
+    by_node = {}  # type: Dict[Tuple[str, int], List[OEFNetworkProxy]]
+    for proxy in proxies:
+        by_node.setdefault((proxy.oef_addr, int(proxy.port)), []).append(proxy)
+    nodes = list(by_node)
+    infos = await asyncio.gather(*(loop.getaddrinfo(host, port, type=socket.SOCK_STREAM) for host, port in nodes),
+                                 return_exceptions=True)
+    failed = {}
+    for node, info in zip(nodes, infos):
+        if isinstance(info, BaseException):
+            if not isinstance(info, OSError):
+                raise info
+            logger.warning("Could not resolve the OEF Node {}:{}: {}".format(node[0], node[1], info))
+            failed.update((proxy, info) for proxy in by_node[node])
+            continue
+        address = info[0][4][0]
+        for proxy in by_node[node]:
+            proxy._resolved_addr = address
+    return failed
+
+
+async def _connect(proxy: OEFNetworkProxy, slots: asyncio.Semaphore, timeout: float) -> ConnectOutcome:
+    async with slots:
+        start = time.monotonic()
+        error = None
+        try:
+            connected = await asyncio.wait_for(proxy.connect(), timeout)
+            if not connected:
+                error = OEFConnectionError("Public key already in use.")
+        except (OSError, asyncio.IncompleteReadError, struct.error, asyncio.TimeoutError) as e:
+            # IncompleteReadError means that the node closed the connection during the handshake
+            connected = False
+            error = e
+        if not connected:
+            proxy._close_connection()
+        return ConnectOutcome(proxy, connected, error, time.monotonic() - start)
+
+
+async def bulk_connect(proxies: Iterable[OEFNetworkProxy], max_handshakes: int = DEFAULT_MAX_HANDSHAKES,
+                       timeout: float = DEFAULT_HANDSHAKE_TIMEOUT,
+                       loop: Optional[asyncio.AbstractEventLoop] = None) -> List[ConnectOutcome]:
+    """
+    Connect proxies concurrently. A failed connection does not stop the others.
+
+    :param proxies: the proxies. They must run on the same event loop.
+    :param max_handshakes: the maximum number of connections (TCP and handshake) in progress.
+    :param timeout: the maximum time (in seconds) of each connection, not including the wait for a slot.
+    :param loop: the event loop.
+    :return: the outcome of every connection, in the order of the proxies.
+    :raises ValueError: if ``max_handshakes`` or ``timeout`` is not positive.
+    """
+    if max_handshakes <= 0 or timeout <= 0:
+        raise ValueError("Invalid input value for 'bulk_connect': max_handshakes and timeout must be positive.")
+    proxies = list(proxies)
+    failed = await resolve_addresses(proxies, loop)
+    slots = asyncio.Semaphore(max_handshakes)
+
+    async def connect(proxy):
+        error = failed.get(proxy)
+        if error is not None:
+            return ConnectOutcome(proxy, False, error, 0.0)
+        return await _connect(proxy, slots, timeout)
+
+    return list(await asyncio.gather(*(connect(proxy) for proxy in proxies)))
@@ -27,13 +27,21 @@ The core module that contains the main abstraction of the SDK.
 import asyncio
 import logging
 import struct
+import time
 from abc import ABC, abstractmethod
-from typing import List, Optional
+from inspect import isawaitable
+from typing import Callable, Dict, Iterable, List, Optional, Union
 
 from protocol.src.proto import agent_pb2 as agent_pb2
+from oef.src.python.dispatch import DispatchTable, PayloadHandler, payload_case
+from oef.src.python.inbound import DEFAULT_INBOUND_CAPACITY, FairInboundQueue, InboundQueue, InboundStats, \
+    OverflowPolicy
+from oef.src.python.metrics import MetricsRegistry, ProxyMetrics
 from oef.src.python.messages import CFP_TYPES, PROPOSE_TYPES, OEFErrorOperation
 from oef.src.python.query import Query, SearchResultItem
 from oef.src.python.schema import Description
+from oef.src.python import tracing
+from oef.src.python.tracing import DialogueTracer
 from utils.src.python import uri
 
 logger = logging.getLogger(__name__)
@@ -126,7 +134,8 @@ class OEFCoreInterface(ABC):
         """
 
     @abstractmethod
-    def send_message(self, msg_id: int, dialogue_id: int, destination: str, msg: bytes) -> None:
+    def send_message(self, msg_id: int, dialogue_id: int, destination: str, msg: bytes,
+                     context: Optional[uri.Context] = None) -> None:
         """
         Send a simple message.
         :param msg_id: the identifier of the message.
@@ -138,7 +147,7 @@ class OEFCoreInterface(ABC):
         """
 
     @abstractmethod
-    def send_cfp(self, msg_id: int, dialogue_id: int, destination: str, target: int, query: CFP_TYPES, context: uri.Context) -> None:
+    def send_cfp(self, msg_id: int, dialogue_id: int, destination: str, target: int, query: CFP_TYPES, context: Optional[uri.Context] = None) -> None:
         """
         Send a Call-For-Proposals.
         :param msg_id: the message identifier for the dialogue.
@@ -152,7 +161,7 @@ class OEFCoreInterface(ABC):
 
     @abstractmethod
     def send_propose(self, msg_id: int, dialogue_id: int, destination: str, target: int,
-                     proposals: PROPOSE_TYPES, context: uri.Context) -> None:
+                     proposals: PROPOSE_TYPES, context: Optional[uri.Context] = None) -> None:
         """
         Send a Propose.
         :param msg_id: the message identifier for the dialogue.
@@ -165,7 +174,7 @@ class OEFCoreInterface(ABC):
         """
 
     @abstractmethod
-    def send_accept(self, msg_id: int, dialogue_id: int, destination: str, target: int, context: uri.Context) -> None:
+    def send_accept(self, msg_id: int, dialogue_id: int, destination: str, target: int, context: Optional[uri.Context] = None) -> None:
         """
         Send an Accept.
         :param msg_id: the message identifier for the dialogue.
@@ -177,7 +186,7 @@ class OEFCoreInterface(ABC):
         """
 
     @abstractmethod
-    def send_decline(self, msg_id: int, dialogue_id: int, destination: str, target: int, context: uri.Context) -> None:
+    def send_decline(self, msg_id: int, dialogue_id: int, destination: str, target: int, context: Optional[uri.Context] = None) -> None:
         """
         Send a Decline.
         :param msg_id: the message identifier for the dialogue.
@@ -394,6 +403,25 @@ class AgentInterface(DialogueInterface, ConnectionInterface, ABC):
         pass
 
 
+"""the default asynchronous handlers, which only call their synchronous version"""
+_DEFAULT_ASYNC_HANDLERS = {function for interface in (DialogueInterface, ConnectionInterface)
+                           for name, function in vars(interface).items() if name.startswith("async_on_")}
+
+
+def _resolve_handler(agent: AgentInterface, handler: Union[str, Callable]) -> Callable:
+    """
+    Find the function to call for a handler of the dispatch table.
+    The ``async_`` version of a method is used only if the agent overrides it,
+    so that plain handlers are called directly, without creating a coroutine.
+    """
+    if callable(handler):
+        return handler
+    async_method = getattr(type(agent), "async_" + handler, None)
+    if async_method is not None and async_method not in _DEFAULT_ASYNC_HANDLERS:
+        return getattr(agent, "async_" + handler)
+    return getattr(agent, handler)
+
+
 class OEFProxy(OEFCoreInterface, ABC):
     """Abstract definition of an OEF Proxy."""
 
@@ -403,6 +431,15 @@ class OEFProxy(OEFCoreInterface, ABC):
         self._active_loop = True
         self._context_store = {}
         self._error_details = {}
+        self._dispatch = DispatchTable()
+        self._resolved_handlers = {}
+        self._inbound_config = {}
+        self._fair_config = None
+        self._inbound = None
+        self._metrics = None
+        self._tracer = None
+        self._watchdog = None
+        self._session = None
 
     @property
     def public_key(self) -> str:
@@ -417,11 +454,31 @@ class OEFProxy(OEFCoreInterface, ABC):
         """
 
     def getContext(self, message_id: int, dialogue_id: int, origin: str):
-        return self._context_store.get("{}:{}:{}".format(message_id, dialogue_id, origin), uri.Context())
+        record = self._context_store.get((message_id, dialogue_id, origin))
+        if record is None:
+            return uri.Context()
+        return record.getContext()
 
     def getErrorDetail(self, answer_id):
         return self._error_details.get(answer_id, {})
 
+    def register_payload_handler(self, case: str, handler: PayloadHandler) -> None:
+        """
+        Register the handler of a payload case of the messages from the OEF Node.
+        See :class:`~oef.dispatch.DispatchTable`.
+
+        :param case: the payload case, as returned by :func:`~oef.dispatch.payload_case`.
+        :param handler: the handler.
+        :return: ``None``
+        """
+        self._dispatch.register(case, handler)
+        self._resolved_handlers.clear()
+
+    @property
+    def unknown_payloads(self) -> Dict[str, int]:
+        """The number of received messages with no handler, by payload case."""
+        return dict(self._dispatch.unknown_cases)
+
     @abstractmethod
     def is_connected(self) -> bool:
         """
@@ -429,94 +486,196 @@ class OEFProxy(OEFCoreInterface, ABC):
         :return: ``True`` if the proxy is connected, ``False`` otherwise.
         """
 
-    async def loop(self, agent: AgentInterface) -> None:  # noqa: C901
+    def configure_inbound_queue(self, capacity: int = DEFAULT_INBOUND_CAPACITY,
+                                policy: OverflowPolicy = OverflowPolicy.BLOCK,
+                                reject_cases: Optional[Iterable[str]] = None) -> None:
+        """
+        Configure the queue between the reading of the messages and their dispatch to the agent.
+        It takes effect at the next call of :func:`~oef.core.OEFProxy.loop`.
+        See :class:`~oef.inbound.InboundQueue` for the parameters.
+        """
+        self._inbound_config = dict(capacity=capacity, policy=policy, reject_cases=reject_cases)
+
+    def configure_fair_scheduling(self, default_weight: int = 1, weights: Optional[Dict[str, int]] = None,
+                                  default_limit: Optional[int] = None,
+                                  limits: Optional[Dict[str, int]] = None) -> None:
+        """
+        Share the agent fairly between the agents that send it messages, instead of handling messages
+        in arrival order. Search results and errors are handled first.
+        It takes effect at the next call of :func:`~oef.core.OEFProxy.loop`.
+        See :class:`~oef.inbound.FairInboundQueue` for the parameters.
+        """
+        self._fair_config = dict(default_weight=default_weight, weights=weights,
+                                 default_limit=default_limit, limits=limits)
+
+    def enable_metrics(self, registry: Optional[MetricsRegistry] = None) -> MetricsRegistry:
+        """
+        Record metrics about the messages exchanged with the OEF Node and the handlers of the agent.
+        See :mod:`~oef.metrics`.
+
+        :param registry: the registry of the metrics. By default, a new one.
+        :return: the registry.
+        """
+        registry = registry if registry is not None else MetricsRegistry()
+        self._metrics = ProxyMetrics(registry)
+        registry.gauge("oef_stored_contexts", "Contexts of the messages being dispatched.",
+                       function=lambda: len(self._context_store))
+        registry.gauge("oef_inbound_depth", "Received messages waiting to be dispatched.",
+                       function=lambda: self.inbound_depth)
+        return registry
+
+    def disable_metrics(self) -> None:
+        """Stop recording metrics."""
+        self._metrics = None
+
+    @property
+    def metrics(self) -> Optional[MetricsRegistry]:
+        """The registry of the metrics, if they are enabled."""
+        return self._metrics.registry if self._metrics is not None else None
+
+    def enable_tracing(self, tracer: Optional[DialogueTracer] = None) -> DialogueTracer:
+        """
+        Trace the dialogues with other agents: the messages sent and received are correlated by counterparty
+        and dialogue id. See :mod:`~oef.tracing`.
+
+        :param tracer: the tracer. By default, a new one that traces all the dialogues and exports nothing.
+        :return: the tracer, e.g. to get the latency percentiles per counterparty.
+        """
+        self._tracer = tracer if tracer is not None else DialogueTracer()
+        return self._tracer
+
+    def disable_tracing(self) -> None:
+        """Stop tracing the dialogues."""
+        self._tracer = None
+
+    @property
+    def tracer(self) -> Optional[DialogueTracer]:
+        """The tracer of the dialogues, if the tracing is enabled."""
+        return self._tracer
+
+    @property
+    def inbound_stats(self) -> Optional[InboundStats]:
+        """The statistics of the inbound queue of the current (or last) loop, if any."""
+        return self._inbound.stats if self._inbound is not None else None
+
+    @property
+    def inbound_depth(self) -> int:
+        """The number of received messages waiting to be dispatched."""
+        return self._inbound.depth if self._inbound is not None else 0
+
+    async def _recover(self) -> bool:
+        """
+        Restore the connection to the OEF Node after it dropped, if the proxy supports it.
+        :return: ``True`` if the connection is restored, ``False`` otherwise.
+        """
+        return False
+
+    async def _read_messages(self, inbound: InboundQueue) -> None:
+        """
+        Read and decode the messages from the OEF Node into the inbound queue, until the connection drops
+        and cannot be restored (see :func:`~oef.core.OEFProxy._recover`).
+        """
+        try:
+            while self._active_loop:
+                try:
+                    data = await self._receive()
+                except (asyncio.IncompleteReadError, struct.error):
+                    # the connection has been closed
+                    if await self._recover():
+                        continue
+                    logger.warning("Connection dropped")
+                    break
+                except ConnectionError:
+                    if await self._recover():
+                        continue
+                    raise
+                metrics = self._metrics
+                if metrics is None:
+                    msg = agent_pb2.Server.AgentMessage()
+                    msg.ParseFromString(data)
+                    case = payload_case(msg)
+                else:
+                    start = time.perf_counter()
+                    msg = agent_pb2.Server.AgentMessage()
+                    msg.ParseFromString(data)
+                    case = payload_case(msg)
+                    metrics.received(case, len(data), time.perf_counter() - start)
+                session = self._session
+                if session is not None:
+                    session.received(case, msg.answer_id)
+                await inbound.put(case, msg)
+        finally:
+            inbound.close()
+
+    async def _dispatch_message(self, agent: AgentInterface, case: str, msg: agent_pb2.Server.AgentMessage) -> None:
+        logger.debug("loop %s", case)
+        resolved = self._resolved_handlers.get(case)
+        if resolved is None:
+            entry = self._dispatch.get(case)
+            if entry is None:
+                return
+            function = _resolve_handler(agent, entry.handler)
+            resolved = (entry.decoder, function, entry.cleanup, getattr(function, "__name__", case))
+            self._resolved_handlers[case] = resolved
+
+        decoder, handler, cleanup, name = resolved
+        tracer = self._tracer
+        if tracer is not None:
+            step = tracing.STEP_OF_CASE.get(case)
+            if step is not None:
+                content = msg.content
+                tracer.record(tracing.RECEIVED, step, content.origin, content.dialogue_id, msg.answer_id)
+        metrics = self._metrics
+        watchdog = self._watchdog
+        start = time.perf_counter() if metrics is not None else 0.0
+        if watchdog is not None:
+            watchdog.begin(name, case)
+        try:
+            try:
+                result = handler(*decoder(self, msg))
+            finally:
+                # only the synchronous part blocks the loop: an async handler may then wait for I/O
+                if watchdog is not None:
+                    watchdog.end()
+            if isawaitable(result):
+                await result
+        finally:
+            if cleanup is not None:
+                cleanup(self, msg)
+            if metrics is not None:
+                metrics.handled(name, case, msg.answer_id, time.perf_counter() - start)
+
+    async def loop(self, agent: AgentInterface) -> None:
         """
         Event loop to wait for messages and to dispatch the arrived messages to the proper handler.
+        The messages are read by a separate task, through a bounded queue (see
+        :func:`~oef.core.OEFProxy.configure_inbound_queue`), so that the connection is drained while the agent
+        is busy.
         :param agent: the implementation of the message handlers specified in AgentInterface.
         :return: ``None``
         """
-        while self._active_loop:
-            try:
-                data = await self._receive()
-            except asyncio.CancelledError:
-                logger.warning("Proxy {}: loop cancelled".format(self.public_key))
-                break
-            except struct.error:
-                logger.warning("Connection dropped")
-                break
-            msg = agent_pb2.Server.AgentMessage()
-            msg.ParseFromString(data)
-            case = msg.WhichOneof("payload")
-            logger.debug("loop {0}".format(case))
-
-            if case == "agents":
-                await agent.async_on_search_result(msg.answer_id, msg.agents.agents)
-            elif case == "ping":
-                # need to send a pong
-                agent.sendPong(msg.answer_id)
-            elif case == "agents_wide":
-                result_items = []
-                for item in msg.agents_wide.result:
-                    core_key  = str(item.key,'ascii')
-                    core_addr = item.ip
-                    distance = item.distance
-                    core_port = item.port
-                    for agt in item.agents:
-                        agent_key = str(agt.key, 'ascii')
-                        result_items.append(SearchResultItem(agent_key, core_key, core_addr, core_port, distance))
-                agent.on_search_result_wide(msg.answer_id, result_items)
-            elif case == "oef_error": 
-                self._error_details[msg.answer_id] = {
-                    'cause': msg.oef_error.cause,
-                    'detail': msg.oef_error.detail
-                }
-                await agent.async_on_oef_error(msg.answer_id, OEFErrorOperation(msg.oef_error.operation))
-                self._error_details.pop(msg.answer_id, {})
-            elif case == "dialogue_error":
-                await agent.async_on_dialogue_error(msg.answer_id,
-                                                    msg.dialogue_error.dialogue_id,
-                                                    msg.dialogue_error.origin)
-            elif case == "content":
-                entry_key = "{}:{}:{}".format(msg.answer_id, msg.content.dialogue_id, msg.content.origin)
-                self._context_store[entry_key] = uri.Context()
-                self._context_store[entry_key].update(msg.target_uri, msg.source_uri)
-                content_case = msg.content.WhichOneof("payload")
-                logger.debug("msg content {0}".format(content_case))
+        self._resolved_handlers.clear()
+        if self._fair_config is not None:
+            inbound = FairInboundQueue(**self._inbound_config, **self._fair_config)
+        else:
+            inbound = InboundQueue(**self._inbound_config)
+        self._inbound = inbound
+        reader = asyncio.ensure_future(self._read_messages(inbound), loop=self._loop)
+        try:
+            while True:
                 try:
-                    if content_case == "content":
-                        await agent.async_on_message(msg.answer_id, msg.content.dialogue_id, msg.content.origin, msg.content.content)
-                    elif content_case == "fipa":
-                        fipa = msg.content.fipa
-                        fipa_case = fipa.WhichOneof("msg")
-                        if fipa_case == "cfp":
-                            cfp_case = fipa.cfp.WhichOneof("payload")
-                            if cfp_case == "nothing":
-                                query = None
-                            elif cfp_case == "content":
-                                query = fipa.cfp.content
-                            else:
-                                raise Exception("Query type not valid.")
-                            await agent.async_on_cfp(msg.answer_id, msg.content.dialogue_id, msg.content.origin,
-                                                     fipa.target, query)
-                        elif fipa_case == "propose":
-                            propose_case = fipa.propose.WhichOneof("payload")
-                            if propose_case == "content":
-                                proposals = fipa.propose.content
-                            else:
-                                proposals = [Description.from_pb(propose) for propose in fipa.propose.proposals.objects]
-                            await agent.async_on_propose(msg.answer_id, msg.content.dialogue_id, msg.content.origin,
-                                                         fipa.target, proposals)
-                        elif fipa_case == "accept":
-                            await agent.async_on_accept(msg.answer_id, msg.content.dialogue_id, msg.content.origin,
-                                                        fipa.target)
-                        elif fipa_case == "decline":
-                            await agent.async_on_decline(msg.answer_id, msg.content.dialogue_id, msg.content.origin,
-                                                         fipa.target)
-                        else:
-                            logger.warning("Not implemented yet: fipa {0}".format(fipa_case))
-                finally:
-                    self._context_store.pop(entry_key)
-
-            else:
-                print("UNKNOWN CASE: ", case)
-                exit(76)
+                    item = await inbound.get()
+                except asyncio.CancelledError:
+                    if self._active_loop:
+                        logger.warning("Proxy {}: loop cancelled".format(self.public_key))
+                    else:
+                        # stopped by the agent: not worth a warning, which adds up when a fleet stops
+                        logger.debug("Proxy %s: loop stopped", self.public_key)
+                    break
+                if item is None:
+                    # the reader is done: propagate its exception, if any
+                    await reader
+                    break
+                await self._dispatch_message(agent, *item)
+        finally:
+            reader.cancel()
@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2018 Fetch.AI Limited
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+
+"""
+oef.dispatch
+~~~~~~~~~~~~
+This module contains the table used by :class:`~oef.core.OEFProxy` to route the messages received
+from the OEF Node to the handlers of the agent.
+
+Every message is identified by its payload case (see :func:`~oef.dispatch.payload_case`),
+and every case is mapped to a :class:`~oef.dispatch.PayloadHandler`:
+
+* a decoder, which turns the message into the arguments of the handler;
+* a handler, that is the name of a method of the agent, or any callable;
+* optionally, a cleanup function, called after the handler returns.
+"""
+
+import logging
+from collections import Counter
+from typing import Callable, Dict, Optional, Tuple, Union
+
+from protocol.src.proto import agent_pb2
+from oef.src.python.messages import OEFErrorOperation
+from oef.src.python.query import SearchResultItem
+from oef.src.python.schema import Description
+from utils.src.python import uri
+
+logger = logging.getLogger(__name__)
+
+DECODER = Callable[[object, agent_pb2.Server.AgentMessage], Tuple]
+CLEANUP = Callable[[object, agent_pb2.Server.AgentMessage], None]
+
+
+class DispatchRecord:
+    """The raw URIs of the message being dispatched. The context is only built if a handler asks for it."""
+
+    __slots__ = ("target_uri", "source_uri", "context")
+
+    def __init__(self, target_uri: str, source_uri: str):
+        self.target_uri = target_uri
+        self.source_uri = source_uri
+        self.context = None
+
+    def getContext(self) -> uri.Context:
+        if self.context is None:
+            self.context = uri.Context.fromWire(self.target_uri, self.source_uri)
+        return self.context
+
+
+class PayloadHandler:
+    """The decoder, handler and cleanup registered for a payload case."""
+
+    __slots__ = ("decoder", "handler", "cleanup")
+
+    def __init__(self, decoder: DECODER, handler: Union[str, Callable], cleanup: Optional[CLEANUP] = None):
+        """
+        Initialize a payload handler.
+
+        :param decoder: a function ``(proxy, message) -> args`` that extracts the arguments of the handler.
+        :param handler: the name of the method of the agent to call with the arguments,
+                      | or a callable to call with the arguments.
+                      | If the agent overrides the ``async_`` version of the method, that one is awaited instead.
+        :param cleanup: a function ``(proxy, message) -> None`` called after the handler, even if it raised.
+        """
+        self.decoder = decoder
+        self.handler = handler
+        self.cleanup = cleanup
+
+
+def payload_case(msg: agent_pb2.Server.AgentMessage) -> str:
+    """
+    The payload case of a message from the OEF Node, e.g. ``"ping"``, ``"content.content"`` or ``"fipa.cfp"``.
+
+    :param msg: the message.
+    :return: the payload case.
+    """
+    case = msg.WhichOneof("payload")
+    if case != "content":
+        return case
+    content_case = msg.content.WhichOneof("payload")
+    if content_case == "fipa":
+        return "fipa.{}".format(msg.content.fipa.WhichOneof("msg"))
+    return "content.{}".format(content_case)
+
+
+def _open_dialogue(proxy, msg) -> None:
+    proxy._context_store[(msg.answer_id, msg.content.dialogue_id, msg.content.origin)] = \
+        DispatchRecord(msg.target_uri, msg.source_uri)
+
+
+def _close_dialogue(proxy, msg) -> None:
+    proxy._context_store.pop((msg.answer_id, msg.content.dialogue_id, msg.content.origin), None)
+
+
+def _decode_search_result_wide(proxy, msg) -> Tuple:
+    result_items = []
+    for item in msg.agents_wide.result:
+        core_key = str(item.key, 'ascii')
+        for agt in item.agents:
+            result_items.append(SearchResultItem(str(agt.key, 'ascii'), core_key, item.ip, item.port, item.distance))
+    return msg.answer_id, result_items
+
+
+def _decode_oef_error(proxy, msg) -> Tuple:
+    proxy._error_details[msg.answer_id] = {
+        'cause': msg.oef_error.cause,
+        'detail': msg.oef_error.detail
+    }
+    return msg.answer_id, OEFErrorOperation(msg.oef_error.operation)
+
+
+def _drop_error_details(proxy, msg) -> None:
+    proxy._error_details.pop(msg.answer_id, None)
+
+
+def _decode_message(proxy, msg) -> Tuple:
+    _open_dialogue(proxy, msg)
+    return msg.answer_id, msg.content.dialogue_id, msg.content.origin, msg.content.content
+
+
+def _decode_cfp(proxy, msg) -> Tuple:
+    cfp = msg.content.fipa.cfp
+    cfp_case = cfp.WhichOneof("payload")
+    if cfp_case == "nothing":
+        query = None
+    elif cfp_case == "content":
+        query = cfp.content
+    else:
+        raise Exception("Query type not valid.")
+    _open_dialogue(proxy, msg)
+    return msg.answer_id, msg.content.dialogue_id, msg.content.origin, msg.content.fipa.target, query
+
+
+def _decode_propose(proxy, msg) -> Tuple:
+    propose = msg.content.fipa.propose
+    if propose.WhichOneof("payload") == "content":
+        proposals = propose.content
+    else:
+        proposals = [Description.from_pb(p) for p in propose.proposals.objects]
+    _open_dialogue(proxy, msg)
+    return msg.answer_id, msg.content.dialogue_id, msg.content.origin, msg.content.fipa.target, proposals
+
+
+def _decode_fipa_reply(proxy, msg) -> Tuple:
+    _open_dialogue(proxy, msg)
+    return msg.answer_id, msg.content.dialogue_id, msg.content.origin, msg.content.fipa.target
+
+
+DEFAULT_HANDLERS = {
+    "agents":          PayloadHandler(lambda proxy, msg: (msg.answer_id, msg.agents.agents), "on_search_result"),
+    "ping":            PayloadHandler(lambda proxy, msg: (msg.answer_id,), "sendPong"),
+    "agents_wide":     PayloadHandler(_decode_search_result_wide, "on_search_result_wide"),
+    "oef_error":       PayloadHandler(_decode_oef_error, "on_oef_error", _drop_error_details),
+    "dialogue_error":  PayloadHandler(lambda proxy, msg: (msg.answer_id, msg.dialogue_error.dialogue_id,
+                                                          msg.dialogue_error.origin), "on_dialogue_error"),
+    "content.content": PayloadHandler(_decode_message, "on_message", _close_dialogue),
+    "fipa.cfp":        PayloadHandler(_decode_cfp, "on_cfp", _close_dialogue),
+    "fipa.propose":    PayloadHandler(_decode_propose, "on_propose", _close_dialogue),
+    "fipa.accept":     PayloadHandler(_decode_fipa_reply, "on_accept", _close_dialogue),
+    "fipa.decline":    PayloadHandler(_decode_fipa_reply, "on_decline", _close_dialogue),
+}  # type: Dict[str, PayloadHandler]
+
+
+class DispatchTable:
+    """
+    The payload handlers of a proxy. It starts with :data:`~oef.dispatch.DEFAULT_HANDLERS`,
+    which is copied on the first change only, so that the proxies that use the defaults share them.
+    Messages whose case has no handler are counted in :attr:`unknown_cases` and skipped.
+    """
+
+    def __init__(self) -> None:
+        self._handlers = DEFAULT_HANDLERS
+        self.unknown_cases = Counter()
+
+    def register(self, case: str, handler: PayloadHandler) -> None:
+        """
+        Register (or replace) the handler of a payload case.
+
+        :param case: the payload case, as returned by :func:`~oef.dispatch.payload_case`.
+        :param handler: the handler.
+        :return: ``None``
+        """
+        if self._handlers is DEFAULT_HANDLERS:
+            self._handlers = dict(DEFAULT_HANDLERS)
+        self._handlers[case] = handler
+
+    def unregister(self, case: str) -> None:
+        """Remove the handler of a payload case, if any."""
+        if self._handlers is DEFAULT_HANDLERS:
+            self._handlers = dict(DEFAULT_HANDLERS)
+        self._handlers.pop(case, None)
+
+    def get(self, case: str) -> Optional[PayloadHandler]:
+        """
+        Get the handler of a payload case. If there is none, the case is counted as unknown.
+
+        :param case: the payload case.
+        :return: the handler, or ``None``.
+        """
+        handler = self._handlers.get(case)
+        if handler is None:
+            if case not in self.unknown_cases:
+                logger.warning("No handler for payload case '{}': these messages are ignored.".format(case))
+            self.unknown_cases[case] += 1
+        return handler
@@ -0,0 +1,376 @@
+# -*- coding: utf-8 -*-
+
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2018 Fetch.AI Limited
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+
+"""
+oef.failover
+~~~~~~~~~~~~
+This module contains :class:`~oef.failover.OEFMultiNodeProxy`, a proxy to one of several OEF Nodes.
+
+When it connects, the proxy runs the handshake with all the nodes at once, keeps the connection to the fastest one,
+and keeps the connection to the second fastest as a warm standby, on which it only answers the pings.
+When the active connection drops, or the active node has not been heard from for a while, the standby connection
+becomes the active one at once: the proxy registers the agent again on it, and sends again the searches without
+result (see :mod:`~oef.reconnect`). A new standby is then chosen among the other nodes, in the background.
+Without a standby, the proxy reconnects to the fastest node available, with the backoff of its
+:class:`~oef.reconnect.ReconnectPolicy`.
+"""
+
+import asyncio
+import logging
+import struct
+import time
+from collections import deque
+from typing import List, Optional, Sequence, Tuple
+
+from protocol.src.proto import agent_pb2
+from oef.src.python.core import AgentInterface
+from oef.src.python.proxy import OEFConnectionError, OEFNetworkProxy
+from oef.src.python.reconnect import ReconnectPolicy
+
+logger = logging.getLogger(__name__)
+
+"""the address and port of an OEF Node"""
+ENDPOINT = Tuple[str, int]
+
+DEFAULT_PROBE_TIMEOUT = 5.0
+
+
+async def _read_frame(reader: asyncio.StreamReader) -> bytes:
+    size = struct.unpack("I", await reader.readexactly(4))[0]
+    return await reader.readexactly(size)
+
+
+def _write_frame(writer: asyncio.StreamWriter, msg) -> None:
+    data = msg.SerializeToString()
+    writer.write(struct.pack("I", len(data)) + data)
+
+
+async def _handshake(public_key: str, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> bool:
+    """The handshake of :func:`~oef.proxy.OEFNetworkProxy.connect`, on a connection of its own."""
+    pb_public_key = agent_pb2.Agent.Server.ID()
+    pb_public_key.public_key = public_key
+    _write_frame(writer, pb_public_key)
+    pb_phrase = agent_pb2.Server.Phrase()
+    pb_phrase.ParseFromString(await _read_frame(reader))
+    if pb_phrase.WhichOneof("payload") == "failure":
+        return False
+    pb_answer = agent_pb2.Agent.Server.Answer()
+    pb_answer.answer = pb_phrase.phrase[::-1]
+    pb_answer.capability_bits.will_heartbeat = True
+    _write_frame(writer, pb_answer)
+    pb_status = agent_pb2.Server.Connected()
+    pb_status.ParseFromString(await _read_frame(reader))
+    return pb_status.status
+
+
+class NodeProbe:
+    """The result of the connection to a node: the time to open the TCP connection, and to run the handshake."""
+
+    __slots__ = ("endpoint", "connect_time", "handshake_time", "error")
+
+    def __init__(self, endpoint: ENDPOINT, connect_time: Optional[float] = None,
+                 handshake_time: Optional[float] = None, error: Optional[BaseException] = None) -> None:
+        self.endpoint = endpoint
+        self.connect_time = connect_time
+        self.handshake_time = handshake_time
+        self.error = error
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    def __repr__(self):
+        if self.error is not None:
+            return "NodeProbe({}:{}, error={!r})".format(self.endpoint[0], self.endpoint[1], self.error)
+        return "NodeProbe({}:{}, connect_time={:.6f}, handshake_time={:.6f})".format(
+            self.endpoint[0], self.endpoint[1], self.connect_time, self.handshake_time)
+
+
+async def probe_node(public_key: str, endpoint: ENDPOINT, timeout: float = DEFAULT_PROBE_TIMEOUT) \
+        -> Tuple[NodeProbe, Optional[Tuple[asyncio.StreamReader, asyncio.StreamWriter]]]:
+    """
+    Connect to a node and run the handshake, timing both.
+
+    :param public_key: the public key of the agent.
+    :param endpoint: the address and port of the node.
+    :param timeout: the maximum time (in seconds) of the connection, handshake included.
+    :return: the probe, and the connection if the handshake succeeded.
+    """
+    start = time.monotonic()
+    writer = None
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(*endpoint), timeout)
+        connected = time.monotonic()
+        ok = await asyncio.wait_for(_handshake(public_key, reader, writer), max(0.0, timeout - (connected - start)))
+        if not ok:
+            raise OEFConnectionError("Public key already in use.")
+    except (OSError, EOFError, struct.error, asyncio.TimeoutError) as e:
+        # EOFError (asyncio.IncompleteReadError) means that the node closed the connection during the handshake
+        if writer is not None:
+            writer.close()
+        return NodeProbe(endpoint, error=e), None
+    return NodeProbe(endpoint, connected - start, time.monotonic() - connected), (reader, writer)
+
+
+class _Standby:
+    """A connection kept ready to become the active one. Its pings are answered, other messages are dropped."""
+
+    def __init__(self, probe: NodeProbe, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.probe = probe
+        self.reader = reader
+        self.writer = writer
+        self.task = None
+        self.idle = True
+        self.released = False
+
+    @property
+    def alive(self) -> bool:
+        return self.task is not None and not self.task.done() and not self.writer.transport.is_closing()
+
+    async def answer_pings(self) -> None:
+        try:
+            while not self.released:
+                self.idle = True
+                header = await self.reader.readexactly(4)
+                # past this point, the frame must be read entirely before the connection can be handed over
+                self.idle = False
+                data = await self.reader.readexactly(struct.unpack("I", header)[0])
+                msg = agent_pb2.Server.AgentMessage()
+                msg.ParseFromString(data)
+                if msg.WhichOneof("payload") == "ping":
+                    reply = agent_pb2.Envelope()
+                    reply.msg_id = msg.answer_id
+                    reply.pong.dummy = 1
+                    _write_frame(self.writer, reply)
+                else:
+                    logger.debug("Standby %s:%s: dropped a %s message.", self.probe.endpoint[0],
+                                 self.probe.endpoint[1], msg.WhichOneof("payload"))
+        except (EOFError, ConnectionError) as e:
+            logger.warning("Standby connection to {}:{} lost: {!r}".format(self.probe.endpoint[0],
+                                                                            self.probe.endpoint[1], e))
+        finally:
+            self.idle = True
+
+    async def release(self) -> None:
+        """Stop answering the pings, without leaving a frame half read."""
+        self.released = True
+        if self.idle:
+            self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+
+    def close(self) -> None:
+        self.released = True
+        if self.task is not None:
+            self.task.cancel()
+        self.writer.close()
+
+
+class OEFMultiNodeProxy(OEFNetworkProxy):
+    """
+    Proxy to the fastest of several OEF Nodes, with a warm standby connection to another one.
+    The automatic reconnection (see :func:`~oef.proxy.OEFNetworkProxy.enable_reconnect`) is always enabled.
+    """
+
+    def __init__(self, public_key: str, endpoints: Sequence[ENDPOINT],
+                 loop: asyncio.AbstractEventLoop = None,
+                 heartbeat_timeout: Optional[float] = None,
+                 probe_timeout: float = DEFAULT_PROBE_TIMEOUT,
+                 policy: Optional[ReconnectPolicy] = None) -> None:
+        """
+        Initialize the proxy.
+
+        :param public_key: the public key used in the protocols.
+        :param endpoints: the address and port of every node.
+        :param loop: the event loop.
+        :param heartbeat_timeout: if given, the active node is considered down when nothing, not even a ping,
+                                | has been received from it for this time (in seconds), while the agent runs.
+                                | It must be longer than the interval of the pings of the nodes.
+        :param probe_timeout: the maximum time (in seconds) of the connection to a node, handshake included.
+        :param policy: the backoff of the reconnections when no standby connection is available.
+        :raises ValueError: if there is no endpoint, or the timeouts are not positive.
+        """
+        endpoints = [(str(address), int(port)) for address, port in endpoints]
+        if not endpoints or probe_timeout <= 0 or (heartbeat_timeout is not None and heartbeat_timeout <= 0):
+            raise ValueError("Invalid input value for type '{}': at least one endpoint is required, "
+                             "and the timeouts must be positive.".format(type(self).__name__))
+        super().__init__(public_key, endpoints[0][0], endpoints[0][1], loop=loop)
+        self.endpoints = endpoints
+        self.heartbeat_timeout = heartbeat_timeout
+        self.probe_timeout = probe_timeout
+        self.probes = []  # type: List[NodeProbe]
+        self.enable_reconnect(policy)
+        self._standby = None
+        self._standby_task = None
+        self._last_heard = 0.0
+        self._monitor = None
+
+    @property
+    def active_endpoint(self) -> Optional[ENDPOINT]:
+        """The node of the active connection, if any."""
+        return (self.oef_addr, self.port) if self.is_connected() else None
+
+    @property
+    def standby_endpoint(self) -> Optional[ENDPOINT]:
+        """The node of the standby connection, if any."""
+        return self._standby.probe.endpoint if self._standby is not None and self._standby.alive else None
+
+    async def _probe(self, endpoints: Sequence[ENDPOINT]) \
+            -> List[Tuple[NodeProbe, Tuple[asyncio.StreamReader, asyncio.StreamWriter]]]:
+        """Probe nodes concurrently. Returns the successful probes, fastest first, with their connection."""
+        results = await asyncio.gather(*(probe_node(self.public_key, endpoint, self.probe_timeout)
+                                         for endpoint in endpoints))
+        for probe, _ in results:
+            if not probe.ok:
+                logger.info("Proxy {}: node {}:{} unavailable: {!r}".format(self.public_key, probe.endpoint[0],
+                                                                          probe.endpoint[1], probe.error))
+        return sorted(((probe, connection) for probe, connection in results if connection is not None),
+                      key=lambda result: result[0].connect_time + result[0].handshake_time)
+
+    async def connect(self) -> bool:
+        if self.is_connected() and not self._server_writer.transport.is_closing():
+            return True
+        results = await self._probe(self.endpoints)
+        self.probes = [probe for probe, _ in results]
+        if not results:
+            raise OEFConnectionError("No OEF Node available among {}.".format(self.endpoints))
+        (probe, connection), others = results[0], results[1:]
+        self._activate(probe.endpoint, *connection)
+        if self._standby is not None:
+            self._standby.close()
+            self._standby = None
+        if others:
+            self._set_standby(*others[0])
+        for _, (_, writer) in others[1:]:
+            writer.close()
+        logger.debug("Proxy %s: connected to %s, standby %s.", self.public_key, probe.endpoint,
+                     self.standby_endpoint)
+        return True
+
+    def _activate(self, endpoint: ENDPOINT, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.oef_addr, self.port = endpoint
+        self._resolved_addr = None
+        self._connection = (reader, writer)
+        self._server_reader, self._server_writer = reader, writer
+        self._outbound = None
+        self._last_heard = self._loop.time()
+
+    def _set_standby(self, probe: NodeProbe, connection: Tuple[asyncio.StreamReader, asyncio.StreamWriter]) -> None:
+        standby = _Standby(probe, *connection)
+        standby.task = asyncio.ensure_future(standby.answer_pings(), loop=self._loop)
+        standby.task.add_done_callback(lambda task: self._on_standby_exit(standby))
+        self._standby = standby
+
+    def _on_standby_exit(self, standby: _Standby) -> None:
+        if self._standby is standby and not standby.released:
+            self._standby = None
+            standby.writer.close()
+            self._replace_standby()
+
+    def _replace_standby(self) -> None:
+        """Choose a new standby among the nodes other than the active one, in the background."""
+        if len(self.endpoints) > 1 and (self._standby_task is None or self._standby_task.done()):
+            self._standby_task = asyncio.ensure_future(self._find_standby(), loop=self._loop)
+
+    async def _find_standby(self) -> None:
+        attempt = 0
+        while self.is_connected() and self._standby is None:
+            if attempt:
+                await asyncio.sleep(self._reconnect.delay(attempt - 1))
+            attempt += 1
+            active = self.active_endpoint
+            results = await self._probe([endpoint for endpoint in self.endpoints if endpoint != active])
+            if not self.is_connected():
+                results, discarded = [], results
+                for _, (_, writer) in discarded:
+                    writer.close()
+            if results:
+                self._set_standby(*results[0])
+                for _, (_, writer) in results[1:]:
+                    writer.close()
+
+    async def _receive(self):
+        data = await super()._receive()
+        self._last_heard = self._loop.time()
+        return data
+
+    async def _recover(self) -> bool:
+        standby = self._standby
+        if self._reconnect is None or not self._active_loop or standby is None or not standby.alive:
+            return await super()._recover()
+        start = time.monotonic()
+        self._standby = None
+        # buffer the messages sent while the standby connection is handed over
+        self._outage = outage = deque()
+        try:
+            await standby.release()
+            if standby.writer.transport.is_closing():
+                return await super()._recover()
+            logger.warning("Proxy {}: connection to {}:{} lost, failing over to {}:{}.".format(
+                self.public_key, self.oef_addr, self.port, *standby.probe.endpoint))
+            self._close_connection()
+            self._activate(standby.probe.endpoint, standby.reader, standby.writer)
+            replay = self._session.replay()
+            for msg in replay:
+                self._write(msg.to_pb())
+            while outage:
+                self._write(outage.popleft())
+        finally:
+            if self._outage is outage:
+                self._outage = None
+        stats = self._reconnect_stats
+        stats.drops += 1
+        stats.failovers += 1
+        stats.replayed += len(replay)
+        stats.last_outage = time.monotonic() - start
+        self._replace_standby()
+        return True
+
+    def _check_heartbeat(self) -> None:
+        self._monitor = self._loop.call_later(self.heartbeat_timeout / 4, self._check_heartbeat)
+        if self.is_connected() and self._loop.time() - self._last_heard > self.heartbeat_timeout:
+            logger.warning("Proxy {}: nothing received from {}:{} for {:.3f}s.".format(
+                self.public_key, self.oef_addr, self.port, self._loop.time() - self._last_heard))
+            # the reader gets the end of the stream, and the proxy fails over
+            self._last_heard = self._loop.time()
+            self._server_writer.close()
+
+    async def loop(self, agent: AgentInterface) -> None:
+        if self.heartbeat_timeout is not None:
+            self._last_heard = self._loop.time()
+            self._monitor = self._loop.call_later(self.heartbeat_timeout / 4, self._check_heartbeat)
+        try:
+            await super().loop(agent)
+        finally:
+            if self._monitor is not None:
+                self._monitor.cancel()
+                self._monitor = None
+
+    async def stop(self) -> None:
+        if self._standby_task is not None:
+            self._standby_task.cancel()
+            self._standby_task = None
+        if self._standby is not None:
+            self._standby.close()
+            self._standby = None
+        await super().stop()
@@ -0,0 +1,287 @@
+# -*- coding: utf-8 -*-
+
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2018 Fetch.AI Limited
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+
+"""
+oef.fleet
+~~~~~~~~~
+This module contains :class:`~oef.fleet.AgentFleet`, which runs many agents on a single event loop.
+
+Instead of calling :func:`~oef.agents.Agent.connect` and :func:`~oef.agents.Agent.run` for every agent,
+which each run the event loop until completion, the fleet connects the agents concurrently (with a bound
+on the handshakes in progress, and resolving the address of each node once), starts the message loop of each
+agent as a task, and supervises the tasks from a single coroutine.
+"""
+
+import asyncio
+import functools
+import logging
+import time
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from oef.src.python.agents import Agent
+from oef.src.python import bulk
+from oef.src.python.inbound import InboundStats
+from oef.src.python.metrics import MetricsRegistry
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_CONNECTING = 64
+DEFAULT_HANDSHAKE_TIMEOUT = bulk.DEFAULT_HANDSHAKE_TIMEOUT
+
+
+class FleetStats:
+    """Counters of an :class:`~oef.fleet.AgentFleet`."""
+
+    def __init__(self) -> None:
+        self.connected = 0
+        self.failed = 0
+        self.exits = Counter()
+        self.total_connect_time = 0.0
+        self.max_connect_time = 0.0
+
+    @property
+    def mean_connect_time(self) -> float:
+        """The mean time (in seconds) to connect an agent, including the wait for a handshake slot."""
+        return self.total_connect_time / self.connected if self.connected else 0.0
+
+    def __repr__(self):
+        return "FleetStats(connected={}, failed={}, exits={}, mean_connect_time={:.6f}, max_connect_time={:.6f})" \
+            .format(self.connected, self.failed, dict(self.exits), self.mean_connect_time, self.max_connect_time)
+
+
+class AgentFleet:
+    """
+    A set of agents sharing an event loop.
+
+    The agents must have been created with the loop of the fleet. The fleet only uses their asynchronous
+    methods, so it can also be run from a coroutine with :func:`~oef.fleet.AgentFleet.async_run`.
+    """
+
+    def __init__(self, agents: Iterable[Agent] = (),
+                 loop: Optional[asyncio.AbstractEventLoop] = None,
+                 max_connecting: int = DEFAULT_MAX_CONNECTING,
+                 stagger: float = 0.0,
+                 handshake_timeout: float = DEFAULT_HANDSHAKE_TIMEOUT) -> None:
+        """
+        Initialize the fleet.
+
+        :param agents: the agents of the fleet. More can be added with :func:`~oef.fleet.AgentFleet.add`.
+        :param loop: the event loop.
+        :param max_connecting: the maximum number of connection handshakes in progress.
+        :param stagger: the connections are spread over this period (in seconds), so that the pings of the
+                      | OEF Node, which are timed from the connection of each agent, do not all arrive at once.
+        :param handshake_timeout: the maximum time (in seconds) of each connection, handshake included, so that
+                                | a node that never answers does not hold a handshake slot forever.
+        :raises ValueError: if ``max_connecting`` or ``handshake_timeout`` is not positive.
+        """
+        if max_connecting <= 0 or handshake_timeout <= 0:
+            raise ValueError("Invalid input value for type '{}': max_connecting and handshake_timeout must be "
+                             "positive.".format(type(self).__name__))
+        self._loop = loop if loop is not None else asyncio.get_event_loop()
+        self.max_connecting = max_connecting
+        self.stagger = stagger
+        self.handshake_timeout = handshake_timeout
+        self.stats = FleetStats()
+        self._agents = []  # type: List[Agent]
+        self._tasks = {}  # type: Dict[Agent, asyncio.Task]
+        self._idle = None
+        self._connect_histogram = None
+        for agent in agents:
+            self.add(agent)
+
+    def add(self, agent: Agent) -> None:
+        """Add an agent to the fleet. It is started by the next call of :func:`~oef.fleet.AgentFleet.async_start`."""
+        if agent._loop is not self._loop:
+            raise ValueError("Invalid input value for type '{}': the agent {} runs on another event loop."
+                             .format(type(self).__name__, agent.public_key))
+        self._agents.append(agent)
+
+    def __len__(self):
+        return len(self._agents)
+
+    def __iter__(self):
+        return iter(self._agents)
+
+    @property
+    def running(self) -> int:
+        """The number of agents whose message loop is running."""
+        return len(self._tasks)
+
+    def is_running(self, agent: Agent) -> bool:
+        return agent in self._tasks
+
+    def enable_metrics(self, registry: Optional[MetricsRegistry] = None) -> MetricsRegistry:
+        """
+        Record metrics aggregated over the fleet: the number of agents, the connection times and failures,
+        the exits of the message loops, and the messages waiting in the inbound queues.
+
+        :param registry: the registry of the metrics. By default, a new one.
+        :return: the registry.
+        """
+        registry = registry if registry is not None else MetricsRegistry()
+        registry.gauge("oef_fleet_agents", "Agents in the fleet.", function=lambda: len(self._agents))
+        registry.gauge("oef_fleet_running_agents", "Agents whose message loop is running.",
+                       function=lambda: len(self._tasks))
+        registry.gauge("oef_fleet_connected_total", "Agents connected.", function=lambda: self.stats.connected)
+        registry.gauge("oef_fleet_connect_failures_total", "Failed connections.", function=lambda: self.stats.failed)
+        for reason in ("stopped", "closed", "error"):
+            registry.gauge("oef_fleet_exits_total", "Message loops ended, by reason.",
+                           function=functools.partial(self.stats.exits.__getitem__, reason), reason=reason)
+        registry.gauge("oef_fleet_inbound_depth", "Received messages waiting to be dispatched, over all agents.",
+                       function=lambda: sum(agent._oef_proxy.inbound_depth for agent in self._tasks))
+        registry.gauge("oef_fleet_messages_received_total",
+                       "Messages received by the current message loops of the agents.",
+                       function=lambda: sum(stats.received for stats in self._inbound_stats()))
+        registry.gauge("oef_fleet_messages_dispatched_total",
+                       "Messages dispatched by the current message loops of the agents.",
+                       function=lambda: sum(stats.dispatched for stats in self._inbound_stats()))
+        self._connect_histogram = registry.histogram("oef_fleet_connect_seconds",
+                                                     "Connection time of the agents, including the wait for a slot.")
+        return registry
+
+    def _inbound_stats(self) -> Iterator[InboundStats]:
+        for agent in self._agents:
+            stats = agent._oef_proxy.inbound_stats
+            if stats is not None:
+                yield stats
+
+    async def _connect(self, agent: Agent, delay: float, slots: asyncio.Semaphore,
+                       error: Optional[BaseException]) -> bool:
+        if delay > 0:
+            await asyncio.sleep(delay)
+        start = time.monotonic()
+        if error is None:
+            # on failure, the connection is closed by bulk._connect
+            error = (await bulk._connect(agent._oef_proxy, slots, self.handshake_timeout)).error
+        if error is not None:
+            logger.warning("Agent {} failed to connect: {!r}".format(agent.public_key, error))
+            self.stats.failed += 1
+            return False
+        elapsed = time.monotonic() - start
+        stats = self.stats
+        stats.connected += 1
+        stats.total_connect_time += elapsed
+        if elapsed > stats.max_connect_time:
+            stats.max_connect_time = elapsed
+        if self._connect_histogram is not None:
+            self._connect_histogram.observe(elapsed)
+        self._launch(agent)
+        return True
+
+    @staticmethod
+    async def _disconnect(agent: Agent) -> None:
+        try:
+            await agent.async_disconnect()
+        except OSError as e:
+            logger.debug("Agent %s: disconnection failed: %s", agent.public_key, e)
+
+    def _launch(self, agent: Agent) -> None:
+        agent._oef_proxy._active_loop = True
+        task = asyncio.ensure_future(agent._oef_proxy.loop(agent), loop=self._loop)
+        agent._task = task
+        self._tasks[agent] = task
+        if self._idle is not None:
+            self._idle.clear()
+        task.add_done_callback(functools.partial(self._on_exit, agent))
+
+    def _on_exit(self, agent: Agent, task: asyncio.Task) -> None:
+        if self._tasks.get(agent) is task:
+            del self._tasks[agent]
+        if agent._task is task:
+            agent._task = None
+        if task.cancelled() or not agent._oef_proxy._active_loop:
+            # Agent.stop() clears _active_loop before cancelling the loop, which then returns normally
+            self.stats.exits["stopped"] += 1
+        elif task.exception() is not None:
+            self.stats.exits["error"] += 1
+            logger.error("Agent {} stopped with an error: {!r}".format(agent.public_key, task.exception()))
+        else:
+            self.stats.exits["closed"] += 1
+        if not self._tasks and self._idle is not None:
+            self._idle.set()
+
+    async def async_start(self, agents: Optional[Iterable[Agent]] = None) -> List[Agent]:
+        """
+        Connect agents and start their message loops.
+
+        :param agents: the agents to start. By default, all the agents of the fleet that are not running.
+        :return: the agents that could not connect.
+        """
+        agents = [a for a in (agents if agents is not None else self._agents) if a not in self._tasks]
+        # resolve every node once: the proxies that cannot be resolved are not connected
+        unresolved = await bulk.resolve_addresses([agent._oef_proxy for agent in agents], self._loop)
+        slots = asyncio.Semaphore(self.max_connecting)
+        step = self.stagger / len(agents) if agents else 0.0
+        connected = await asyncio.gather(*(self._connect(agent, i * step, slots, unresolved.get(agent._oef_proxy))
+                                           for i, agent in enumerate(agents)))
+        return [agent for agent, ok in zip(agents, connected) if not ok]
+
+    async def async_stop(self, agents: Optional[Iterable[Agent]] = None) -> None:
+        """
+        Stop the message loops of agents and disconnect them.
+
+        :param agents: the agents to stop. By default, all of them.
+        :return: ``None``
+        """
+        agents = list(agents if agents is not None else self._agents)
+        tasks = [self._tasks[agent] for agent in agents if agent in self._tasks]
+        for agent in agents:
+            if agent in self._tasks:
+                agent.stop()
+        if tasks:
+            await asyncio.wait(tasks)
+        slots = asyncio.Semaphore(self.max_connecting)
+
+        async def disconnect(agent):
+            async with slots:
+                await self._disconnect(agent)
+
+        await asyncio.gather(*(disconnect(agent) for agent in agents))
+
+    def stop(self) -> None:
+        """Cancel the message loops of all the agents. Then :func:`~oef.fleet.AgentFleet.run` returns."""
+        for agent in list(self._tasks):
+            agent.stop()
+
+    async def async_run(self) -> List[Agent]:
+        """
+        Start all the agents, and wait until all their message loops have ended
+        (see :func:`~oef.fleet.AgentFleet.stop`). The agents are disconnected at the end.
+
+        :return: the agents that could not connect.
+        """
+        self._idle = asyncio.Event()
+        failed = await self.async_start()
+        try:
+            if self._tasks:
+                await self._idle.wait()
+        finally:
+            await self.async_stop()
+        return failed
+
+    def run(self) -> List[Agent]:
+        """
+        Run the fleet synchronously. See :func:`~oef.fleet.AgentFleet.async_run`.
+
+        :return: the agents that could not connect.
+        """
+        return self._loop.run_until_complete(self.async_run())
@@ -0,0 +1,290 @@
+# -*- coding: utf-8 -*-
+
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2018 Fetch.AI Limited
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+
+"""
+oef.inbound
+~~~~~~~~~~~
+This module contains the bounded queue between the task that reads messages from the OEF Node
+and the task that dispatches them to the agent (see :func:`~oef.core.OEFProxy.loop`).
+"""
+
+import asyncio
+import logging
+import time
+from collections import Counter, deque
+from enum import Enum
+from typing import Dict, Iterable, Optional, Tuple
+
+from protocol.src.proto import agent_pb2
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INBOUND_CAPACITY = 1024
+
+
+class OverflowPolicy(Enum):
+    """What to do with a message received while the inbound queue is full."""
+    BLOCK = "block"               # stop reading until the agent catches up, so that TCP backpressure applies
+    DROP_OLDEST = "drop_oldest"   # drop the message that has waited the longest
+    REJECT = "reject"             # drop the new message if its payload case is rejectable, block otherwise
+
+
+class InboundStats:
+    """Counters of an :class:`~oef.inbound.InboundQueue`."""
+
+    def __init__(self) -> None:
+        self.received = 0
+        self.dispatched = 0
+        self.dropped = Counter()
+        self.rejected = Counter()
+        self.max_depth = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    @property
+    def mean_wait(self) -> float:
+        """The mean time (in seconds) spent by the dispatched messages in the queue."""
+        return self.total_wait / self.dispatched if self.dispatched else 0.0
+
+    def __repr__(self):
+        return "InboundStats(received={}, dispatched={}, dropped={}, rejected={}, max_depth={}, mean_wait={:.6f}, " \
+               "max_wait={:.6f})".format(self.received, self.dispatched, sum(self.dropped.values()),
+                                         sum(self.rejected.values()), self.max_depth, self.mean_wait, self.max_wait)
+
+
+def _wake(waiter: Optional[asyncio.Future]) -> None:
+    """Wake up a waiting producer or consumer, if any. Returns ``None``, to clear the waiter."""
+    if waiter is not None and not waiter.done():
+        waiter.set_result(None)
+
+
+class InboundQueue:
+    """
+    A bounded FIFO of decoded messages, with their payload case (see :func:`~oef.dispatch.payload_case`).
+    It must be used from the event loop that runs the proxy, by one producer and one consumer.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_INBOUND_CAPACITY,
+                 policy: OverflowPolicy = OverflowPolicy.BLOCK,
+                 reject_cases: Optional[Iterable[str]] = None) -> None:
+        """
+        Initialize the queue.
+
+        :param capacity: the maximum number of messages waiting in the queue.
+        :param policy: what to do when a message arrives and the queue is full.
+        :param reject_cases: with :attr:`~oef.inbound.OverflowPolicy.REJECT`, the payload cases that can be rejected.
+                           | By default, all of them.
+        :raises ValueError: if the capacity is not positive.
+        """
+        if capacity <= 0:
+            raise ValueError("Invalid input value for type '{}': capacity must be positive."
+                             .format(type(self).__name__))
+        self.capacity = capacity
+        self.policy = policy
+        self.reject_cases = frozenset(reject_cases) if reject_cases is not None else None
+        self.stats = InboundStats()
+        self._items = deque()
+        self._size = 0
+        self._closed = False
+        # the futures of the consumer waiting for a message, and of the producer waiting for room, if any
+        self._getter = None
+        self._putter = None
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def depth(self) -> int:
+        """The number of messages waiting in the queue."""
+        return self._size
+
+    def _append(self, item: Tuple[float, str, agent_pb2.Server.AgentMessage]) -> None:
+        self._items.append(item)
+
+    def _popleft(self) -> Tuple[float, str, agent_pb2.Server.AgentMessage]:
+        return self._items.popleft()
+
+    def _drop(self) -> Tuple[float, str, agent_pb2.Server.AgentMessage]:
+        """Remove a message to make room for a new one."""
+        return self._items.popleft()
+
+    def _rejects(self, case: str) -> bool:
+        return self.policy == OverflowPolicy.REJECT and (self.reject_cases is None or case in self.reject_cases)
+
+    async def put(self, case: str, msg: agent_pb2.Server.AgentMessage) -> bool:
+        """
+        Add a message to the queue, applying the overflow policy if the queue is full.
+
+        :param case: the payload case of the message.
+        :param msg: the message.
+        :return: ``False`` if the message was rejected, ``True`` otherwise.
+        """
+        self.stats.received += 1
+        if self._size >= self.capacity:
+            if self.policy == OverflowPolicy.DROP_OLDEST:
+                _, dropped_case, _ = self._drop()
+                self._size -= 1
+                self.stats.dropped[dropped_case] += 1
+            elif self._rejects(case):
+                self.stats.rejected[case] += 1
+                return False
+            else:
+                while self._size >= self.capacity:
+                    self._putter = asyncio.get_event_loop().create_future()
+                    await self._putter
+        self._size += 1
+        self._append((time.monotonic(), case, msg))
+        if self._size > self.stats.max_depth:
+            self.stats.max_depth = self._size
+        self._getter = _wake(self._getter)
+        return True
+
+    async def get(self) -> Optional[Tuple[str, agent_pb2.Server.AgentMessage]]:
+        """
+        Wait for the next message.
+
+        :return: the payload case and the message, or ``None`` if the queue is closed and empty.
+        """
+        while not self._size:
+            if self._closed:
+                return None
+            self._getter = asyncio.get_event_loop().create_future()
+            await self._getter
+        enqueued_at, case, msg = self._popleft()
+        self._size -= 1
+        self._putter = _wake(self._putter)
+
+        wait = time.monotonic() - enqueued_at
+        stats = self.stats
+        stats.dispatched += 1
+        stats.total_wait += wait
+        if wait > stats.max_wait:
+            stats.max_wait = wait
+        return case, msg
+
+    def close(self) -> None:
+        """Signal that no more messages will be added. The waiting messages can still be read."""
+        self._closed = True
+        self._getter = _wake(self._getter)
+
+
+def _is_dialogue_case(case: str) -> bool:
+    return case.startswith("content.") or case.startswith("fipa.")
+
+
+class FairInboundQueue(InboundQueue):
+    """
+    An inbound queue that shares the agent between the counterparties.
+
+    Messages from other agents are queued by origin (``msg.content.origin``), and the origins are served in
+    deficit round-robin: in its turn, an origin gets as many messages dispatched as its weight.
+    All the other messages (search results, errors, pings, ...) have priority over them.
+    The number of messages waiting from a single origin can be limited: beyond the limit,
+    the oldest message of that origin is dropped.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_INBOUND_CAPACITY,
+                 policy: OverflowPolicy = OverflowPolicy.BLOCK,
+                 reject_cases: Optional[Iterable[str]] = None,
+                 default_weight: int = 1,
+                 weights: Optional[Dict[str, int]] = None,
+                 default_limit: Optional[int] = None,
+                 limits: Optional[Dict[str, int]] = None) -> None:
+        """
+        Initialize the queue.
+
+        :param capacity: see :class:`~oef.inbound.InboundQueue`.
+        :param policy: see :class:`~oef.inbound.InboundQueue`. When messages must be dropped,
+                     | they are taken from the origin with the most messages waiting.
+        :param reject_cases: see :class:`~oef.inbound.InboundQueue`.
+        :param default_weight: the number of messages dispatched per turn for an origin.
+        :param weights: the weight of specific origins.
+        :param default_limit: the maximum number of messages waiting from an origin. By default, no limit.
+        :param limits: the limit of specific origins.
+        :raises ValueError: if a weight or a limit is not positive.
+        """
+        super().__init__(capacity, policy, reject_cases)
+        weights = dict(weights or {})
+        limits = dict(limits or {})
+        if any(w <= 0 for w in list(weights.values()) + [default_weight]) or \
+                any(l is not None and l <= 0 for l in list(limits.values()) + [default_limit]):
+            raise ValueError("Invalid input value for type '{}': weights and limits must be positive."
+                             .format(type(self).__name__))
+        self.default_weight = default_weight
+        self.weights = weights
+        self.default_limit = default_limit
+        self.limits = limits
+        self._by_origin = {}  # type: Dict[str, deque]
+        self._active = deque()
+        self._served = 0
+
+    def _append(self, item: Tuple[float, str, agent_pb2.Server.AgentMessage]) -> None:
+        if not _is_dialogue_case(item[1]):
+            self._items.append(item)
+            return
+        origin = item[2].content.origin
+        queue = self._by_origin.get(origin)
+        if queue is None:
+            queue = self._by_origin[origin] = deque()
+            self._active.append(origin)
+        queue.append(item)
+        limit = self.limits.get(origin, self.default_limit)
+        if limit is not None and len(queue) > limit:
+            _, dropped_case, _ = queue.popleft()
+            self._size -= 1
+            self.stats.dropped[dropped_case] += 1
+
+    def _remove_origin(self, origin: str) -> None:
+        del self._by_origin[origin]
+        if self._active[0] == origin:
+            self._active.popleft()
+            self._served = 0
+        else:
+            self._active.remove(origin)
+
+    def _popleft(self) -> Tuple[float, str, agent_pb2.Server.AgentMessage]:
+        if self._items:
+            return self._items.popleft()
+        origin = self._active[0]
+        queue = self._by_origin[origin]
+        item = queue.popleft()
+        self._served += 1
+        if not queue:
+            self._remove_origin(origin)
+        elif self._served >= self.weights.get(origin, self.default_weight):
+            self._active.rotate(-1)
+            self._served = 0
+        return item
+
+    def _drop(self) -> Tuple[float, str, agent_pb2.Server.AgentMessage]:
+        if not self._by_origin:
+            return self._items.popleft()
+        origin = max(self._by_origin, key=lambda o: len(self._by_origin[o]))
+        queue = self._by_origin[origin]
+        item = queue.popleft()
+        if not queue:
+            self._remove_origin(origin)
+        return item
+
+    def pending(self, origin: str) -> int:
+        """The number of messages waiting from an origin."""
+        queue = self._by_origin.get(origin)
+        return len(queue) if queue is not None else 0
@@ -27,16 +27,31 @@ This module contains classes to manage serialization of data in Protobuf message
 
 from abc import ABC, abstractmethod
 from enum import Enum
-from typing import Union, List
+from typing import Union, List, Optional
 
 from protocol.src.proto import agent_pb2, fipa_pb2
-from oef.src.python.query import Query
+from oef.src.python.query import Query, BoundQuery
 from oef.src.python.schema import Description
 from utils.src.python import uri
 
 NoneType = type(None)
 CFP_TYPES = Union[bytes, NoneType]
 PROPOSE_TYPES = Union[bytes, List[Description]]
+QUERY_TYPES = Union[Query, BoundQuery]
+
+
+def _set_query(target, query: QUERY_TYPES) -> None:
+    """
+    Fill a query field of a Protobuf message.
+    A :class:`~oef.query.BoundQuery` is already serialized, so it is parsed in place.
+    :param target: the ``ConstructQueryObjectRequest`` field to fill.
+    :param query: the query.
+    :return: ``None``
+    """
+    if isinstance(query, BoundQuery):
+        target.MergeFromString(query.serialized)
+    else:
+        target.CopyFrom(query.to_pb())
 
 
 class OEFErrorOperation(Enum):
@@ -182,7 +197,7 @@ class SearchAgents(BaseMessage):
     It is used in the method :func:`~oef.agents.Agent.search_agents`.
     """
 
-    def __init__(self, msg_id: int, query: Query):
+    def __init__(self, msg_id: int, query: QUERY_TYPES):
         """
         Initialize a SearchAgents message.
         :param msg_id: the identifier of the message.
@@ -194,7 +209,7 @@ class SearchAgents(BaseMessage):
     def to_pb(self) -> agent_pb2.Envelope:
         envelope = agent_pb2.Envelope()
         envelope.msg_id = self.msg_id
-        envelope.search_agents.query_v2.CopyFrom(self.query.to_pb())
+        _set_query(envelope.search_agents.query_v2, self.query)
         return envelope
 
 
@@ -210,7 +225,7 @@ class SearchServices(BaseMessage):
     It is used in the method :func:`~oef.agents.Agent.search_services`.
     """
 
-    def __init__(self, msg_id: int, query: Query):
+    def __init__(self, msg_id: int, query: QUERY_TYPES):
         """
         Initialize a SearchServices message.
         :param msg_id: the identifier of the message.
@@ -222,7 +237,7 @@ class SearchServices(BaseMessage):
     def to_pb(self) -> agent_pb2.Envelope:
         envelope = agent_pb2.Envelope()
         envelope.msg_id = self.msg_id
-        envelope.search_services.query_v2.CopyFrom(self.query.to_pb())
+        _set_query(envelope.search_services.query_v2, self.query)
         return envelope
 
 
@@ -239,7 +254,7 @@ class SearchServicesWide(BaseMessage):
     It is used in the method :func:`~oef.core.OEFCoreInterface.search_services_wide`.
     """
 
-    def __init__(self, msg_id: int, query: Query):
+    def __init__(self, msg_id: int, query: QUERY_TYPES):
         """
         Initialize a SearchServices message.
         :param msg_id: the identifier of the message.
@@ -251,7 +266,7 @@ class SearchServicesWide(BaseMessage):
     def to_pb(self) -> agent_pb2.Envelope:
         envelope = agent_pb2.Envelope()
         envelope.msg_id = self.msg_id
-        envelope.search_services_wide.query_v2.CopyFrom(self.query.to_pb())
+        _set_query(envelope.search_services_wide.query_v2, self.query)
         return envelope
 
 
@@ -342,7 +357,7 @@ class Message(AgentMessage):
                  dialogue_id: int,
                  destination: str,
                  msg: bytes,
-                 context: uri.Context):
+                 context: Optional[uri.Context] = None):
         """
         Initialize a simple message.
         :param msg_id: the identifier of the message.
@@ -361,8 +376,9 @@ class Message(AgentMessage):
         agent_msg.dialogue_id = self.dialogue_id
         agent_msg.destination = self.destination
         agent_msg.content = self.msg
-        agent_msg.source_uri = self.context.sourceURI.toString()
-        agent_msg.target_uri = self.context.targetURI.toString()
+        if self.context is not None:
+            agent_msg.source_uri = self.context.sourceURI.toString()
+            agent_msg.target_uri = self.context.targetURI.toString()
 
         envelope = agent_pb2.Envelope()
         envelope.msg_id = self.msg_id
@@ -389,7 +405,7 @@ class CFP(AgentMessage):
                  destination: str,
                  target: int,
                  query: CFP_TYPES,
-                 context: uri.Context):
+                 context: Optional[uri.Context] = None):
         """
         Initialize a `Call For Proposal` message.
         :param msg_id: the unique identifier of the message in the dialogue denoted by ``dialogue_id``.
@@ -419,8 +435,9 @@ class CFP(AgentMessage):
         agent_msg.dialogue_id = self.dialogue_id
         agent_msg.destination = self.destination
         agent_msg.fipa.CopyFrom(fipa_msg)
-        agent_msg.source_uri = self.context.sourceURI.toString()
-        agent_msg.target_uri = self.context.targetURI.toString()
+        if self.context is not None:
+            agent_msg.source_uri = self.context.sourceURI.toString()
+            agent_msg.target_uri = self.context.targetURI.toString()
 
         envelope = agent_pb2.Envelope()
         envelope.msg_id = self.msg_id
@@ -447,7 +464,7 @@ class Propose(AgentMessage):
                  destination: str,
                  target: int,
                  proposals: PROPOSE_TYPES,
-                 context: uri.Context):
+                 context: Optional[uri.Context] = None):
         """
         Initialize a `Propose` message.
         :param msg_id: the unique identifier of the message in the dialogue denoted by ``dialogue_id``.
@@ -476,22 +493,19 @@ class Propose(AgentMessage):
                 serialized = p.to_pb().SerializeToString()
                 po = proposals_pb.objects.add()
                 po.ParseFromString(serialized)
-                print("**", p.to_pb())
-            #proposals_pb.objects.extend([propose.to_pb() for propose in self.proposals])
-            #print(self.proposals)
             propose.proposals.CopyFrom(proposals_pb)
         fipa_msg.propose.CopyFrom(propose)
         agent_msg = agent_pb2.Agent.Message()
         agent_msg.dialogue_id = self.dialogue_id
         agent_msg.destination = self.destination
         agent_msg.fipa.CopyFrom(fipa_msg)
-        agent_msg.source_uri = self.context.sourceURI.toString()
-        agent_msg.target_uri = self.context.targetURI.toString()
+        if self.context is not None:
+            agent_msg.source_uri = self.context.sourceURI.toString()
+            agent_msg.target_uri = self.context.targetURI.toString()
 
         envelope = agent_pb2.Envelope()
         envelope.msg_id = self.msg_id
         envelope.send_message.CopyFrom(agent_msg)
-        print("****", envelope)
         return envelope
 
 
@@ -512,7 +526,7 @@ class Accept(AgentMessage):
                  dialogue_id: int,
                  destination: str,
                  target: int,
-                 context: uri.Context):
+                 context: Optional[uri.Context] = None):
         """
         Initialize an `Accept` message.
         :param dialogue_id: the identifier of the dialogue.
@@ -535,8 +549,9 @@ class Accept(AgentMessage):
         agent_msg.dialogue_id = self.dialogue_id
         agent_msg.destination = self.destination
         agent_msg.fipa.CopyFrom(fipa_msg)
-        agent_msg.source_uri = self.context.sourceURI.toString()
-        agent_msg.target_uri = self.context.targetURI.toString()
+        if self.context is not None:
+            agent_msg.source_uri = self.context.sourceURI.toString()
+            agent_msg.target_uri = self.context.targetURI.toString()
 
         envelope = agent_pb2.Envelope()
         envelope.msg_id = self.msg_id
@@ -561,7 +576,7 @@ class Decline(AgentMessage):
                  dialogue_id: int,
                  destination: str,
                  target: int,
-                 context: uri.Context):
+                 context: Optional[uri.Context] = None):
         """
         Initialize a `Decline` message.
         :param dialogue_id: the identifier of the dialogue.
@@ -585,8 +600,9 @@ class Decline(AgentMessage):
         agent_msg.dialogue_id = self.dialogue_id
         agent_msg.destination = self.destination
         agent_msg.fipa.CopyFrom(fipa_msg)
-        agent_msg.source_uri = self.context.sourceURI.toString()
-        agent_msg.target_uri = self.context.targetURI.toString()
+        if self.context is not None:
+            agent_msg.source_uri = self.context.sourceURI.toString()
+            agent_msg.target_uri = self.context.targetURI.toString()
 
         envelope = agent_pb2.Envelope()
         envelope.msg_id = self.msg_id
@@ -0,0 +1,340 @@
+# -*- coding: utf-8 -*-
+
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2018 Fetch.AI Limited
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+
+"""
+oef.metrics
+~~~~~~~~~~~
+This module contains a small metrics registry (counters, gauges and histograms), with a snapshot API
+and an exporter in the Prometheus text format, and the instrumentation of the proxies.
+
+The instrumentation is disabled by default. Enable it with :func:`~oef.core.OEFProxy.enable_metrics`.
+"""
+
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, Optional, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from http.server import ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+"""the default buckets of the histograms, in seconds"""
+DEFAULT_BUCKETS = (0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0)
+
+LABELS = Tuple[Tuple[str, str], ...]
+
+"""the time (in seconds) after which a search without result is no longer counted as pending"""
+DEFAULT_SEARCH_TIMEOUT = 300.0
+MAX_PENDING_SEARCHES = 10000
+
+
+class Counter:
+    """A monotonically increasing value."""
+
+    __slots__ = ("value",)
+
+    def __init__(self) -> None:
+        self.value = 0
+
+    def inc(self, amount: float = 1) -> None:
+        self.value += amount
+
+
+class Gauge:
+    """A value that can go up and down, either set explicitly or read from a function when collected."""
+
+    __slots__ = ("_value", "_function")
+
+    def __init__(self, function: Optional[Callable[[], float]] = None) -> None:
+        self._value = 0
+        self._function = function
+
+    def set(self, value: float) -> None:
+        self._value = value
+
+    @property
+    def value(self) -> float:
+        if self._function is not None:
+            try:
+                return self._function()
+            except Exception as e:
+                logger.debug("Gauge function failed: {}".format(e))
+                return float("nan")
+        return self._value
+
+
+class Histogram:
+    """The distribution of observed values, in cumulative buckets (as in Prometheus)."""
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> Dict[float, int]:
+        """The number of observations less than or equal to each bucket bound (the last one is infinity)."""
+        result = {}
+        total = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            total += count
+            result[bound] = total
+        return result
+
+
+class MetricsRegistry:
+    """
+    A collection of named metrics, each with a set of labels.
+    Getting a metric creates it the first time: callers on hot paths should keep a reference to it.
+    """
+
+    def __init__(self) -> None:
+        self._metrics = {}  # type: Dict[str, Tuple[str, str, Dict[LABELS, object]]]
+        self._lock = threading.Lock()
+        self._server = None
+
+    def _get(self, kind: str, name: str, description: str, labels: Dict[str, str], factory: Callable):
+        key = tuple(sorted((k, str(v)) for k, v in labels.items()))
+        with self._lock:
+            entry = self._metrics.get(name)
+            if entry is None:
+                entry = self._metrics[name] = (kind, description, {})
+            elif entry[0] != kind:
+                raise ValueError("Invalid input value for type '{}': metric {} is a {}, not a {}."
+                                 .format(type(self).__name__, name, entry[0], kind))
+            metric = entry[2].get(key)
+            if metric is None:
+                metric = entry[2][key] = factory()
+            return metric
+
+    def counter(self, name: str, description: str = "", **labels) -> Counter:
+        return self._get("counter", name, description, labels, Counter)
+
+    def gauge(self, name: str, description: str = "", function: Optional[Callable[[], float]] = None,
+              **labels) -> Gauge:
+        return self._get("gauge", name, description, labels, lambda: Gauge(function))
+
+    def histogram(self, name: str, description: str = "", buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+                  **labels) -> Histogram:
+        return self._get("histogram", name, description, labels, lambda: Histogram(buckets))
+
+    def snapshot(self) -> Dict[str, Dict[LABELS, object]]:
+        """
+        The current values of all the metrics.
+
+        :return: for every metric name, a dictionary from the labels (a sorted tuple of pairs) to the value.
+               | Histograms are reported as ``{"count": ..., "sum": ..., "buckets": {bound: cumulative count}}``.
+        """
+        result = {}
+        with self._lock:
+            metrics = [(name, kind, dict(values)) for name, (kind, _, values) in self._metrics.items()]
+        for name, kind, values in metrics:
+            if kind == "histogram":
+                result[name] = {labels: {"count": h.count, "sum": h.sum, "buckets": h.cumulative()}
+                                for labels, h in values.items()}
+            else:
+                result[name] = {labels: m.value for labels, m in values.items()}
+        return result
+
+    def to_prometheus(self) -> str:
+        """The current values of all the metrics, in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            metrics = [(name, kind, description, dict(values))
+                       for name, (kind, description, values) in sorted(self._metrics.items())]
+        for name, kind, description, values in metrics:
+            if description:
+                lines.append("# HELP {} {}".format(name, description))
+            lines.append("# TYPE {} {}".format(name, kind))
+            for labels, metric in sorted(values.items()):
+                if kind == "histogram":
+                    for bound, count in metric.cumulative().items():
+                        le = "+Inf" if bound == float("inf") else repr(bound)
+                        lines.append("{}_bucket{} {}".format(name, _format_labels(labels + (("le", le),)), count))
+                    lines.append("{}_sum{} {}".format(name, _format_labels(labels), metric.sum))
+                    lines.append("{}_count{} {}".format(name, _format_labels(labels), metric.count))
+                else:
+                    lines.append("{}{} {}".format(name, _format_labels(labels), metric.value))
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port: int, host: str = "127.0.0.1") -> "ThreadingHTTPServer":
+        """
+        Serve the metrics in the Prometheus text format over HTTP, from a daemon thread.
+
+        :param port: the port to listen on (0 to pick a free one).
+        :param host: the address to listen on. By default, only local connections are accepted.
+        :return: the server. Its ``server_address`` gives the actual port.
+        """
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = registry.to_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, name="metrics-exporter", daemon=True).start()
+        return self._server
+
+    def stop_serving(self) -> None:
+        """Stop the HTTP exporter, if it is running."""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+def merge_snapshots(snapshots: Iterable[Dict[str, Dict[LABELS, object]]]) -> Dict[str, Dict[LABELS, object]]:
+    """
+    Add up snapshots of the same metrics (see :func:`~oef.metrics.MetricsRegistry.snapshot`),
+    e.g. taken in several processes. Counters and gauges are summed, and so are the histograms, bucket by bucket.
+
+    :param snapshots: the snapshots.
+    :return: the merged snapshot.
+    """
+    result = {}  # type: Dict[str, Dict[LABELS, object]]
+    for snapshot in snapshots:
+        for name, values in snapshot.items():
+            merged = result.setdefault(name, {})
+            for labels, value in values.items():
+                current = merged.get(labels)
+                if isinstance(value, dict):
+                    if current is None:
+                        current = merged[labels] = {"count": 0, "sum": 0.0, "buckets": {}}
+                    current["count"] += value["count"]
+                    current["sum"] += value["sum"]
+                    for bound, count in value["buckets"].items():
+                        current["buckets"][bound] = current["buckets"].get(bound, 0) + count
+                else:
+                    merged[labels] = value if current is None else current + value
+    return result
+
+
+def _format_labels(labels: LABELS) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join('{}="{}"'.format(k, v.replace("\\", "\\\\").replace('"', '\\"')) for k, v in labels) + "}"
+
+
+class ProxyMetrics:
+    """
+    The instrumentation of a proxy. The proxies only call it when metrics are enabled,
+    and it keeps references to its metrics, so that recording a value is a few attribute accesses.
+    """
+
+    def __init__(self, registry: MetricsRegistry, search_timeout: float = DEFAULT_SEARCH_TIMEOUT) -> None:
+        """
+        Initialize the instrumentation.
+
+        :param registry: the registry of the metrics.
+        :param search_timeout: the time (in seconds) after which a search that the node did not answer is no longer
+                             | pending. At most :data:`~oef.metrics.MAX_PENDING_SEARCHES` searches are pending.
+        """
+        self.registry = registry
+        self.search_timeout = search_timeout
+        self.pending_searches = OrderedDict()  # type: Dict[int, float]
+        self._inbound = {}
+        self._outbound = {}
+        self._handlers = {}
+        self._last_ping = None
+        self._ping_interval = registry.histogram("oef_ping_interval_seconds", "Time between two pings from the node.")
+        self._pong_latency = registry.histogram("oef_pong_latency_seconds",
+                                                "Time between the reception of a ping and the sending of the pong.")
+        registry.gauge("oef_pending_searches", "Searches sent without result yet.",
+                       function=lambda: len(self.pending_searches))
+
+    def received(self, case: str, size: int, decode_time: float) -> None:
+        """Record a frame received from the OEF Node."""
+        metrics = self._inbound.get(case)
+        if metrics is None:
+            registry = self.registry
+            metrics = self._inbound[case] = (
+                registry.counter("oef_frames_in_total", "Frames received, by payload case.", case=case),
+                registry.counter("oef_bytes_in_total", "Bytes received, by payload case.", case=case),
+                registry.histogram("oef_decode_seconds", "Decoding time of the received frames.", case=case))
+        frames, size_counter, decode = metrics
+        frames.value += 1
+        size_counter.value += size
+        decode.observe(decode_time)
+        if case == "ping":
+            now = time.perf_counter()
+            if self._last_ping is not None:
+                self._ping_interval.observe(now - self._last_ping)
+            self._last_ping = now
+
+    def sent(self, case: str, msg_id: int, size: int, encode_time: float) -> None:
+        """Record a frame sent to the OEF Node."""
+        metrics = self._outbound.get(case)
+        if metrics is None:
+            registry = self.registry
+            metrics = self._outbound[case] = (
+                registry.counter("oef_frames_out_total", "Frames sent, by payload case.", case=case),
+                registry.counter("oef_bytes_out_total", "Bytes sent, by payload case.", case=case),
+                registry.histogram("oef_encode_seconds", "Encoding time of the sent frames.", case=case))
+        frames, size_counter, encode = metrics
+        frames.value += 1
+        size_counter.value += size
+        encode.observe(encode_time)
+        if case == "pong" and self._last_ping is not None:
+            self._pong_latency.observe(time.perf_counter() - self._last_ping)
+        elif case is not None and case.startswith("search_"):
+            self._add_pending_search(msg_id)
+
+    def _add_pending_search(self, msg_id: int) -> None:
+        pending = self.pending_searches
+        now = time.monotonic()
+        pending.pop(msg_id, None)
+        pending[msg_id] = now
+        # the oldest searches first: drop those never answered, e.g. sent before a reconnection
+        while pending:
+            oldest_id, sent_at = next(iter(pending.items()))
+            if now - sent_at <= self.search_timeout and len(pending) <= MAX_PENDING_SEARCHES:
+                break
+            del pending[oldest_id]
+
+    def handled(self, handler: str, case: str, answer_id: int, elapsed: float) -> None:
+        """Record the execution of a handler of the agent."""
+        histogram = self._handlers.get(handler)
+        if histogram is None:
+            histogram = self._handlers[handler] = self.registry.histogram(
+                "oef_handler_seconds", "Execution time of the handlers of the agent.", handler=handler)
+        histogram.observe(elapsed)
+        if case in ("agents", "agents_wide", "oef_error"):
+            self.pending_searches.pop(answer_id, None)
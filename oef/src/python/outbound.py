@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2018 Fetch.AI Limited
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+
+"""
+oef.outbound
+~~~~~~~~~~~~
+This module contains the scheduler of the frames sent to the OEF Node by :class:`~oef.proxy.OEFNetworkProxy`.
+
+Frames are written to the connection as long as its write buffer is below a high-water mark.
+Above it, they wait in one queue per :class:`~oef.outbound.Priority`, and when the buffer drains
+the most urgent frames are written first. A frame is never split, since the protocol has no
+continuation frames: the high-water mark bounds how much bulk data can be ahead of an urgent frame.
+"""
+
+import asyncio
+import logging
+from collections import Counter, deque
+from enum import IntEnum
+from typing import Optional
+
+from protocol.src.proto import agent_pb2
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_OUTBOUND_HIGH_WATER = 64 * 1024
+
+
+class Priority(IntEnum):
+    """The priority classes of the outgoing frames, from the most urgent."""
+    CONTROL = 0       # pongs and handshake
+    NEGOTIATION = 1   # FIPA messages: CFP, Propose, Accept, Decline
+    DIRECTORY = 2     # registrations and searches
+    BULK = 3          # simple messages, with arbitrary content
+
+
+def envelope_priority(msg) -> Priority:
+    """
+    The priority of a message sent to the OEF Node.
+
+    :param msg: the protobuf message.
+    :return: its priority class.
+    """
+    if not isinstance(msg, agent_pb2.Envelope):
+        return Priority.CONTROL
+    case = msg.WhichOneof("payload")
+    if case == "send_message":
+        return Priority.NEGOTIATION if msg.send_message.WhichOneof("payload") == "fipa" else Priority.BULK
+    if case == "pong":
+        return Priority.CONTROL
+    return Priority.DIRECTORY
+
+
+class OutboundStats:
+    """Counters of an :class:`~oef.outbound.OutboundScheduler`."""
+
+    def __init__(self) -> None:
+        self.sent = Counter()
+        self.deferred = Counter()
+        self.max_depth = 0
+
+    def __repr__(self):
+        return "OutboundStats(sent={}, deferred={}, max_depth={})".format(dict(self.sent), dict(self.deferred),
+                                                                           self.max_depth)
+
+
+class OutboundScheduler:
+    """Writes frames to a :class:`asyncio.StreamWriter`, by priority when the connection is congested."""
+
+    def __init__(self, writer: asyncio.StreamWriter, loop: Optional[asyncio.AbstractEventLoop] = None,
+                 high_water: int = DEFAULT_OUTBOUND_HIGH_WATER) -> None:
+        """
+        Initialize the scheduler.
+
+        :param writer: the writer of the connection.
+        :param loop: the event loop.
+        :param high_water: the size (in bytes) of the write buffer above which frames are queued.
+        """
+        self._writer = writer
+        self._transport = writer.transport
+        self._transport.set_write_buffer_limits(high=high_water)
+        self._loop = loop if loop is not None else asyncio.get_event_loop()
+        self.high_water = high_water
+        self.stats = OutboundStats()
+        self._queues = None  # created when the connection is first congested
+        self._pending = 0
+        self._task = None
+
+    @property
+    def depth(self) -> int:
+        """The number of frames waiting to be written."""
+        return self._pending
+
+    def send(self, frame: bytes, priority: Priority) -> None:
+        """
+        Send a frame: write it now if the connection is not congested, queue it otherwise.
+
+        :param frame: the frame, with its length prefix.
+        :param priority: its priority.
+        :return: ``None``
+        """
+        self.stats.sent[priority] += 1
+        if not self._pending and self._transport.get_write_buffer_size() < self.high_water:
+            self._writer.write(frame)
+            return
+        if self._queues is None:
+            self._queues = [deque() for _ in Priority]
+        self._queues[priority].append(frame)
+        self._pending += 1
+        self.stats.deferred[priority] += 1
+        if self._pending > self.stats.max_depth:
+            self.stats.max_depth = self._pending
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._write_queued(), loop=self._loop)
+
+    def _pop(self) -> bytes:
+        for queue in self._queues:
+            if queue:
+                self._pending -= 1
+                return queue.popleft()
+
+    async def _write_queued(self) -> None:
+        try:
+            while self._pending:
+                # wait for the buffer to go below the low-water mark, then write the most urgent frame
+                await self._writer.drain()
+                self._writer.write(self._pop())
+        except ConnectionError as e:
+            logger.warning("Connection lost with {} frames still queued: {}".format(self._pending, e))
+            self._queues = None
+            self._pending = 0
+        finally:
+            self._task = None
+
+    async def flush(self) -> None:
+        """Wait until all the queued frames have been written to the connection."""
+        while self._task is not None:
+            await asyncio.shield(self._task)
@@ -0,0 +1,369 @@
+# -*- coding: utf-8 -*-
+
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2018 Fetch.AI Limited
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+
+"""
+oef.parallel
+~~~~~~~~~~~~
+This module evaluates many queries over a large set of descriptions, in parallel over a pool of processes.
+The descriptions are stored by column in shared memory (:mod:`multiprocessing.shared_memory`, Python 3.8+),
+so the worker processes read them without any copy or pickling.
+"""
+
+import logging
+import math
+from array import array
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Tuple
+
+from oef.src.python.query import Query, ConstraintExpr, Constraint, And, Or, Not, Eq, NotEq, Lt, LtEq, Gt, GtEq, \
+    Range, In, NotIn, Distance
+from oef.src.python.schema import Description
+from protocol.src.python.Wrappers import Location
+from utils.src.python.helpers import haversine
+
+logger = logging.getLogger(__name__)
+
+"""mapping from attribute types to the array typecode of their column"""
+_COLUMN_TYPECODES = {
+    bool: "b",
+    int: "q",
+    float: "d",
+    str: "i",       # index in the sorted table of the distinct strings of the column
+    Location: "d",  # latitude and longitude, interleaved
+}
+
+_RELATION_KINDS = {Eq: "eq", NotEq: "ne", Lt: "lt", LtEq: "le", Gt: "gt", GtEq: "ge"}
+
+
+def _align(offset: int) -> int:
+    return (offset + 7) // 8 * 8
+
+
+class ColumnarDescriptions:
+    """
+    A set of descriptions stored by column in shared memory.
+
+    Every ``(attribute name, attribute type)`` pair has its own segment, containing a presence mask followed
+    by the values. Strings are replaced by their index in the sorted table of the distinct strings of the column,
+    so that every string comparison becomes an integer comparison in the workers.
+    """
+
+    def __init__(self, descriptions: List[Description]) -> None:
+        """
+        Copy the values of the descriptions into shared memory segments.
+
+        :param descriptions: the descriptions. The index of a description in this list identifies it in the results.
+        """
+        self._size = len(descriptions)
+        self._segments = {}  # type: Dict[Tuple[str, type], shared_memory.SharedMemory]
+        self._string_tables = {}  # type: Dict[str, List[str]]
+
+        values_by_column = {}
+        for row, description in enumerate(descriptions):
+            for name, value in description.values.items():
+                values_by_column.setdefault((name, type(value)), []).append((row, value))
+
+        for (name, value_type), values in values_by_column.items():
+            if value_type not in _COLUMN_TYPECODES:
+                raise ValueError("Invalid input value for type '{}': attribute {} has unsupported type {}."
+                                 .format(type(self).__name__, name, value_type))
+            self._segments[(name, value_type)] = self._create_segment(name, value_type, values)
+
+    def _create_segment(self, name: str, value_type: type, values: List[Tuple[int, object]]) \
+            -> shared_memory.SharedMemory:
+        n = self._size
+        presence = bytearray(n)
+        if value_type == Location:
+            column = array("d", bytes(16 * n))
+            for row, value in values:
+                presence[row] = 1
+                column[2 * row] = value.latitude
+                column[2 * row + 1] = value.longitude
+        elif value_type == str:
+            table = sorted(set(value for _, value in values))
+            self._string_tables[name] = table
+            codes = {s: i for i, s in enumerate(table)}
+            column = array("i", bytes(4 * n))
+            for row, value in values:
+                presence[row] = 1
+                column[row] = codes[value]
+        else:
+            column = array(_COLUMN_TYPECODES[value_type], bytes(array(_COLUMN_TYPECODES[value_type]).itemsize * n))
+            for row, value in values:
+                presence[row] = 1
+                column[row] = value
+
+        data = column.tobytes()
+        offset = _align(n)
+        segment = shared_memory.SharedMemory(create=True, size=max(1, offset + len(data)))
+        segment.buf[:n] = presence
+        segment.buf[offset:offset + len(data)] = data
+        return segment
+
+    def __len__(self):
+        return self._size
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @property
+    def layout(self) -> List[Tuple[str, str, str, int]]:
+        """The information the workers need to attach to the segments: ``(name, type name, segment name, size)``."""
+        return [(name, value_type.__name__, segment.name, self._size)
+                for (name, value_type), segment in self._segments.items()]
+
+    def close(self) -> None:
+        """Release the shared memory segments."""
+        for segment in self._segments.values():
+            segment.close()
+            segment.unlink()
+        self._segments = {}
+
+    def compile(self, query: Query) -> Tuple:
+        """
+        Compile a query into a program for the workers. String operands are resolved
+        against the string tables of the columns, which therefore never leave this process.
+
+        :param query: the query to compile.
+        :return: the program, made only of tuples and plain values.
+        """
+        return "all", [self._compile(c) for c in query.constraints]
+
+    def _compile(self, expr: ConstraintExpr) -> Tuple:
+        if isinstance(expr, And):
+            return "all", [self._compile(c) for c in expr.constraints]
+        if isinstance(expr, Or):
+            return "any", [self._compile(c) for c in expr.constraints]
+        if isinstance(expr, Not):
+            return "not", self._compile(expr.constraint)
+        if isinstance(expr, Constraint):
+            return self._compile_constraint(expr)
+        raise ValueError("Invalid input value for type '{}': cannot compile {}."
+                         .format(type(self).__name__, type(expr).__name__))
+
+    def _compile_constraint(self, constraint: Constraint) -> Tuple:
+        name = constraint.attribute_name
+        constraint_type = constraint.constraint
+        value_type = constraint_type._get_type()
+        column = (name, value_type.__name__)
+        if (name, value_type) not in self._segments:
+            return "false",
+
+        if isinstance(constraint_type, Distance):
+            center = constraint_type.center
+            return "distance", column, (center.latitude, center.longitude, constraint_type.distance)
+        if value_type == str:
+            return self._compile_string_constraint(column, self._string_tables[name], constraint_type)
+        if value_type == Location:
+            if isinstance(constraint_type, (Eq, NotEq)):
+                value = constraint_type.value
+                return _RELATION_KINDS[type(constraint_type)], column, (value.latitude, value.longitude)
+            if isinstance(constraint_type, (In, NotIn)):
+                kind = "in" if isinstance(constraint_type, In) else "not_in"
+                return kind, column, frozenset((v.latitude, v.longitude) for v in constraint_type.values)
+            raise ValueError("Invalid input value for type '{}': locations are not ordered."
+                             .format(type(self).__name__))
+
+        if isinstance(constraint_type, Range):
+            return "range", column, tuple(constraint_type.values)
+        if isinstance(constraint_type, (In, NotIn)):
+            kind = "in" if isinstance(constraint_type, In) else "not_in"
+            return kind, column, frozenset(constraint_type.values)
+        return _RELATION_KINDS[type(constraint_type)], column, constraint_type.value
+
+    @staticmethod
+    def _compile_string_constraint(column: Tuple[str, str], table: List[str], constraint_type) -> Tuple:
+        if isinstance(constraint_type, (Eq, NotEq)):
+            value = constraint_type.value
+            i = bisect_left(table, value)
+            code = i if i < len(table) and table[i] == value else -1
+            return ("eq" if isinstance(constraint_type, Eq) else "ne"), column, code
+        if isinstance(constraint_type, Lt):
+            return "lt", column, bisect_left(table, constraint_type.value)
+        if isinstance(constraint_type, LtEq):
+            return "lt", column, bisect_right(table, constraint_type.value)
+        if isinstance(constraint_type, Gt):
+            return "ge", column, bisect_right(table, constraint_type.value)
+        if isinstance(constraint_type, GtEq):
+            return "ge", column, bisect_left(table, constraint_type.value)
+        if isinstance(constraint_type, Range):
+            low, high = constraint_type.values
+            return "code_range", column, (bisect_left(table, low), bisect_right(table, high))
+        codes = frozenset(bisect_left(table, v) for v in constraint_type.values
+                          if bisect_left(table, v) < len(table) and table[bisect_left(table, v)] == v)
+        return ("in" if isinstance(constraint_type, In) else "not_in"), column, codes
+
+
+class _Column:
+    """A column attached in a worker process."""
+
+    _TYPES = {"bool": "b", "int": "q", "float": "d", "str": "i", "Location": "d"}
+
+    def __init__(self, type_name: str, segment_name: str, size: int):
+        self.segment = shared_memory.SharedMemory(name=segment_name)
+        typecode = self._TYPES[type_name]
+        length = 2 * size if type_name == "Location" else size
+        offset = _align(size)
+        self.present = self.segment.buf[:size]
+        self.values = self.segment.buf[offset:offset + length * array(typecode).itemsize].cast(typecode)
+
+
+def _predicate(program: Tuple, columns: Dict[Tuple[str, str], _Column]):
+    """
+    Turn a compiled program into a predicate over row indices.
+
+    :param program: the program produced by :func:`~oef.parallel.ColumnarDescriptions.compile`.
+    :param columns: the columns attached in this process.
+    :return: a function from a row index to ``bool``.
+    """
+    kind = program[0]
+    if kind == "all":
+        predicates = [_predicate(p, columns) for p in program[1]]
+        return lambda i: all(p(i) for p in predicates)
+    if kind == "any":
+        predicates = [_predicate(p, columns) for p in program[1]]
+        return lambda i: any(p(i) for p in predicates)
+    if kind == "not":
+        predicate = _predicate(program[1], columns)
+        return lambda i: not predicate(i)
+    if kind == "false":
+        return lambda i: False
+
+    column = columns[program[1]]
+    present, values, operand = column.present, column.values, program[2]
+    if program[1][1] == "Location":
+        if kind == "distance":
+            lat, lon, distance = operand
+            return lambda i: present[i] and haversine(lat, lon, values[2 * i], values[2 * i + 1]) <= distance
+        if kind == "eq":
+            return lambda i: present[i] and (values[2 * i], values[2 * i + 1]) == operand
+        if kind == "ne":
+            return lambda i: present[i] and (values[2 * i], values[2 * i + 1]) != operand
+        if kind == "in":
+            return lambda i: present[i] and (values[2 * i], values[2 * i + 1]) in operand
+        return lambda i: present[i] and (values[2 * i], values[2 * i + 1]) not in operand
+
+    if kind == "eq":
+        return lambda i: present[i] and values[i] == operand
+    if kind == "ne":
+        return lambda i: present[i] and values[i] != operand
+    if kind == "lt":
+        return lambda i: present[i] and values[i] < operand
+    if kind == "le":
+        return lambda i: present[i] and values[i] <= operand
+    if kind == "gt":
+        return lambda i: present[i] and values[i] > operand
+    if kind == "ge":
+        return lambda i: present[i] and values[i] >= operand
+    if kind == "range":
+        low, high = operand
+        return lambda i: present[i] and low <= values[i] <= high
+    if kind == "code_range":
+        low, high = operand
+        return lambda i: present[i] and low <= values[i] < high
+    if kind == "in":
+        return lambda i: present[i] and values[i] in operand
+    if kind == "not_in":
+        return lambda i: present[i] and values[i] not in operand
+    raise ValueError("Unknown program instruction: {}".format(kind))
+
+
+_worker_columns = {}  # type: Dict[Tuple[str, str], _Column]
+_worker_predicates = []
+
+
+def _init_worker(layout: List[Tuple[str, str, str, int]], programs: List[Tuple]) -> None:
+    global _worker_columns, _worker_predicates
+    _worker_columns = {(name, type_name): _Column(type_name, segment_name, size)
+                       for name, type_name, segment_name, size in layout}
+    _worker_predicates = [_predicate(p, _worker_columns) for p in programs]
+
+
+def _evaluate_chunk(start: int, end: int) -> List[bytes]:
+    """
+    Evaluate every query over the rows ``[start, end)``.
+
+    :return: for every query, the matching row indices packed as an ``array('q')``.
+    """
+    return [array("q", [i for i in range(start, end) if p(i)]).tobytes() for p in _worker_predicates]
+
+
+class ParallelQueryEvaluator:
+    """
+    Evaluate a list of queries over a :class:`~oef.parallel.ColumnarDescriptions` with a pool of processes.
+    The queries are compiled and sent to every worker once, when the pool starts. Each task is then just
+    a range of rows, and returns the indices of the matching rows.
+
+    Examples:
+        >>> descriptions = [Description({"price": p}) for p in range(10)]
+        >>> with ColumnarDescriptions(descriptions) as columns:
+        ...     with ParallelQueryEvaluator(columns, [Query([Constraint("price", Lt(3))])], max_workers=2) as e:
+        ...         e.run()
+        [[0, 1, 2]]
+    """
+
+    def __init__(self, columns: ColumnarDescriptions, queries: List[Query],
+                 max_workers: Optional[int] = None, chunk_size: Optional[int] = None) -> None:
+        """
+        Initialize the evaluator and start its process pool.
+
+        :param columns: the descriptions to match against.
+        :param queries: the queries to evaluate.
+        :param max_workers: the number of processes. By default, the number of CPUs.
+        :param chunk_size: the number of rows evaluated by a single task.
+                         | By default, four chunks per worker.
+        """
+        self.columns = columns
+        self.queries = queries
+        self._executor = ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                                             initargs=(columns.layout, [columns.compile(q) for q in queries]))
+        workers = self._executor._max_workers
+        self.chunk_size = chunk_size or max(1, math.ceil(len(columns) / (4 * workers)))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def run(self) -> List[List[int]]:
+        """
+        Evaluate the queries.
+
+        :return: for every query, the sorted indices of the matching descriptions.
+        """
+        n = len(self.columns)
+        starts = list(range(0, n, self.chunk_size))
+        ends = [min(start + self.chunk_size, n) for start in starts]
+        matches = [array("q") for _ in self.queries]
+        for chunk in self._executor.map(_evaluate_chunk, starts, ends):
+            for query_matches, packed in zip(matches, chunk):
+                query_matches.frombytes(packed)
+        return [m.tolist() for m in matches]
+
+    def close(self) -> None:
+        """Shut down the process pool."""
+        self._executor.shutdown()
@@ -26,19 +26,27 @@ This module defines the proxies classes used by agents to interact with an OEF N
 """
 
 import asyncio
+import functools
 import logging
+import os
 import struct
 import ssl
-from collections import defaultdict
+import time
+from collections import defaultdict, deque
 from typing import Optional, Awaitable, Tuple, List, Dict
 
 from protocol.src.proto import agent_pb2
 from utils.src.python import uri
 from oef.src.python.core import OEFProxy
+from oef.src.python.dispatch import PayloadHandler
 from oef.src.python.messages import Message, CFP_TYPES, PROPOSE_TYPES, CFP, Propose, Accept, Decline, BaseMessage, \
     AgentMessage, RegisterDescription, RegisterService, UnregisterDescription, \
     UnregisterService, SearchAgents, SearchServices, SearchServicesWide, OEFErrorOperation, SearchResult, \
     OEFErrorMessage, DialogueErrorMessage
+from oef.src.python.metrics import MetricsRegistry
+from oef.src.python.outbound import DEFAULT_OUTBOUND_HIGH_WATER, OutboundScheduler, OutboundStats, \
+    envelope_priority
+from oef.src.python import ratelimit, reconnect, tracing
 from oef.src.python.query import Query
 from oef.src.python.schema import Description
 
@@ -54,6 +62,54 @@ class OEFConnectionError(ConnectionError):
     """
 
 
+class _ResumingSSLContext(ssl.SSLContext):
+    """A client SSL context that resumes the last TLS session established with each server, if any."""
+
+    def __init__(self, protocol: int) -> None:
+        self.sessions = {}  # type: Dict[str, ssl.SSLSession]
+
+    def wrap_bio(self, incoming, outgoing, server_side=False, server_hostname=None, session=None):
+        if session is None and not server_side:
+            session = self.sessions.get(server_hostname)
+        return super().wrap_bio(incoming, outgoing, server_side, server_hostname, session)
+
+
+"""the SSL contexts of the secure proxies, by key files, with the modification times of the files"""
+_SSL_CONTEXTS = {}  # type: Dict[Tuple[str, str], Tuple[Tuple[float, float], _ResumingSSLContext]]
+
+
+def ssl_context(agent_key_file: str, core_key_file: str) -> ssl.SSLContext:
+    """
+    The SSL context of the secure proxies that use the given key files. It is created, and the certificate chain
+    loaded, once per process, and again when one of the files changes.
+    The context also keeps the last TLS session with each OEF Node, so that the next connections resume it
+    instead of doing a full handshake.
+
+    :param agent_key_file: PEM file containing agent's private key and certificate.
+    :param core_key_file: PEM file containing OEF Node's public key.
+    :return: the SSL context.
+    """
+    key = (agent_key_file, core_key_file)
+    mtimes = (os.stat(agent_key_file).st_mtime, os.stat(core_key_file).st_mtime if core_key_file else 0.0)
+    cached = _SSL_CONTEXTS.get(key)
+    if cached is not None and cached[0] == mtimes:
+        return cached[1]
+    ssl_ctx = _ResumingSSLContext(ssl.PROTOCOL_TLS_CLIENT)
+    ssl_ctx.options |= ssl.OP_NO_TLSv1
+    ssl_ctx.options |= ssl.OP_NO_TLSv1_1
+    ssl_ctx.load_cert_chain(agent_key_file, keyfile=agent_key_file)
+    ssl_ctx.check_hostname = False
+    ssl_ctx.verify_mode = ssl.VerifyMode.CERT_NONE
+    ssl_ctx.set_ciphers('DHE-RSA-AES256-SHA256')
+    _SSL_CONTEXTS[key] = (mtimes, ssl_ctx)
+    return ssl_ctx
+
+
+def clear_ssl_contexts() -> None:
+    """Forget the cached SSL contexts and TLS sessions, e.g. after a certificate has been revoked."""
+    _SSL_CONTEXTS.clear()
+
+
 class OEFNetworkProxy(OEFProxy):
     """
     Proxy to the functionality of the OEF. Provides functionality for an agent to:
@@ -83,6 +139,16 @@ class OEFNetworkProxy(OEFProxy):
         self._connection = None
         self._server_reader = None
         self._server_writer = None
+        self._outbound = None
+        self._outbound_high_water = DEFAULT_OUTBOUND_HIGH_WATER
+        self._limiter = None
+        self._reconnect = None
+        self._reconnect_stats = None
+        self._outage = None
+        # the address of the node, once resolved (see oef.bulk.resolve_addresses)
+        self._resolved_addr = None
+        self._remote = None
+        self._remote_agent = None
 
     def is_connected(self) -> bool:
         """
@@ -97,39 +163,258 @@ class OEFNetworkProxy(OEFProxy):
         :param event_loop: the event loop to use for the connection.
         :return: A stream reader and a stream writer for the connection.
         """
-        return await asyncio.open_connection(self.oef_addr, self.port, loop=event_loop)
+        return await asyncio.open_connection(self._resolved_addr or self.oef_addr, self.port)
 
     def _send(self, protobuf_msg) -> None:
         """
         Send a Protobuf message to a previously established connection.
+        During an outage (see :func:`~oef.proxy.OEFNetworkProxy.enable_reconnect`), the message is buffered.
+        :param protobuf_msg: the message to be sent
+        :return: ``None``
+        :raises OEFConnectionError: if the connection has not been established yet,
+                                  | or the buffer of the outage is full.
+        """
+        outage = self._outage
+        if outage is not None:
+            if len(outage) >= self._reconnect.buffer_limit:
+                self._reconnect_stats.overflows += 1
+                raise OEFConnectionError("Connection lost, and the buffer of the outage is full.")
+            outage.append(protobuf_msg)
+            self._reconnect_stats.buffered += 1
+            return
+        self._write(protobuf_msg)
+
+    def _write(self, protobuf_msg) -> None:
+        """
+        Send a Protobuf message on the connection, even during the handshake of a reconnection.
         :param protobuf_msg: the message to be sent
         :return: ``None``
         :raises OEFConnectionError: if the connection has not been established yet.
         """
         if not self.is_connected():
             raise OEFConnectionError("Connection not established yet. Please use 'connect()'.")
-        serialized_msg = protobuf_msg.SerializeToString()
-        nbytes = struct.pack("I", len(serialized_msg))
-        self._server_writer.write(nbytes)
-        self._server_writer.write(serialized_msg)
+        metrics = self._metrics
+        if metrics is None:
+            serialized_msg = protobuf_msg.SerializeToString()
+        else:
+            start = time.perf_counter()
+            serialized_msg = protobuf_msg.SerializeToString()
+            case = protobuf_msg.WhichOneof("payload") if isinstance(protobuf_msg, agent_pb2.Envelope) \
+                else type(protobuf_msg).__name__
+            metrics.sent(case, getattr(protobuf_msg, "msg_id", 0), len(serialized_msg) + 4,
+                         time.perf_counter() - start)
+        if self._outbound is None:
+            self._outbound = OutboundScheduler(self._server_writer, self._loop, self._outbound_high_water)
+        self._outbound.send(struct.pack("I", len(serialized_msg)) + serialized_msg, envelope_priority(protobuf_msg))
+
+    def _submit(self, kind: str, destination: Optional[str], msg) -> Optional[asyncio.Future]:
+        """Send a message, subject to the rate limits (see :func:`~oef.proxy.OEFNetworkProxy.configure_rate_limits`)."""
+        remote = self._remote
+        if remote is not None and destination is not None:
+            core = remote.route(destination, msg.context)
+            if core is not None and not self._is_own_core(core):
+                return remote.submit(self._remote_agent, core, msg)
+        session = self._session
+        if session is not None and session.record(msg) and self._outage is not None:
+            # sent by the replay of the session, when the connection is restored
+            return None
+        if self._limiter is None:
+            self._send(msg.to_pb())
+            return None
+        return self._limiter.submit(kind, destination, self._send, msg.to_pb())
+
+    def _is_own_core(self, core: Tuple[str, int]) -> bool:
+        return core[1] == int(self.port) and core[0] in (self.oef_addr, self._resolved_addr)
+
+    def enable_remote_cores(self, manager, agent) -> None:
+        """
+        Send the messages to agents on other cores through connections to these cores, managed by a
+        :class:`~oef.remote.RemoteCores`, which learns the cores of the agents from the wide search results.
+        These messages are not subject to the rate limits of the proxy.
+        :param manager: the manager of the connections to the remote cores.
+        :param agent: the agent, to which the messages from the remote cores are dispatched.
+        :return: ``None``
+        """
+        self._remote = manager
+        self._remote_agent = agent
+        entry = self._dispatch.get("agents_wide")
+
+        def learn_routes(proxy, msg):
+            args = entry.decoder(proxy, msg)
+            manager.learn(args[1])
+            return args
+
+        self.register_payload_handler("agents_wide", PayloadHandler(learn_routes, entry.handler, entry.cleanup))
+
+    def configure_rate_limits(self, search: Optional[ratelimit.LIMIT] = None,
+                              register: Optional[ratelimit.LIMIT] = None,
+                              message: Optional[ratelimit.LIMIT] = None,
+                              per_destination: Optional[ratelimit.LIMIT] = None) -> None:
+        """
+        Limit the rate of the requests sent to the OEF Node, with token buckets.
+        Every limit is a pair ``(requests per second, burst size)``; ``None`` means no limit.
+        The requests over the limit wait in order and are sent as soon as possible, without blocking the loop.
+        When a request is limited, the method that sends it returns a future, done when the request is sent:
+        await it to apply backpressure.
+        :param search: the limit of the ``search_*`` requests.
+        :param register: the limit of the ``register_*`` and ``unregister_*`` requests.
+        :param message: the limit of the messages to other agents (``send_*``).
+        :param per_destination: the limit of the messages to each agent.
+        :return: ``None``
+        """
+        if self._limiter is not None:
+            self._limiter.cancel()
+        limits = {kind: limit for kind, limit in ((ratelimit.SEARCH, search), (ratelimit.REGISTER, register),
+                                                  (ratelimit.MESSAGE, message)) if limit is not None}
+        if limits or per_destination is not None:
+            self._limiter = ratelimit.RateLimiter(limits, per_destination, loop=self._loop)
+        else:
+            self._limiter = None
+
+    @property
+    def rate_limit_stats(self) -> Dict[str, Dict[str, float]]:
+        """The state of the rate limits, by kind of request. See :func:`~oef.ratelimit.RateLimiter.snapshot`."""
+        return self._limiter.snapshot() if self._limiter is not None else {}
+
+    def enable_metrics(self, registry: Optional[MetricsRegistry] = None) -> MetricsRegistry:
+        registry = super().enable_metrics(registry)
+        registry.gauge("oef_write_buffer_bytes", "Bytes waiting in the write buffer of the connection.",
+                       function=self._write_buffer_size)
+        registry.gauge("oef_outbound_depth", "Frames queued by the outbound scheduler.",
+                       function=lambda: self._outbound.depth if self._outbound is not None else 0)
+        for name, field, description in (
+                ("oef_rate_limit_tokens", "tokens", "Tokens available in the rate limit bucket, by kind."),
+                ("oef_rate_limit_pending", "pending", "Requests waiting for a rate limit token, by kind."),
+                ("oef_rate_limit_allowed_total", "allowed", "Requests sent under the rate limits, by kind."),
+                ("oef_rate_limit_delayed_total", "delayed", "Requests delayed by the rate limits, by kind.")):
+            for kind in (ratelimit.SEARCH, ratelimit.REGISTER, ratelimit.MESSAGE):
+                registry.gauge(name, description, function=functools.partial(self._rate_limit_value, kind, field),
+                               kind=kind)
+        return registry
+
+    def _rate_limit_value(self, kind: str, field: str) -> float:
+        # read from the current limiter, which configure_rate_limits may replace
+        if self._limiter is None:
+            return 0.0
+        return self._limiter.snapshot().get(kind, {}).get(field, 0.0)
+
+    def _write_buffer_size(self) -> int:
+        if self._server_writer is None:
+            return 0
+        return self._server_writer.transport.get_write_buffer_size()
+
+    def configure_outbound_queue(self, high_water: int = DEFAULT_OUTBOUND_HIGH_WATER) -> None:
+        """
+        Configure the scheduling of the outgoing messages (see :class:`~oef.outbound.OutboundScheduler`).
+        It takes effect at the next connection.
+        :param high_water: the size (in bytes) of the write buffer of the connection above which
+                         | the messages are queued by priority.
+        :return: ``None``
+        """
+        self._outbound_high_water = high_water
+
+    @property
+    def outbound_stats(self) -> Optional[OutboundStats]:
+        """The statistics of the outgoing messages of the current connection, if any."""
+        return self._outbound.stats if self._outbound is not None else None
+
+    def enable_reconnect(self, policy: Optional[reconnect.ReconnectPolicy] = None) -> reconnect.ReconnectStats:
+        """
+        Reconnect automatically when the connection to the OEF Node drops while the agent runs, instead of ending
+        its message loop. See :mod:`~oef.reconnect`.
+        The registrations and searches are recorded from now on: enable it before connecting.
+        :param policy: the backoff and the buffering during the outages. By default, a new
+                     | :class:`~oef.reconnect.ReconnectPolicy`.
+        :return: the counters of the outages.
+        """
+        self._reconnect = policy if policy is not None else reconnect.ReconnectPolicy()
+        if self._session is None:
+            self._session = reconnect.Session()
+        if self._reconnect_stats is None:
+            self._reconnect_stats = reconnect.ReconnectStats()
+        return self._reconnect_stats
+
+    def disable_reconnect(self) -> None:
+        """Let the message loop end when the connection drops, and forget the session."""
+        self._reconnect = None
+        self._session = None
+
+    @property
+    def reconnect_stats(self) -> Optional[reconnect.ReconnectStats]:
+        """The counters of the outages, if the reconnection has been enabled."""
+        return self._reconnect_stats
+
+    @property
+    def session(self) -> Optional[reconnect.Session]:
+        """The registrations and the pending searches, replayed after a reconnection, if it is enabled."""
+        return self._session
+
+    async def _recover(self) -> bool:
+        policy = self._reconnect
+        if policy is None or not self._active_loop:
+            return False
+        stats = self._reconnect_stats
+        stats.drops += 1
+        start = time.monotonic()
+        logger.warning("Proxy {}: connection dropped, reconnecting.".format(self.public_key))
+        # keep the messages buffered by a failover that fell back to a reconnection
+        self._outage = outage = self._outage if self._outage is not None else deque()
+        self._close_connection()
+        restored = False
+        try:
+            attempt = 0
+            while policy.max_attempts is None or attempt < policy.max_attempts:
+                await asyncio.sleep(policy.delay(attempt))
+                attempt += 1
+                stats.attempts += 1
+                try:
+                    restored = await asyncio.wait_for(self.connect(), policy.connect_timeout)
+                except (OSError, asyncio.IncompleteReadError, struct.error, asyncio.TimeoutError) as e:
+                    logger.debug("Proxy %s: reconnection attempt %s failed: %r", self.public_key, attempt, e)
+                if restored:
+                    break
+                self._close_connection()
+                # the address resolved once by oef.bulk may be stale: resolve the node again at the next attempt
+                self._resolved_addr = None
+            if not restored:
+                stats.failures += 1
+                logger.error("Proxy {}: could not reconnect after {} attempts, {} buffered messages lost."
+                             .format(self.public_key, attempt, len(outage)))
+                return False
+            replay = self._session.replay()
+            for msg in replay:
+                self._write(msg.to_pb())
+            stats.replayed += len(replay)
+            while outage:
+                self._write(outage.popleft())
+        finally:
+            self._outage = None
+        stats.reconnects += 1
+        stats.last_outage = time.monotonic() - start
+        logger.info("Proxy {}: reconnected after {:.3f}s, {} registrations and searches replayed."
+                    .format(self.public_key, stats.last_outage, len(replay)))
+        return True
+
+    def _close_connection(self) -> None:
+        if self._server_writer is not None:
+            self._server_writer.close()
+        self._outbound = None
+        self._server_writer = None
+        self._server_reader = None
+        self._connection = None
 
     async def _receive(self):
         """
         Receive a Protobuf message.
-        :return: ``None``
+        :return: the serialized message.
         :raises OEFConnectionError: if the connection has not been established yet.
+        :raises asyncio.IncompleteReadError: if the connection is closed, even in the middle of a message.
         """
         if not self.is_connected():
             raise OEFConnectionError("Connection not established yet. Please use 'connect()'.")
-        nbytes_packed = await self._server_reader.read(len(struct.pack("I", 0)))
-        logger.debug("received ${0}".format(nbytes_packed))
-        nbytes = struct.unpack("I", nbytes_packed)[0]
-        logger.debug("received unpacked ${0}".format(nbytes))
-        logger.debug("Preparing to receive ${0} bytes ...".format(nbytes))
-        data = b""
-        while len(data) < nbytes:
-            data += await self._server_reader.read(nbytes - len(data))
-            logger.debug("Read bytes: {}".format(len(data)))
+        nbytes = struct.unpack("I", await self._server_reader.readexactly(4))[0]
+        logger.debug("Preparing to receive %s bytes ...", nbytes)
+        data = await self._server_reader.readexactly(nbytes)
         return data
 
     async def connect(self) -> bool:
@@ -139,10 +424,11 @@ class OEFNetworkProxy(OEFProxy):
         event_loop = self._loop
         self._connection = await self._connect_to_server(event_loop)
         self._server_reader, self._server_writer = self._connection
+        self._outbound = None
         # Step 1: Agent --(ID)--> OEFCore
         pb_public_key = agent_pb2.Agent.Server.ID()
         pb_public_key.public_key = self.public_key
-        self._send(pb_public_key)
+        self._write(pb_public_key)
         # Step 2: OEFCore --(Phrase)--> Agent
         data = await self._receive()
         pb_phrase = agent_pb2.Server.Phrase()
@@ -155,79 +441,92 @@ class OEFNetworkProxy(OEFProxy):
         pb_answer.answer = pb_phrase.phrase[::-1]
         pb_answer.capability_bits.will_heartbeat = True
 
-        self._send(pb_answer)
+        self._write(pb_answer)
         # Step 4: OEFCore --(Connected)--> Agent
         data = await self._receive()
         pb_status = agent_pb2.Server.Connected()
         pb_status.ParseFromString(data)
         return pb_status.status
 
-    def register_agent(self, msg_id: int, agent_description: Description):
+    def register_agent(self, msg_id: int, agent_description: Description) -> Optional[asyncio.Future]:
         msg = RegisterDescription(msg_id, agent_description)
-        self._send(msg.to_pb())
+        return self._submit(ratelimit.REGISTER, None, msg)
 
-    def register_service(self, msg_id: int, service_description: Description, service_id: str = ""):
-        uri_builder = uri.OEFURI.Builder()
-        uri_builder.agentKey(self._public_key)
-        uri_builder.agentAlias(service_id)
-        msg = RegisterService(msg_id, service_description, uri_builder.build())
-        self._send(msg.to_pb())
+    def register_service(self, msg_id: int, service_description: Description,
+                         service_id: str = "") -> Optional[asyncio.Future]:
+        msg = RegisterService(msg_id, service_description, uri.agentURI(self._public_key, service_id))
+        return self._submit(ratelimit.REGISTER, None, msg)
 
-    def unregister_agent(self, msg_id: int):
+    def unregister_agent(self, msg_id: int) -> Optional[asyncio.Future]:
         msg = UnregisterDescription(msg_id)
-        self._send(msg.to_pb())
+        return self._submit(ratelimit.REGISTER, None, msg)
 
-    def unregister_service(self, msg_id: int, service_description: Description, service_id: str = ""):
-        uri_builder = uri.OEFURI.Builder()
-        uri_builder.agentKey(self._public_key)
-        uri_builder.agentAlias(service_id)
-        msg = UnregisterService(msg_id, service_description, uri_builder.build())
-        self._send(msg.to_pb())
+    def unregister_service(self, msg_id: int, service_description: Description,
+                           service_id: str = "") -> Optional[asyncio.Future]:
+        msg = UnregisterService(msg_id, service_description, uri.agentURI(self._public_key, service_id))
+        return self._submit(ratelimit.REGISTER, None, msg)
 
-    def search_agents(self, search_id: int, query: Query) -> None:
+    def search_agents(self, search_id: int, query: Query) -> Optional[asyncio.Future]:
         msg = SearchAgents(search_id, query)
-        self._send(msg.to_pb())
+        return self._submit(ratelimit.SEARCH, None, msg)
 
-    def search_services(self, search_id: int, query: Query) -> None:
+    def search_services(self, search_id: int, query: Query) -> Optional[asyncio.Future]:
         msg = SearchServices(search_id, query)
-        self._send(msg.to_pb())
+        return self._submit(ratelimit.SEARCH, None, msg)
 
-    def search_services_wide(self, search_id: int, query: Query) -> None:
+    def search_services_wide(self, search_id: int, query: Query) -> Optional[asyncio.Future]:
         msg = SearchServicesWide(search_id, query)
-        self._send(msg.to_pb())
+        return self._submit(ratelimit.SEARCH, None, msg)
 
     def send_message(self, msg_id: int, dialogue_id: int, destination: str, msg: bytes,
-                     context=uri.Context()) -> None:
+                     context: Optional[uri.Context] = None) -> Optional[asyncio.Future]:
         msg = Message(msg_id, dialogue_id, destination, msg, context)
-        self._send(msg.to_pb())
+        if self._tracer is not None:
+            self._tracer.record(tracing.SENT, "message", destination, dialogue_id, msg_id)
+        return self._submit(ratelimit.MESSAGE, destination, msg)
 
     def send_cfp(self, msg_id: int, dialogue_id: int, destination: str, target: int, query: CFP_TYPES,
-                 context=uri.Context()):
+                 context: Optional[uri.Context] = None) -> Optional[asyncio.Future]:
         msg = CFP(msg_id, dialogue_id, destination, target, query, context)
-        self._send(msg.to_pb())
+        if self._tracer is not None:
+            self._tracer.record(tracing.SENT, "cfp", destination, dialogue_id, msg_id)
+        return self._submit(ratelimit.MESSAGE, destination, msg)
 
     def send_propose(self, msg_id: int, dialogue_id: int, destination: str, target: int, proposals: PROPOSE_TYPES,
-                     context=uri.Context()):
+                     context: Optional[uri.Context] = None) -> Optional[asyncio.Future]:
         msg = Propose(msg_id, dialogue_id, destination, target, proposals, context)
-        self._send(msg.to_pb())
+        if self._tracer is not None:
+            self._tracer.record(tracing.SENT, "propose", destination, dialogue_id, msg_id)
+        return self._submit(ratelimit.MESSAGE, destination, msg)
 
-    def send_accept(self, msg_id: int, dialogue_id: int, destination: str, target: int, context=uri.Context()):
+    def send_accept(self, msg_id: int, dialogue_id: int, destination: str, target: int,
+                    context: Optional[uri.Context] = None) -> Optional[asyncio.Future]:
         msg = Accept(msg_id, dialogue_id, destination, target, context)
-        self._send(msg.to_pb())
+        if self._tracer is not None:
+            self._tracer.record(tracing.SENT, "accept", destination, dialogue_id, msg_id)
+        return self._submit(ratelimit.MESSAGE, destination, msg)
 
-    def send_decline(self, msg_id: int, dialogue_id: int, destination: str, target: int, context=uri.Context()):
+    def send_decline(self, msg_id: int, dialogue_id: int, destination: str, target: int,
+                     context: Optional[uri.Context] = None) -> Optional[asyncio.Future]:
         msg = Decline(msg_id, dialogue_id, destination, target, context)
-        self._send(msg.to_pb())
+        if self._tracer is not None:
+            self._tracer.record(tracing.SENT, "decline", destination, dialogue_id, msg_id)
+        return self._submit(ratelimit.MESSAGE, destination, msg)
 
     async def stop(self) -> None:
         """
         Tear down resources associated with this Proxy, i.e. the writing connection with the server.
         """
+        if self._limiter is not None:
+            self._limiter.cancel()
         try:
+            if self._outbound is not None:
+                await self._outbound.flush()
             await self._server_writer.drain()
             self._server_writer.close()
         except ConnectionResetError:
             pass
+        self._outbound = None
         self._server_writer = None
         self._server_reader = None
         self._connection = None
@@ -263,6 +562,8 @@ class OEFSecureNetworkProxy(OEFNetworkProxy):
         self._server_writer = None
         self._agent_pk = None
         self._core_pk = None
+        self._ssl_ctx = None
+        self.tls_session_reused = False
 
     async def _connect_to_server(self, event_loop) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
         """
@@ -270,17 +571,19 @@ class OEFSecureNetworkProxy(OEFNetworkProxy):
         :param event_loop: the event loop to use for the connection.
         :return: A stream reader and a stream writer for the connection.
         """
-
-        # setup ssl
-        ssl_ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
-        ssl_ctx.options |= ssl.OP_NO_TLSv1
-        ssl_ctx.options |= ssl.OP_NO_TLSv1_1
-        ssl_ctx.load_cert_chain(self.agent_sk_file, keyfile=self.agent_sk_file)
-        ssl_ctx.check_hostname = False
-        ssl_ctx.verify_mode = ssl.VerifyMode.CERT_NONE
-        ssl_ctx.set_ciphers('DHE-RSA-AES256-SHA256')
-
-        return await asyncio.open_connection(self.oef_addr, int(self.port), ssl=ssl_ctx, loop=event_loop)
+        self._ssl_ctx = ssl_context(self.agent_sk_file, self.core_pk_file)
+        return await asyncio.open_connection(self._resolved_addr or self.oef_addr, int(self.port),
+                                             ssl=self._ssl_ctx)
+
+    def _keep_tls_session(self) -> None:
+        """Keep the TLS session of the connection, to resume it at the next connection to the same node."""
+        ssl_object = self._server_writer.get_extra_info("ssl_object")
+        if ssl_object is None:
+            return
+        self.tls_session_reused = ssl_object.session_reused
+        # with TLS 1.3, the session ticket arrives after the handshake: it has been read with the first message
+        if ssl_object.session is not None and isinstance(self._ssl_ctx, _ResumingSSLContext):
+            self._ssl_ctx.sessions[ssl_object.server_hostname] = ssl_object.session
 
     async def connect(self) -> bool:
         if self.is_connected() and not self._server_writer.transport.is_closing():
@@ -289,11 +592,14 @@ class OEFSecureNetworkProxy(OEFNetworkProxy):
         event_loop = self._loop
         self._connection = await self._connect_to_server(event_loop)
         self._server_reader, self._server_writer = self._connection
+        self._outbound = None
         # we need to send Hi message to the server otherwise it will hang
         pb_answer = agent_pb2.Agent.Server.Answer()
         pb_answer.capability_bits.will_heartbeat = True
-        self._send(pb_answer)
+        self._write(pb_answer)
         data = await self._receive()
         pb_status = agent_pb2.Server.Connected()
         pb_status.ParseFromString(data)
+        if pb_status.status:
+            self._keep_tls_session()
         return pb_status.status
@@ -1,8 +1,10 @@
+import logging
 from abc import ABC, abstractmethod
-from typing import Union, Tuple, List, Optional, Type
-from protocol.src.python import ProtoHelpers
+from typing import Union, Tuple, List, Optional, Type, Dict
+from protocol.src.python import ProtoHelpers, TypeHelpers
 
 from oef.src.python import QueryBuildingBlocks
+from oef.src.python.QueryBuildingBlocks import Placeholder
 from oef.src.python.schema import AttributeSchema, Description, DataModel
 from protocol.src.python.Interfaces import ProtobufSerializable
 from protocol.src.python.Wrappers import Location
@@ -13,6 +15,20 @@ ORDERED_TYPES = Union[int, str, float]
 RANGE_TYPES = Union[Tuple[str, str], Tuple[int, int], Tuple[float, float], Tuple[Location, Location]]
 SET_TYPES = Union[List[float], List[str], List[bool], List[int], List[Location]]
 
+logger = logging.getLogger(__name__)
+
+
+def _type_string(value) -> str:
+    """
+    Return the type string of a constraint value, which can also be a :class:`~oef.query.Placeholder`.
+
+    :param value: the value (or a sample value of a range or set).
+    :return: the type string used in the protobuf encoding.
+    """
+    if isinstance(value, Placeholder):
+        return value.type_string
+    return ProtoHelpers.pythonTypeToString(value)
+
 
 class ConstraintExpr(ProtobufSerializable, ABC):
     """
@@ -291,12 +307,15 @@ class Relation(ConstraintType, ABC):
 
     @property
     def _type(self) -> str:
-        return ProtoHelpers.pythonTypeToString(self.value)
+        return _type_string(self.value)
 
     @property
     def _value(self):
         return self.value
 
+    def _get_type(self) -> Type[ATTRIBUTE_TYPES]:
+        return type(self.value)
+
     def __eq__(self, other):
         if type(other) != type(self):
             return False
@@ -512,7 +531,8 @@ class Range(ConstraintType):
         Initialize a range constraint type.
 
         :param values: a pair of ``int``, a pair of ``str``, a pair of ``float` or
-                     | a pair of :class:`~oef.schema.Location`.
+                     | a pair of :class:`~oef.schema.Location`. It can also be a :class:`~oef.query.Placeholder`
+                     | to be bound to a pair by a :class:`~oef.query.PreparedQuery`.
         """
         self.values = values
 
@@ -522,7 +542,8 @@ class Range(ConstraintType):
 
     @property
     def _type(self) -> str:
-        return ProtoHelpers.typeToRange(ProtoHelpers.pythonTypeToString(self.values[0]))
+        sample = self.values if isinstance(self.values, Placeholder) else self.values[0]
+        return ProtoHelpers.typeToRange(_type_string(sample))
 
     @property
     def _value(self):
@@ -565,12 +586,16 @@ class Set(ConstraintType, ABC):
 
     @property
     def _type(self) -> str:
-        return ProtoHelpers.typeToSet(ProtoHelpers.pythonTypeToString(next(iter(self.values))))
+        sample = self.values if isinstance(self.values, Placeholder) else next(iter(self.values))
+        return ProtoHelpers.typeToSet(_type_string(sample))
 
     @property
     def _value(self):
         return self.values
 
+    def _get_type(self) -> Type[ATTRIBUTE_TYPES]:
+        return type(next(iter(self.values)))
+
     def __eq__(self, other):
         if type(other) != type(self):
             return False
@@ -684,6 +709,10 @@ class Distance(ConstraintType):
     def check(self, value: Location) -> bool:
         return self.center.distance(value) <= self.distance
 
+    @property
+    def _operator(self):
+        return ProtoHelpers.OPERATOR_CLOSE_TO
+
     @property
     def _type(self) -> str:
         return "DISTANCE"
@@ -692,6 +721,9 @@ class Distance(ConstraintType):
     def _value(self):
         return self.center, self.distance
 
+    def _get_type(self) -> Type[Location]:
+        return Location
+
     def __eq__(self, other):
         if type(other) != Distance:
             return False
@@ -713,7 +745,7 @@ class Constraint(ConstraintExpr):
             location, distance = constraint._value
             loc = QueryBuildingBlocks.Leaf(
                 operator=ProtoHelpers.OPERATOR_EQ,
-                query_field_value=location.to_pb(),
+                query_field_value=location if isinstance(location, Placeholder) else location.to_pb(),
                 query_field_type="location",
                 target_field_name=attribute_name + ".location",
             )
@@ -908,6 +940,163 @@ class Query(ProtobufSerializable):
         return self.root.graphVisualization()[0]
 
 
+def _to_wire_value(value):
+    """
+    Convert a value bound to a placeholder into the form expected by the constraint value encoder.
+
+    :param value: the value provided by the user.
+    :return: the value ready to be encoded.
+    """
+    if isinstance(value, Location):
+        return value.to_pb()
+    if isinstance(value, (list, tuple)):
+        return [_to_wire_value(v) for v in value]
+    return value
+
+
+def _matches_type(value, value_type: type) -> bool:
+    if isinstance(value, bool) and value_type is not bool:
+        return False
+    if value_type is float:
+        return isinstance(value, (int, float))
+    return isinstance(value, value_type)
+
+
+def _matches_typecode(value, value_type: type, typecode: str) -> bool:
+    """
+    Check a value bound to a placeholder against the type of the placeholder and the encoding of the constraint.
+
+    :param value: the value provided by the user.
+    :param value_type: the type of the placeholder.
+    :param typecode: the typecode of the constraint value, e.g. ``"double"``, ``"string_range"`` or ``"int64_list"``.
+    :return: ``True`` if the value can be encoded, ``False`` otherwise.
+    """
+    if typecode.endswith("_range"):
+        return isinstance(value, (tuple, list)) and len(value) == 2 \
+            and all(_matches_type(v, value_type) for v in value)
+    if typecode.endswith("_pair_list"):
+        return isinstance(value, (tuple, list, set)) and all(
+            isinstance(pair, (tuple, list)) and len(pair) == 2 and all(_matches_type(v, value_type) for v in pair)
+            for pair in value)
+    if typecode.endswith("_list"):
+        return isinstance(value, (tuple, list, set)) and all(_matches_type(v, value_type) for v in value)
+    return _matches_type(value, value_type)
+
+
+class BoundQuery(ProtobufSerializable):
+    """
+    A query obtained by binding values to the placeholders of a :class:`~oef.query.PreparedQuery`.
+    It keeps the serialized query, so that it can be sent without encoding the query tree again.
+    """
+
+    def __init__(self, serialized: bytes) -> None:
+        """
+        Initialize a bound query.
+
+        :param serialized: the serialized ``ConstructQueryObjectRequest``.
+        """
+        self.serialized = serialized
+
+    def to_pb(self) -> dap_interface_pb2.ConstructQueryObjectRequest:
+        """
+        Return the associated Protobuf object.
+
+        :return: a new Protobuf object parsed from the serialized query.
+        """
+        pb = dap_interface_pb2.ConstructQueryObjectRequest()
+        pb.ParseFromString(self.serialized)
+        return pb
+
+    def __eq__(self, other):
+        if type(other) != BoundQuery:
+            return False
+        return self.serialized == other.serialized
+
+
+class PreparedQuery:
+    """
+    A query template with named placeholders, encoded once and reused for many searches.
+    Binding new values only patches the value fields of the cached protobuf object.
+
+    Examples:
+        All the books of a given author published before a given year
+
+        >>> prepared = PreparedQuery(Query([
+        ...     Constraint("author", Eq(Placeholder("author", str))),
+        ...     Constraint("year", Lt(Placeholder("max_year", int)))
+        ... ]))
+        >>> sorted(prepared.placeholders)
+        ['author', 'max_year']
+        >>> query = prepared.bind(author="Stephen King", max_year=1990)
+        >>> query.to_pb().constraints[0].query_field_value.s
+        'Stephen King'
+    """
+
+    def __init__(self, query: Query) -> None:
+        """
+        Initialize a prepared query.
+
+        :param query: the query template. Its constraint values can be instances of
+                    | :class:`~oef.query.Placeholder`.
+        """
+        self.query = query
+        self._template = query.to_pb()
+        self._slots = {}  # type: Dict[str, List[Tuple[dap_interface_pb2.ValueMessage, str]]]
+        self._types = {}  # type: Dict[str, type]
+        self._collect_slots(query.root, self._template)
+
+    def _collect_slots(self, branch: QueryBuildingBlocks.Branch,
+                       pb: dap_interface_pb2.ConstructQueryObjectRequest) -> None:
+        """
+        Walk the query tree together with its encoding and remember the value fields of the placeholders.
+
+        :param branch: the branch of the query tree.
+        :param pb: the encoded branch.
+        :return: ``None``
+        """
+        for leaf, leaf_pb in zip(branch.leaves, pb.constraints):
+            value = leaf.query_field_value
+            if isinstance(value, Placeholder):
+                self._slots.setdefault(value.name, []).append((leaf_pb.query_field_value, leaf.query_field_type))
+                self._types[value.name] = value.value_type
+        for child, child_pb in zip(branch.subnodes, pb.children):
+            self._collect_slots(child, child_pb)
+
+    @property
+    def placeholders(self) -> List[str]:
+        """The names of the placeholders of the query."""
+        return list(self._slots.keys())
+
+    def bind(self, **params) -> BoundQuery:
+        """
+        Bind values to the placeholders and return a query ready to be sent.
+
+        :param params: the value for every placeholder, by name.
+        :return: the bound query.
+        :raises ValueError: if a placeholder has no value, a value does not match any placeholder,
+                          | or a value does not have the type of its placeholder.
+        """
+        if len(params) != len(self._slots) or not all(name in self._slots for name in params):
+            missing = [name for name in self._slots if name not in params]
+            unknown = [name for name in params if name not in self._slots]
+            raise ValueError("Invalid input value for type '{}': missing placeholders {}, unknown placeholders {}."
+                             .format(type(self).__name__, missing, unknown))
+        # checked before any slot is cleared, so that a failed bind leaves the template intact
+        for name, slots in self._slots.items():
+            value_type = self._types[name]
+            for _, typecode in slots:
+                if not _matches_typecode(params[name], value_type, typecode):
+                    raise ValueError("Invalid input value for type '{}': {!r} is not a valid '{}' value for "
+                                     "placeholder '{}'.".format(type(self).__name__, params[name], typecode, name))
+
+        for name, slots in self._slots.items():
+            data = _to_wire_value(params[name])
+            for value_pb, typecode in slots:
+                value_pb.Clear()
+                TypeHelpers.encodeConstraintValueInto(value_pb, data, typecode, logger)
+        return BoundQuery(self._template.SerializeToString())
+
+
 class SearchResultItem:
     def __init__(self, public_key: str,
                  core_key : str,
@@ -0,0 +1,250 @@
+# -*- coding: utf-8 -*-
+
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2018 Fetch.AI Limited
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+
+"""
+oef.ratelimit
+~~~~~~~~~~~~~
+This module contains the token-bucket rate limiter of the requests sent by :class:`~oef.proxy.OEFNetworkProxy`.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque, Counter
+from typing import Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+"""a limit, as a pair ``(rate in requests per second, burst size)``"""
+LIMIT = Tuple[float, float]
+
+SEARCH = "search"
+REGISTER = "register"
+MESSAGE = "message"
+
+MAX_DESTINATIONS = 10000
+
+"""the key of a queue of waiting calls: the kind, and the destination if it has its own limit"""
+QUEUE_KEY = Tuple[str, Optional[str]]
+
+
+class TokenBucket:
+    """A token bucket, refilled continuously at ``rate`` tokens per second, up to ``burst`` tokens."""
+
+    __slots__ = ("rate", "burst", "_tokens", "_updated", "_clock")
+
+    def __init__(self, rate: float, burst: float, clock: Callable[[], float] = time.monotonic) -> None:
+        """
+        Initialize a full token bucket.
+
+        :param rate: the number of tokens added per second.
+        :param burst: the capacity of the bucket.
+        :raises ValueError: if the rate or the burst is not positive.
+        """
+        if rate <= 0 or burst < 1:
+            raise ValueError("Invalid input value for type '{}': rate must be positive and burst at least 1."
+                             .format(type(self).__name__))
+        self.rate = rate
+        self.burst = burst
+        self._clock = clock
+        self._tokens = burst
+        self._updated = clock()
+
+    @property
+    def tokens(self) -> float:
+        """The number of tokens currently in the bucket."""
+        now = self._clock()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        return self._tokens
+
+    def delay(self) -> float:
+        """The time (in seconds) until a token is available."""
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+    def take(self) -> None:
+        """Remove a token. The caller must have checked that one is available."""
+        self._tokens -= 1
+
+
+class RateLimiter:
+    """
+    Rate limits for several kinds of operations, and optionally per destination.
+
+    A call over the limit is not rejected: it waits in a FIFO, one per kind and destination, and is executed by
+    a timer of the event loop as soon as the tokens are available. Calls of the same kind to the same destination
+    are executed in order; a destination over its own limit does not delay the others.
+    """
+
+    def __init__(self, limits: Dict[str, LIMIT], per_destination: Optional[LIMIT] = None,
+                 loop: Optional[asyncio.AbstractEventLoop] = None,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        """
+        Initialize the limiter.
+
+        :param limits: the limit of each kind of operation. Kinds not listed are not limited.
+        :param per_destination: the limit applied to each destination, if any.
+        :param loop: the event loop.
+        :param clock: the clock of the token buckets.
+        """
+        self._loop = loop if loop is not None else asyncio.get_event_loop()
+        self._clock = clock
+        self._buckets = {kind: TokenBucket(rate, burst, clock) for kind, (rate, burst) in limits.items()}
+        self._per_destination = per_destination
+        self._destination_buckets = {}  # type: Dict[str, TokenBucket]
+        self._queues = {}  # type: Dict[QUEUE_KEY, deque]
+        self._timers = {}  # type: Dict[QUEUE_KEY, asyncio.TimerHandle]
+        self.allowed = Counter()
+        self.delayed = Counter()
+
+    def _destination_bucket(self, destination: Optional[str]) -> Optional[TokenBucket]:
+        if self._per_destination is None or not destination:
+            return None
+        bucket = self._destination_buckets.get(destination)
+        if bucket is None:
+            if len(self._destination_buckets) >= MAX_DESTINATIONS:
+                self._prune_destinations()
+            rate, burst = self._per_destination
+            bucket = self._destination_buckets[destination] = TokenBucket(rate, burst, self._clock)
+        return bucket
+
+    def _prune_destinations(self) -> None:
+        """Forget the destinations whose bucket is full: a new bucket would be in the same state."""
+        full = [d for d, b in self._destination_buckets.items() if b.tokens >= b.burst]
+        for destination in full:
+            del self._destination_buckets[destination]
+
+    @staticmethod
+    def _delay(bucket: Optional[TokenBucket], destination_bucket: Optional[TokenBucket]) -> float:
+        delay = bucket.delay() if bucket is not None else 0.0
+        if destination_bucket is not None:
+            delay = max(delay, destination_bucket.delay())
+        return delay
+
+    @staticmethod
+    def _take(bucket: Optional[TokenBucket], destination_bucket: Optional[TokenBucket]) -> None:
+        if bucket is not None:
+            bucket.take()
+        if destination_bucket is not None:
+            destination_bucket.take()
+
+    def submit(self, kind: str, destination: Optional[str], function: Callable, *args) -> Optional[asyncio.Future]:
+        """
+        Call a function, now or as soon as the limits allow it.
+
+        :param kind: the kind of operation.
+        :param destination: the destination of the operation, if any.
+        :param function: the function to call.
+        :param args: its arguments.
+        :return: ``None`` if the operation is not limited. Otherwise, a future that is done when the function
+               | has been called, with its result or exception. Await it to apply backpressure.
+        :raises Exception: whatever the function raises, if it is called immediately.
+        """
+        bucket = self._buckets.get(kind)
+        destination_bucket = self._destination_bucket(destination)
+        if bucket is None and destination_bucket is None:
+            function(*args)
+            return None
+
+        future = self._loop.create_future()
+        key = (kind, destination if destination_bucket is not None else None)
+        queue = self._queues.get(key)
+        if not queue and self._delay(bucket, destination_bucket) == 0.0:
+            self._take(bucket, destination_bucket)
+            self.allowed[kind] += 1
+            future.set_result(function(*args))
+            return future
+
+        if queue is None:
+            queue = self._queues[key] = deque()
+        queue.append((bucket, destination_bucket, future, function, args))
+        self.delayed[kind] += 1
+        self._schedule(key)
+        return future
+
+    @staticmethod
+    def _run(future: asyncio.Future, function: Callable, args) -> None:
+        try:
+            result = function(*args)
+        except Exception as e:
+            logger.warning("Rate-limited call {} failed: {}".format(getattr(function, "__name__", function), e))
+            future.set_exception(e)
+        else:
+            future.set_result(result)
+
+    def _schedule(self, key: QUEUE_KEY) -> None:
+        if key in self._timers:
+            return
+        bucket, destination_bucket, _, _, _ = self._queues[key][0]
+        self._timers[key] = self._loop.call_later(self._delay(bucket, destination_bucket), self._drain, key)
+
+    def _drain(self, key: QUEUE_KEY) -> None:
+        del self._timers[key]
+        queue = self._queues[key]
+        while queue:
+            bucket, destination_bucket, future, function, args = queue[0]
+            if future.cancelled():
+                # dropped by the caller: it uses no token
+                queue.popleft()
+                continue
+            if self._delay(bucket, destination_bucket) > 0.0:
+                self._schedule(key)
+                return
+            queue.popleft()
+            self._take(bucket, destination_bucket)
+            self.allowed[key[0]] += 1
+            self._run(future, function, args)
+        # one queue per destination: do not keep the empty ones
+        del self._queues[key]
+
+    def pending(self, kind: str) -> int:
+        """The number of calls of a kind waiting for tokens."""
+        return sum(len(queue) for (queue_kind, _), queue in self._queues.items() if queue_kind == kind)
+
+    def cancel(self) -> None:
+        """Drop all the waiting calls, and cancel their futures."""
+        for timer in self._timers.values():
+            timer.cancel()
+        self._timers.clear()
+        for queue in self._queues.values():
+            for _, _, future, _, _ in queue:
+                future.cancel()
+        self._queues.clear()
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """
+        The state of the limiter, for monitoring.
+
+        :return: for every kind, its rate and burst, the tokens available, the number of waiting calls,
+               | and the total number of allowed and delayed calls.
+        """
+        result = {}
+        for kind in set(self._buckets) | set(self.allowed) | set(self.delayed):
+            bucket = self._buckets.get(kind)
+            result[kind] = {
+                "rate": bucket.rate if bucket is not None else 0.0,
+                "burst": bucket.burst if bucket is not None else 0.0,
+                "tokens": bucket.tokens if bucket is not None else 0.0,
+                "pending": self.pending(kind),
+                "allowed": self.allowed[kind],
+                "delayed": self.delayed[kind],
+            }
+        return result
@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2018 Fetch.AI Limited
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+
+"""
+oef.reconnect
+~~~~~~~~~~~~~
+This module contains the state of the automatic reconnection of :class:`~oef.proxy.OEFNetworkProxy`
+(see :func:`~oef.proxy.OEFNetworkProxy.enable_reconnect`).
+
+When the connection to the OEF Node drops, the proxy reconnects with an exponential backoff
+(:class:`~oef.reconnect.ReconnectPolicy`) and runs the handshake again. The node has forgotten the agent by then:
+the proxy registers again the description and the services of the agent, and sends again the searches that had
+no result yet, from its :class:`~oef.reconnect.Session`. The other messages sent during the outage are buffered,
+and sent after the replay.
+"""
+
+import logging
+import random
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from oef.src.python.messages import BaseMessage, RegisterDescription, RegisterService, UnregisterDescription, \
+    UnregisterService, SearchAgents, SearchServices, SearchServicesWide
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUFFER_LIMIT = 1000
+
+"""the payload cases of the messages from the OEF Node that answer a search"""
+SEARCH_ANSWER_CASES = frozenset(("agents", "agents_wide", "oef_error"))
+
+
+class ReconnectPolicy:
+    """When, and how many times, to try to reconnect, and how many messages to buffer in the meantime."""
+
+    def __init__(self, initial_delay: float = 0.1, max_delay: float = 30.0, multiplier: float = 2.0,
+                 jitter: float = 0.5, max_attempts: Optional[int] = None, connect_timeout: float = 10.0,
+                 buffer_limit: int = DEFAULT_BUFFER_LIMIT, rng: Callable[[], float] = random.random) -> None:
+        """
+        Initialize the policy.
+
+        :param initial_delay: the delay (in seconds) before the first attempt.
+        :param max_delay: the maximum delay (in seconds) between two attempts.
+        :param multiplier: the factor applied to the delay after each failed attempt.
+        :param jitter: the fraction of each delay that is random, so that the agents that lost their connection
+                     | at the same time do not all reconnect at the same time: the delay is drawn uniformly
+                     | between ``(1 - jitter) * delay`` and ``delay``.
+        :param max_attempts: the number of attempts before giving up. By default, the proxy never gives up.
+        :param connect_timeout: the maximum time (in seconds) of each attempt, handshake included.
+        :param buffer_limit: the maximum number of messages buffered during an outage.
+        :param rng: the random number generator of the jitter, returning numbers in ``[0, 1)``.
+        :raises ValueError: if a parameter is out of range.
+        """
+        if initial_delay < 0 or max_delay < initial_delay or multiplier < 1 or not 0 <= jitter <= 1 \
+                or (max_attempts is not None and max_attempts <= 0) or connect_timeout <= 0 or buffer_limit < 0:
+            raise ValueError("Invalid input value for type '{}': parameter out of range.".format(type(self).__name__))
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+        self.jitter = jitter
+        self.max_attempts = max_attempts
+        self.connect_timeout = connect_timeout
+        self.buffer_limit = buffer_limit
+        self._rng = rng
+
+    def delay(self, attempt: int) -> float:
+        """
+        The delay before an attempt.
+
+        :param attempt: the number of the attempt, starting from 0.
+        :return: the delay, in seconds.
+        """
+        delay = min(self.max_delay, self.initial_delay * self.multiplier ** min(attempt, 64))
+        return delay * (1.0 - self.jitter * self._rng())
+
+
+class ReconnectStats:
+    """Counters of the outages of a proxy."""
+
+    def __init__(self) -> None:
+        self.drops = 0
+        self.reconnects = 0
+        self.failovers = 0
+        self.failures = 0
+        self.attempts = 0
+        self.buffered = 0
+        self.overflows = 0
+        self.replayed = 0
+        self.last_outage = 0.0
+
+    def __repr__(self):
+        return "ReconnectStats(drops={}, reconnects={}, failovers={}, failures={}, attempts={}, buffered={}, " \
+               "overflows={}, replayed={}, last_outage={:.6f})".format(self.drops, self.reconnects, self.failovers,
+                                                                       self.failures, self.attempts, self.buffered,
+                                                                       self.overflows, self.replayed,
+                                                                       self.last_outage)
+
+
+class Session:
+    """
+    The state of an agent on the OEF Node, as sent by the proxy: the registered description and services,
+    and the searches without result yet.
+    """
+
+    def __init__(self) -> None:
+        self.description = None  # type: Optional[RegisterDescription]
+        self.services = OrderedDict()  # type: Dict[Tuple[str, bytes], RegisterService]
+        self.searches = OrderedDict()  # type: Dict[int, BaseMessage]
+
+    @staticmethod
+    def _service_key(msg) -> Tuple[str, bytes]:
+        return str(msg.uri), msg.service_description.to_pb().SerializeToString()
+
+    def record(self, msg: BaseMessage) -> bool:
+        """
+        Record a message sent to the OEF Node.
+
+        :param msg: the message.
+        :return: ``True`` if the message is part of the session, and is sent again by
+               | :func:`~oef.reconnect.Session.replay`, ``False`` otherwise.
+        """
+        if isinstance(msg, (SearchAgents, SearchServices, SearchServicesWide)):
+            self.searches[msg.msg_id] = msg
+        elif isinstance(msg, RegisterDescription):
+            self.description = msg
+        elif isinstance(msg, RegisterService):
+            self.services[self._service_key(msg)] = msg
+        elif isinstance(msg, UnregisterDescription):
+            self.description = None
+        elif isinstance(msg, UnregisterService):
+            self.services.pop(self._service_key(msg), None)
+        else:
+            return False
+        return True
+
+    def received(self, case: str, answer_id: int) -> None:
+        """
+        Record a message received from the OEF Node: a search result ends the search, and an error
+        also cancels the registration it answers.
+        """
+        if case not in SEARCH_ANSWER_CASES:
+            return
+        self.searches.pop(answer_id, None)
+        if case == "oef_error":
+            if self.description is not None and self.description.msg_id == answer_id:
+                self.description = None
+            for key in [key for key, msg in self.services.items() if msg.msg_id == answer_id]:
+                del self.services[key]
+
+    def replay(self) -> List[BaseMessage]:
+        """The messages that restore the session on a new connection: registrations first, then the searches."""
+        messages = [self.description] if self.description is not None else []
+        messages.extend(self.services.values())
+        messages.extend(self.searches.values())
+        return messages
@@ -0,0 +1,296 @@
+# -*- coding: utf-8 -*-
+
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2018 Fetch.AI Limited
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+
+"""
+oef.remote
+~~~~~~~~~~
+This module contains :class:`~oef.remote.RemoteCores`, which sends the messages of agents to other agents
+through the OEF Nodes (cores) of the recipients, instead of the node of the sender.
+
+A wide search (:func:`~oef.agents.Agent.search_services_wide`) tells on which core each agent found is.
+Once enabled on an agent (see :func:`~oef.agents.Agent.enable_remote_cores`), the manager learns these routes
+from the search results, and the ``send_*`` methods of the agent send the messages to a known remote agent, or
+with a context whose target URI has a core address, through a connection of the agent to that core.
+The connections are opened on first use, reused, and closed when idle or least recently used.
+"""
+
+import asyncio
+import functools
+import logging
+import struct
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from protocol.src.proto import agent_pb2
+from oef.src.python.dispatch import DEFAULT_HANDLERS, PayloadHandler
+from oef.src.python.messages import BaseMessage
+from oef.src.python.proxy import OEFConnectionError, OEFNetworkProxy
+from oef.src.python.query import SearchResultItem
+from utils.src.python import uri
+
+logger = logging.getLogger(__name__)
+
+"""the address and port of a core"""
+CORE = Tuple[str, int]
+
+DEFAULT_MAX_CONNECTIONS = 64
+DEFAULT_IDLE_TIMEOUT = 300.0
+DEFAULT_MAX_ROUTES = 100000
+
+
+def parse_core(core_uri: str) -> Optional[CORE]:
+    """Parse the ``address:port`` core part of an :class:`~utils.uri.OEFURI`, if it is valid."""
+    address, _, port = core_uri.rpartition(":")
+    if not address or not port.isdigit():
+        return None
+    return address, int(port)
+
+
+class RemoteStats:
+    """Counters of a :class:`~oef.remote.RemoteCores`."""
+
+    def __init__(self) -> None:
+        self.opened = 0
+        self.reused = 0
+        self.failed = 0
+        self.evicted = 0
+        self.expired = 0
+        self.sent = 0
+
+    def __repr__(self):
+        return "RemoteStats(opened={}, reused={}, failed={}, evicted={}, expired={}, sent={})".format(
+            self.opened, self.reused, self.failed, self.evicted, self.expired, self.sent)
+
+
+class _Connection:
+    """The connection of an agent to a remote core."""
+
+    __slots__ = ("proxy", "ready", "task", "pending", "last_used")
+
+    def __init__(self, proxy: OEFNetworkProxy, ready: asyncio.Future) -> None:
+        self.proxy = proxy
+        self.ready = ready
+        self.task = None
+        self.pending = 0
+        self.last_used = time.monotonic()
+
+
+def _pong(proxy: OEFNetworkProxy, answer_id: int) -> None:
+    reply = agent_pb2.Envelope()
+    reply.msg_id = answer_id
+    reply.pong.dummy = 1
+    proxy._send(reply)
+
+
+class RemoteCores:
+    """
+    The connections of agents to remote cores, shared by the agents of a process (which run on the same loop).
+    """
+
+    def __init__(self, max_connections: int = DEFAULT_MAX_CONNECTIONS, idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+                 max_routes: int = DEFAULT_MAX_ROUTES, loop: Optional[asyncio.AbstractEventLoop] = None,
+                 proxy_factory: Callable[..., OEFNetworkProxy] = OEFNetworkProxy) -> None:
+        """
+        Initialize the manager.
+
+        :param max_connections: the maximum number of open connections. Beyond it, the least recently used
+                              | connection without messages in progress is closed.
+        :param idle_timeout: the time (in seconds) after which an unused connection is closed.
+        :param max_routes: the maximum number of agents whose core is remembered.
+        :param loop: the event loop.
+        :param proxy_factory: creates the proxies of the connections, as ``proxy_factory(public_key, address,
+                            | port, loop=loop)``.
+        :raises ValueError: if a parameter is not positive.
+        """
+        if max_connections <= 0 or idle_timeout <= 0 or max_routes <= 0:
+            raise ValueError("Invalid input value for type '{}': max_connections, idle_timeout and max_routes "
+                             "must be positive.".format(type(self).__name__))
+        self.max_connections = max_connections
+        self.idle_timeout = idle_timeout
+        self.max_routes = max_routes
+        self.stats = RemoteStats()
+        self._loop = loop if loop is not None else asyncio.get_event_loop()
+        self._proxy_factory = proxy_factory
+        self._routes = OrderedDict()  # type: Dict[str, CORE]
+        self._connections = OrderedDict()  # type: Dict[Tuple[str, str, int], _Connection]
+        self._sweeper = None
+
+    def __len__(self):
+        """The number of connections, open or opening."""
+        return len(self._connections)
+
+    def learn(self, items: Iterable[SearchResultItem]) -> None:
+        """Remember the cores of the agents found by a wide search."""
+        routes = self._routes
+        for item in items:
+            routes[item.public_key] = (item.core_addr, int(item.core_port))
+            routes.move_to_end(item.public_key)
+        while len(routes) > self.max_routes:
+            routes.popitem(last=False)
+
+    def route(self, destination: str, context: Optional[uri.Context] = None) -> Optional[CORE]:
+        """
+        The core of an agent: the core of the target URI of the context, if any, or the learned one.
+
+        :param destination: the public key of the agent.
+        :param context: the context of the message.
+        :return: the address and port of the core, or ``None`` if it is unknown.
+        """
+        if context is not None and context.targetURI.coreURI:
+            core = parse_core(context.targetURI.coreURI)
+            if core is not None:
+                return core
+        return self._routes.get(destination)
+
+    def submit(self, agent, core: CORE, msg: BaseMessage) -> Optional[asyncio.Future]:
+        """
+        Send a message through the connection of an agent to a core, opened if needed.
+
+        :param agent: the sender.
+        :param core: the address and port of the core.
+        :param msg: the message.
+        :return: ``None`` if the message has been sent at once, otherwise a future, done when it is sent,
+               | or failed if the connection could not be opened.
+        """
+        key = (agent.public_key, core[0], core[1])
+        connection = self._connections.get(key)
+        if connection is not None and not connection.pending and connection.ready.done() \
+                and not connection.task.done():
+            self._connections.move_to_end(key)
+            connection.last_used = time.monotonic()
+            self.stats.reused += 1
+            connection.proxy._send(msg.to_pb())
+            self.stats.sent += 1
+            return None
+        return asyncio.ensure_future(self._send_when_ready(agent, key, msg), loop=self._loop)
+
+    async def _send_when_ready(self, agent, key: Tuple[str, str, int], msg: BaseMessage) -> None:
+        connection = self._connections.get(key)
+        if connection is None or (connection.ready.done() and connection.task.done()):
+            # unknown, or its message loop has ended: the core closed the connection
+            connection = self._open(agent, key)
+        else:
+            self._connections.move_to_end(key)
+            self.stats.reused += 1
+        connection.pending += 1
+        try:
+            await asyncio.shield(connection.ready)
+            connection.last_used = time.monotonic()
+            connection.proxy._send(msg.to_pb())
+            self.stats.sent += 1
+        finally:
+            connection.pending -= 1
+
+    def _open(self, agent, key: Tuple[str, str, int]) -> _Connection:
+        self._stop_later(self._close_connection(key))
+        proxy = self._proxy_factory(key[0], key[1], key[2], loop=self._loop)
+        # the remote core pings the agent on this connection: answer on it, not on the connection of the agent
+        proxy.register_payload_handler("ping", PayloadHandler(DEFAULT_HANDLERS["ping"].decoder,
+                                                              functools.partial(_pong, proxy)))
+        connection = _Connection(proxy, self._loop.create_future())
+        self._connections[key] = connection
+        self.stats.opened += 1
+        connection.task = asyncio.ensure_future(self._connect(agent, key, connection), loop=self._loop)
+        self._evict()
+        if self._sweeper is None:
+            self._sweeper = self._loop.call_later(self.idle_timeout / 2, self._sweep)
+        return connection
+
+    async def _connect(self, agent, key: Tuple[str, str, int], connection: _Connection) -> None:
+        proxy = connection.proxy
+        try:
+            if not await proxy.connect():
+                raise OEFConnectionError("Public key already in use.")
+        except (OSError, asyncio.IncompleteReadError, struct.error, asyncio.TimeoutError) as e:
+            logger.warning("Agent {}: could not connect to the core {}:{}: {!r}".format(key[0], key[1], key[2], e))
+            self.stats.failed += 1
+            proxy._close_connection()
+            if self._connections.get(key) is connection:
+                del self._connections[key]
+            if not connection.ready.done():
+                connection.ready.set_exception(e if isinstance(e, OSError) else OEFConnectionError(repr(e)))
+                # retrieved here, so that an unused failure is not reported by asyncio
+                connection.ready.exception()
+            return
+        # the messages from the remote core are dispatched to the agent, like those from its own core
+        connection.task = asyncio.ensure_future(proxy.loop(agent), loop=self._loop)
+        connection.ready.set_result(None)
+
+    def _evict(self) -> None:
+        excess = len(self._connections) - self.max_connections
+        if excess <= 0:
+            return
+        for key in [key for key, connection in self._connections.items() if not connection.pending][:excess]:
+            self.stats.evicted += 1
+            self._stop_later(self._close_connection(key))
+
+    def _sweep(self) -> None:
+        self._sweeper = None
+        self.close_idle()
+        if self._connections:
+            self._sweeper = self._loop.call_later(self.idle_timeout / 2, self._sweep)
+
+    def close_idle(self, now: Optional[float] = None) -> int:
+        """
+        Close the connections unused for longer than the idle timeout. It is also done periodically.
+
+        :param now: the current time, as given by :func:`time.monotonic`.
+        :return: the number of connections closed.
+        """
+        now = now if now is not None else time.monotonic()
+        idle = [key for key, connection in self._connections.items()
+                if not connection.pending and now - connection.last_used > self.idle_timeout]
+        for key in idle:
+            self.stats.expired += 1
+            self._stop_later(self._close_connection(key))
+        return len(idle)
+
+    def _close_connection(self, key: Tuple[str, str, int]) -> Optional[OEFNetworkProxy]:
+        """Forget a connection and cancel its tasks. Returns its proxy, if it has to be disconnected."""
+        connection = self._connections.pop(key, None)
+        if connection is None:
+            return None
+        proxy = connection.proxy
+        proxy._active_loop = False
+        connection.task.cancel()
+        if not connection.ready.done():
+            connection.ready.cancel()
+        return proxy if proxy.is_connected() else None
+
+    def _stop_later(self, proxy: Optional[OEFNetworkProxy]) -> None:
+        if proxy is not None:
+            asyncio.ensure_future(self._stop(proxy), loop=self._loop)
+
+    @staticmethod
+    async def _stop(proxy: OEFNetworkProxy) -> None:
+        try:
+            await proxy.stop()
+        except OSError as e:
+            logger.debug("Proxy %s: disconnection failed: %s", proxy.public_key, e)
+
+    async def close(self) -> None:
+        """Close all the connections."""
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            self._sweeper = None
+        proxies = [self._close_connection(key) for key in list(self._connections)]
+        await asyncio.gather(*(self._stop(proxy) for proxy in proxies if proxy is not None))
@@ -0,0 +1,302 @@
+# -*- coding: utf-8 -*-
+
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2018 Fetch.AI Limited
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+
+"""
+oef.runner
+~~~~~~~~~~
+This module contains :class:`~oef.runner.MultiProcessRunner`, which runs agents in several worker processes.
+
+The agents are defined by :class:`~oef.runner.AgentSpec` objects, and sharded round-robin across the workers.
+Each worker creates its agents on its own event loop and runs them in an :class:`~oef.fleet.AgentFleet`.
+The supervisor talks to each worker through a pipe, which the worker reads from its event loop: a worker that
+does not answer a health check in time is either dead or has a blocked loop, and it is restarted.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from oef.src.python.fleet import AgentFleet, DEFAULT_MAX_CONNECTING
+from oef.src.python.metrics import merge_snapshots, LABELS
+
+logger = logging.getLogger(__name__)
+
+
+class AgentSpec:
+    """
+    The definition of an agent, created in a worker process as ``factory(*args, loop=loop, **kwargs)``,
+    e.g. ``AgentSpec(OEFAgent, "public_key", "127.0.0.1", 3333)``.
+    The factory and its arguments must be picklable: the factory is typically an agent class.
+    """
+
+    __slots__ = ("factory", "args", "kwargs")
+
+    def __init__(self, factory: Callable, *args, **kwargs) -> None:
+        self.factory = factory
+        self.args = args
+        self.kwargs = kwargs
+
+    def create(self, loop: asyncio.AbstractEventLoop):
+        return self.factory(*self.args, loop=loop, **self.kwargs)
+
+    def __repr__(self):
+        return "AgentSpec({}, *{}, **{})".format(getattr(self.factory, "__name__", self.factory),
+                                                 self.args, self.kwargs)
+
+
+def _worker_main(specs: Sequence[AgentSpec], conn, max_connecting: int, stagger: float) -> None:
+    """The main function of a worker process."""
+    # an interrupt is handled by the supervisor, which stops the workers
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    fleet = AgentFleet([spec.create(loop) for spec in specs], loop=loop,
+                       max_connecting=max_connecting, stagger=stagger)
+    registry = fleet.enable_metrics()
+    stopping = loop.create_future()
+
+    def on_command():
+        try:
+            command, seq = conn.recv()
+        except (EOFError, OSError):
+            # the supervisor is gone
+            command, seq = "stop", None
+        if command == "health":
+            conn.send(("health", seq, {"pid": os.getpid(), "agents": len(fleet), "running": fleet.running}))
+        elif command == "metrics":
+            conn.send(("metrics", seq, registry.snapshot()))
+        elif command == "stop" and not stopping.done():
+            stopping.set_result(seq)
+
+    async def main():
+        loop.add_reader(conn.fileno(), on_command)
+        failed = await fleet.async_start()
+        conn.send(("started", None, [agent.public_key for agent in failed]))
+        seq = await stopping
+        loop.remove_reader(conn.fileno())
+        await fleet.async_stop()
+        if seq is not None:
+            conn.send(("stopped", seq, dict(fleet.stats.exits)))
+
+    try:
+        loop.run_until_complete(main())
+    finally:
+        loop.close()
+
+
+class _Worker:
+    """The supervisor side of a worker process."""
+
+    def __init__(self, shard: int, specs: List[AgentSpec]) -> None:
+        self.shard = shard
+        self.specs = specs
+        self.process = None
+        self.conn = None
+        self.restarts = 0
+        self.seq = 0
+        self.failed_agents = None  # type: Optional[List[str]]
+        self.health = None  # type: Optional[Dict[str, Any]]
+
+    def request(self, command: str, timeout: float) -> Optional[Any]:
+        """Send a command to the worker, and wait for its answer. Returns ``None`` on timeout or error."""
+        self.seq += 1
+        seq = self.seq
+        try:
+            self.conn.send((command, seq))
+            deadline = time.monotonic() + timeout
+            while self.conn.poll(max(0.0, deadline - time.monotonic())):
+                kind, answer_seq, payload = self.conn.recv()
+                if kind == "started":
+                    self.failed_agents = payload
+                elif answer_seq == seq:
+                    return payload
+                # else: the late answer to a request that timed out
+                if time.monotonic() >= deadline:
+                    break
+        except (EOFError, OSError) as e:
+            logger.debug("Worker %s: %s failed: %s", self.shard, command, e)
+        return None
+
+
+class MultiProcessRunner:
+    """Runs agents in several worker processes, with health checks, restarts and a rolling shutdown."""
+
+    def __init__(self, specs: Sequence[AgentSpec], workers: Optional[int] = None,
+                 max_connecting: int = DEFAULT_MAX_CONNECTING, stagger: float = 0.0,
+                 health_timeout: float = 5.0, max_restarts: int = 3,
+                 mp_context: Optional[multiprocessing.context.BaseContext] = None) -> None:
+        """
+        Initialize the runner.
+
+        :param specs: the definitions of the agents.
+        :param workers: the number of worker processes. By default, the number of CPUs.
+        :param max_connecting: for each worker, see :class:`~oef.fleet.AgentFleet`.
+        :param stagger: for each worker, see :class:`~oef.fleet.AgentFleet`.
+        :param health_timeout: the time (in seconds) a worker has to answer a health check.
+        :param max_restarts: the maximum number of restarts of each worker.
+        :param mp_context: the multiprocessing context. By default, ``spawn``, since the workers create
+                         | their own event loop and should not inherit the state of the supervisor.
+        """
+        workers = workers if workers is not None else (os.cpu_count() or 1)
+        if workers <= 0:
+            raise ValueError("Invalid input value for type '{}': workers must be positive."
+                             .format(type(self).__name__))
+        workers = min(workers, len(specs)) or 1
+        self.max_connecting = max_connecting
+        self.stagger = stagger
+        self.health_timeout = health_timeout
+        self.max_restarts = max_restarts
+        self._context = mp_context if mp_context is not None else multiprocessing.get_context("spawn")
+        self._workers = [_Worker(shard, list(specs[shard::workers])) for shard in range(workers)]
+        self._stopping = False
+
+    @property
+    def workers(self) -> int:
+        return len(self._workers)
+
+    def _spawn(self, worker: _Worker) -> None:
+        parent, child = self._context.Pipe()
+        worker.process = self._context.Process(target=_worker_main, name="oef-worker-{}".format(worker.shard),
+                                               args=(worker.specs, child, self.max_connecting, self.stagger),
+                                               daemon=True)
+        worker.process.start()
+        child.close()
+        worker.conn = parent
+        worker.failed_agents = None
+        worker.health = None
+
+    def _kill(self, worker: _Worker) -> None:
+        if worker.process.is_alive():
+            worker.process.kill()
+        worker.process.join()
+        worker.conn.close()
+
+    def start(self) -> None:
+        """Start all the worker processes."""
+        self._stopping = False
+        for worker in self._workers:
+            self._spawn(worker)
+
+    def check(self) -> Dict[int, Optional[Dict[str, Any]]]:
+        """
+        Check the health of the workers, and restart those that died or did not answer.
+
+        :return: for every shard, the health of its worker (its pid, and its numbers of agents
+               | and running agents), or ``None`` if it is being restarted or has failed for good.
+        """
+        result = {}
+        for worker in self._workers:
+            if worker.process is None:
+                result[worker.shard] = None
+                continue
+            health = worker.request("health", self.health_timeout) if worker.process.is_alive() else None
+            worker.health = health
+            result[worker.shard] = health
+            if health is None and not self._stopping:
+                self._restart(worker)
+        return result
+
+    def _restart(self, worker: _Worker) -> None:
+        exitcode = worker.process.exitcode
+        self._kill(worker)
+        if worker.restarts >= self.max_restarts:
+            logger.error("Worker {} failed (exit code {}), and was restarted {} times: giving up."
+                         .format(worker.shard, exitcode, worker.restarts))
+            worker.process = None
+            return
+        worker.restarts += 1
+        logger.warning("Worker {} failed (exit code {}): restart {}/{}."
+                       .format(worker.shard, exitcode, worker.restarts, self.max_restarts))
+        self._spawn(worker)
+
+    def restarts(self) -> Dict[int, int]:
+        """The number of restarts of each worker."""
+        return {worker.shard: worker.restarts for worker in self._workers}
+
+    def failed_agents(self) -> List[str]:
+        """The public keys of the agents that could not connect, in the workers that have started them."""
+        return [key for worker in self._workers for key in (worker.failed_agents or [])]
+
+    def metrics(self) -> Dict[str, Dict[LABELS, object]]:
+        """
+        The metrics of the fleets of the workers, added up. See :func:`~oef.metrics.merge_snapshots`.
+        Workers that do not answer in time are left out.
+        """
+        snapshots = []
+        for worker in self._workers:
+            if worker.process is not None and worker.process.is_alive():
+                snapshot = worker.request("metrics", self.health_timeout)
+                if snapshot is not None:
+                    snapshots.append(snapshot)
+        return merge_snapshots(snapshots)
+
+    def stop(self, timeout: float = 10.0) -> Dict[int, Optional[Dict[str, int]]]:
+        """
+        Stop the workers one at a time: each one disconnects its agents and exits before the next one is asked to.
+        A worker that does not stop in time is killed.
+
+        :param timeout: the time (in seconds) each worker has to stop.
+        :return: for every shard, how the message loops of its agents ended, or ``None`` if the worker was killed.
+        """
+        self._stopping = True
+        result = {}
+        for worker in self._workers:
+            if worker.process is None:
+                result[worker.shard] = None
+                continue
+            exits = worker.request("stop", timeout) if worker.process.is_alive() else None
+            worker.process.join(timeout)
+            self._kill(worker)
+            worker.process = None
+            result[worker.shard] = exits
+        return result
+
+    def run(self, health_interval: float = 1.0, duration: Optional[float] = None) -> None:
+        """
+        Start the workers and check their health periodically, until ``duration`` has elapsed, or a
+        :class:`KeyboardInterrupt`. Then stop them.
+
+        :param health_interval: the time (in seconds) between two health checks.
+        :param duration: how long to run, by default until interrupted.
+        :return: ``None``
+        """
+        self.start()
+        deadline = time.monotonic() + duration if duration is not None else None
+        try:
+            while deadline is None or time.monotonic() < deadline:
+                time.sleep(health_interval if deadline is None else
+                           max(0.0, min(health_interval, deadline - time.monotonic())))
+                self.check()
+        except KeyboardInterrupt:
+            logger.info("Interrupted: stopping the workers.")
+        finally:
+            self.stop()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
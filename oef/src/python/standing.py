@@ -0,0 +1,373 @@
+# -*- coding: utf-8 -*-
+
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2018 Fetch.AI Limited
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+
+"""
+oef.standing
+~~~~~~~~~~~~
+This module defines standing queries: queries subscribed to a local collection of descriptions,
+that are notified only when the set of matching descriptions changes.
+"""
+
+import logging
+from bisect import bisect_left, bisect_right, insort
+from typing import Callable, Dict, Hashable, List, Optional, Set, Tuple
+
+from oef.src.python.query import Query, Constraint, And, Or, Eq, In, Lt, LtEq, Gt, GtEq, Range
+from oef.src.python.schema import Description
+
+logger = logging.getLogger(__name__)
+
+"""
+Called with ``(subscription_id, key, description, matched)``. ``matched`` is ``True`` when the description
+starts matching the query and ``False`` when it stops matching it.
+"""
+MATCH_CALLBACK = Callable[[int, Hashable, Description, bool], None]
+
+_ANCHOR_EQ = "eq"
+_ANCHOR_RANGE = "range"
+_ANCHOR_PRESENT = "present"
+
+# used to rank the anchors of a conjunction: the cheaper, the more selective.
+_ANCHOR_COST = {_ANCHOR_EQ: 1, _ANCHOR_RANGE: 2, _ANCHOR_PRESENT: 4}
+
+_MAX_ID = float("inf")
+
+
+def _is_hashable(value) -> bool:
+    return type(value).__hash__ is not None
+
+
+def _constraint_anchors(constraint: Constraint) -> List[Tuple]:
+    """
+    Compute the index entries of a single constraint.
+
+    :param constraint: the constraint.
+    :return: a list of anchors. A description can satisfy the constraint only if it hits one of them.
+    """
+    name = constraint.attribute_name
+    constraint_type = constraint.constraint
+    if isinstance(constraint_type, Eq) and _is_hashable(constraint_type.value):
+        return [(_ANCHOR_EQ, name, type(constraint_type.value), constraint_type.value)]
+    if isinstance(constraint_type, In) and all(_is_hashable(v) for v in constraint_type.values):
+        return [(_ANCHOR_EQ, name, type(v), v) for v in set(constraint_type.values)]
+    if isinstance(constraint_type, (Lt, LtEq)) and _is_hashable(constraint_type.value):
+        return [(_ANCHOR_RANGE, name, type(constraint_type.value), None, constraint_type.value)]
+    if isinstance(constraint_type, (Gt, GtEq)) and _is_hashable(constraint_type.value):
+        return [(_ANCHOR_RANGE, name, type(constraint_type.value), constraint_type.value, None)]
+    if isinstance(constraint_type, Range) and _is_hashable(constraint_type.values[0]):
+        low, high = constraint_type.values
+        return [(_ANCHOR_RANGE, name, type(low), low, high)]
+    # Constraint.check is False whenever the attribute is missing.
+    return [(_ANCHOR_PRESENT, name)]
+
+
+def _anchors(expr) -> Optional[List[Tuple]]:
+    """
+    Compute the index entries of a constraint expression.
+
+    :param expr: a :class:`~oef.query.ConstraintExpr` or a :class:`~oef.query.Query`.
+    :return: a list of anchors, or ``None`` if the expression cannot be indexed and must be checked
+           | against every description.
+    """
+    if isinstance(expr, Constraint):
+        return _constraint_anchors(expr)
+    if isinstance(expr, (Query, And)):
+        # a conjunction is indexed by its most selective member.
+        best, best_cost = None, None
+        for c in expr.constraints:
+            anchors = _anchors(c)
+            if anchors is None:
+                continue
+            cost = sum(_ANCHOR_COST[a[0]] for a in anchors)
+            if best is None or cost < best_cost:
+                best, best_cost = anchors, cost
+        return best
+    if isinstance(expr, Or):
+        # a disjunction needs all of its members to be indexed.
+        result = []
+        for c in expr.constraints:
+            anchors = _anchors(c)
+            if anchors is None:
+                return None
+            result.extend(anchors)
+        return result
+    # e.g. Not, which can be satisfied by descriptions that do not have the attribute at all.
+    return None
+
+
+class _RangeIndex:
+    """
+    Index of ordering constraints over one attribute (and type), answering which intervals contain a value.
+    One-sided bounds are answered exactly. For two-sided ranges the shorter of the two candidate lists
+    (by lower and by upper bound) is filtered, so the cost stays close to the number of ranges that contain the value.
+    """
+
+    def __init__(self):
+        self.upper_only = []  # type: List[Tuple]
+        self.lower_only = []  # type: List[Tuple]
+        self.lows = []  # type: List[Tuple]
+        self.highs = []  # type: List[Tuple]
+
+    def __len__(self):
+        return len(self.upper_only) + len(self.lower_only) + len(self.lows)
+
+    def add(self, low, high, sub_id: int) -> None:
+        if low is None:
+            insort(self.upper_only, (high, sub_id))
+        elif high is None:
+            insort(self.lower_only, (low, sub_id))
+        else:
+            insort(self.lows, (low, sub_id, high))
+            insort(self.highs, (high, sub_id, low))
+
+    @staticmethod
+    def _remove(entries: List[Tuple], entry: Tuple) -> None:
+        i = bisect_left(entries, entry)
+        if i < len(entries) and entries[i] == entry:
+            del entries[i]
+
+    def remove(self, low, high, sub_id: int) -> None:
+        if low is None:
+            self._remove(self.upper_only, (high, sub_id))
+        elif high is None:
+            self._remove(self.lower_only, (low, sub_id))
+        else:
+            self._remove(self.lows, (low, sub_id, high))
+            self._remove(self.highs, (high, sub_id, low))
+
+    def stab(self, value, result: Set[int]) -> None:
+        """
+        Add to ``result`` the subscriptions whose interval contains the value (bounds are considered inclusive).
+        """
+        i = bisect_left(self.upper_only, (value,))
+        result.update(sub_id for _, sub_id in self.upper_only[i:])
+        j = bisect_right(self.lower_only, (value, _MAX_ID))
+        result.update(sub_id for _, sub_id in self.lower_only[:j])
+
+        if not self.lows:
+            return
+        n_low = bisect_right(self.lows, (value, _MAX_ID))
+        first_high = bisect_left(self.highs, (value,))
+        if n_low <= len(self.highs) - first_high:
+            result.update(sub_id for _, sub_id, high in self.lows[:n_low] if high >= value)
+        else:
+            result.update(sub_id for _, sub_id, low in self.highs[first_high:] if low <= value)
+
+
+class _Subscription:
+    def __init__(self, sub_id: int, query: Query, callback: MATCH_CALLBACK, anchors: Optional[List[Tuple]]):
+        self.id = sub_id
+        self.query = query
+        self.callback = callback
+        self.anchors = anchors
+        self.matches = set()  # type: Set[Hashable]
+
+
+class StandingQueryEngine:
+    """
+    Maintain the matches of many subscribed queries over a local collection of descriptions.
+
+    Every subscription is indexed by one of the attributes (and values or ranges) its query references.
+    When a description is added, updated or removed, it is checked only against the subscriptions
+    it could affect, and the callbacks are called only for the subscriptions whose match set changes.
+
+    Examples:
+        >>> events = []
+        >>> engine = StandingQueryEngine()
+        >>> sub_id = engine.subscribe(Query([Constraint("price", Lt(10))]),
+        ...                           lambda s, key, description, matched: events.append((key, matched)))
+        >>> engine.add("offer_1", Description({"price": 5}))
+        >>> engine.add("offer_2", Description({"price": 15}))
+        >>> engine.update("offer_1", Description({"price": 6}))
+        >>> engine.update("offer_2", Description({"price": 8}))
+        >>> engine.remove("offer_1")
+        >>> events
+        [('offer_1', True), ('offer_2', True), ('offer_1', False)]
+    """
+
+    def __init__(self) -> None:
+        self._next_id = 0
+        self._subscriptions = {}  # type: Dict[int, _Subscription]
+        self._descriptions = {}  # type: Dict[Hashable, Description]
+        self._matches = {}  # type: Dict[Hashable, Set[int]]
+
+        self._eq_index = {}  # type: Dict[Tuple, Set[int]]
+        self._range_index = {}  # type: Dict[Tuple, _RangeIndex]
+        self._present_index = {}  # type: Dict[str, Set[int]]
+        self._scan = set()  # type: Set[int]
+
+    def __len__(self):
+        return len(self._descriptions)
+
+    @property
+    def descriptions(self) -> Dict[Hashable, Description]:
+        """The descriptions in the collection, by key."""
+        return self._descriptions
+
+    def matches(self, sub_id: int) -> Set[Hashable]:
+        """
+        Get the keys of the descriptions that currently match a subscription.
+
+        :param sub_id: the subscription identifier.
+        :return: the set of matching keys.
+        """
+        return set(self._subscriptions[sub_id].matches)
+
+    def subscribe(self, query: Query, callback: MATCH_CALLBACK) -> int:
+        """
+        Subscribe a query. The callback is immediately called for the descriptions already matching it.
+
+        :param query: the query.
+        :param callback: called whenever a description starts or stops matching the query.
+        :return: the subscription identifier.
+        """
+        sub_id = self._next_id
+        self._next_id += 1
+        anchors = _anchors(query)
+        if anchors is not None:
+            anchors = list(set(anchors))
+        subscription = _Subscription(sub_id, query, callback, anchors)
+        self._subscriptions[sub_id] = subscription
+        self._index(subscription)
+
+        for key, description in self._descriptions.items():
+            if query.check(description):
+                subscription.matches.add(key)
+                self._matches[key].add(sub_id)
+        for key in list(subscription.matches):
+            callback(sub_id, key, self._descriptions[key], True)
+        return sub_id
+
+    def unsubscribe(self, sub_id: int) -> None:
+        """
+        Remove a subscription. No callback is called.
+
+        :param sub_id: the subscription identifier.
+        :return: ``None``
+        """
+        subscription = self._subscriptions.pop(sub_id)
+        self._unindex(subscription)
+        for key in subscription.matches:
+            self._matches[key].discard(sub_id)
+
+    def add(self, key: Hashable, description: Description) -> None:
+        """
+        Add a description to the collection, or replace the one with the same key.
+
+        :param key: the key of the description, e.g. the public key of the agent.
+        :param description: the description.
+        :return: ``None``
+        """
+        old_matches = self._matches.get(key, set())
+        new_matches = set()
+        for sub_id in self._candidates(description):
+            if self._subscriptions[sub_id].query.check(description):
+                new_matches.add(sub_id)
+
+        self._descriptions[key] = description
+        self._matches[key] = new_matches
+        started = new_matches - old_matches
+        stopped = old_matches - new_matches
+        for sub_id in started:
+            self._subscriptions[sub_id].matches.add(key)
+        for sub_id in stopped:
+            self._subscriptions[sub_id].matches.discard(key)
+
+        for sub_id in stopped:
+            self._subscriptions[sub_id].callback(sub_id, key, description, False)
+        for sub_id in started:
+            self._subscriptions[sub_id].callback(sub_id, key, description, True)
+
+    update = add
+
+    def remove(self, key: Hashable) -> None:
+        """
+        Remove a description from the collection.
+
+        :param key: the key of the description.
+        :return: ``None``
+        """
+        description = self._descriptions.pop(key)
+        stopped = self._matches.pop(key)
+        for sub_id in stopped:
+            self._subscriptions[sub_id].matches.discard(key)
+        for sub_id in stopped:
+            self._subscriptions[sub_id].callback(sub_id, key, description, False)
+
+    def _candidates(self, description: Description) -> Set[int]:
+        """
+        Compute the subscriptions that could be satisfied by a description.
+
+        :param description: the description.
+        :return: a superset of the identifiers of the matching subscriptions.
+        """
+        result = set(self._scan)
+        for name, value in description.values.items():
+            present = self._present_index.get(name)
+            if present:
+                result.update(present)
+            value_type = type(value)
+            if value_type.__hash__ is None:
+                continue
+            eq = self._eq_index.get((name, value_type, value))
+            if eq:
+                result.update(eq)
+            ranges = self._range_index.get((name, value_type))
+            if ranges:
+                ranges.stab(value, result)
+        return result
+
+    def _index(self, subscription: _Subscription) -> None:
+        sub_id = subscription.id
+        if subscription.anchors is None:
+            self._scan.add(sub_id)
+            return
+        for anchor in subscription.anchors:
+            kind = anchor[0]
+            if kind == _ANCHOR_EQ:
+                self._eq_index.setdefault(anchor[1:], set()).add(sub_id)
+            elif kind == _ANCHOR_RANGE:
+                self._range_index.setdefault(anchor[1:3], _RangeIndex()).add(anchor[3], anchor[4], sub_id)
+            else:
+                self._present_index.setdefault(anchor[1], set()).add(sub_id)
+
+    def _unindex(self, subscription: _Subscription) -> None:
+        sub_id = subscription.id
+        if subscription.anchors is None:
+            self._scan.discard(sub_id)
+            return
+        for anchor in subscription.anchors:
+            kind = anchor[0]
+            if kind == _ANCHOR_EQ:
+                entries = self._eq_index[anchor[1:]]
+                entries.discard(sub_id)
+                if not entries:
+                    del self._eq_index[anchor[1:]]
+            elif kind == _ANCHOR_RANGE:
+                ranges = self._range_index[anchor[1:3]]
+                ranges.remove(anchor[3], anchor[4], sub_id)
+                if not len(ranges):
+                    del self._range_index[anchor[1:3]]
+            else:
+                entries = self._present_index[anchor[1]]
+                entries.discard(sub_id)
+                if not entries:
+                    del self._present_index[anchor[1]]
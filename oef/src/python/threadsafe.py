@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2018 Fetch.AI Limited
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+
+"""
+oef.threadsafe
+~~~~~~~~~~~~~~
+This module contains :class:`~oef.threadsafe.ThreadSafeAgent`, which runs an agent in a dedicated thread
+and lets any other thread use it.
+
+The methods of an agent, and of its proxy, must be called from the thread of its event loop. The facade queues
+the calls made from other threads, and wakes the event loop up once per batch of calls, instead of once per call:
+at high rates, the calls made while the loop is busy are all executed at its next wakeup.
+"""
+
+import asyncio
+import concurrent.futures
+import logging
+import threading
+from collections import deque
+from typing import Awaitable, Callable, Optional
+
+from oef.src.python.agents import Agent
+from oef.src.python.messages import CFP_TYPES, PROPOSE_TYPES
+from oef.src.python.query import Query
+from oef.src.python.schema import Description
+from utils.src.python import uri
+
+logger = logging.getLogger(__name__)
+
+
+class ThreadSafeAgent:
+    """
+    Runs an agent on its event loop, in a dedicated thread. Its methods can be called from any thread,
+    and return a :class:`concurrent.futures.Future` of the result of the corresponding method of the agent.
+    For the rate-limited methods, the future is done when the message has actually been sent.
+    """
+
+    def __init__(self, agent: Agent) -> None:
+        """
+        Initialize the facade.
+
+        :param agent: the agent. Its event loop must not be running: the facade runs it in its own thread.
+        """
+        self.agent = agent
+        self._loop = agent._loop
+        self._thread = None
+        self._calls = deque()
+        self._lock = threading.Lock()
+        self._wakeup_pending = False
+        self._running = False
+        self._stopped = None
+        self.calls = 0
+        self.wakeups = 0
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    def start(self, timeout: Optional[float] = None) -> None:
+        """
+        Start the thread of the agent, connect the agent and start its message loop.
+
+        :param timeout: the maximum time (in seconds) to wait for the connection.
+        :return: ``None``
+        :raises Exception: whatever the connection raises, e.g. :class:`~oef.proxy.OEFConnectionError`.
+        """
+        if self._thread is not None:
+            return
+        connected = concurrent.futures.Future()
+        self._thread = threading.Thread(target=self._run, args=(connected,), name="oef-agent", daemon=True)
+        self._thread.start()
+        try:
+            connected.result(timeout)
+        except BaseException:
+            self._thread.join(timeout)
+            self._thread = None
+            raise
+
+    def _run(self, connected: concurrent.futures.Future) -> None:
+        asyncio.set_event_loop(self._loop)
+
+        async def main():
+            try:
+                await self.agent.async_connect()
+            except BaseException as e:
+                connected.set_exception(e)
+                return
+            self._stopped = self._loop.create_future()
+            self._running = True
+            connected.set_result(None)
+            try:
+                await self.agent.async_run()
+                # the message loop also ends when the node closes the connection: wait for stop() anyway
+                await self._stopped
+            finally:
+                await self.agent.async_disconnect()
+
+        try:
+            self._loop.run_until_complete(main())
+        finally:
+            self._running = False
+            self._fail_pending()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """
+        Stop the message loop of the agent, disconnect it and stop its thread.
+        The calls made before are executed first, the calls made after fail with a :class:`RuntimeError`.
+
+        :param timeout: the maximum time (in seconds) to wait for the thread.
+        :return: ``None``
+        """
+        if self._thread is None:
+            return
+        self.call(self._request_stop)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _request_stop(self) -> None:
+        with self._lock:
+            self._running = False
+        if self.agent._task is not None:
+            self.agent.stop()
+        if not self._stopped.done():
+            self._stopped.set_result(None)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def call(self, function: Callable, *args) -> concurrent.futures.Future:
+        """
+        Call a function on the event loop of the agent.
+
+        :param function: the function. If it returns an :class:`asyncio.Future`, the returned future is chained to it.
+        :param args: its arguments.
+        :return: the future of its result.
+        """
+        future = concurrent.futures.Future()
+        with self._lock:
+            if not self._running:
+                future.set_exception(RuntimeError("The agent {} is not running.".format(self.agent.public_key)))
+                return future
+            self._calls.append((future, function, args))
+            self.calls += 1
+            wakeup = not self._wakeup_pending
+            if wakeup:
+                self._wakeup_pending = True
+                self.wakeups += 1
+        if wakeup:
+            self._loop.call_soon_threadsafe(self._run_calls)
+        return future
+
+    def call_async(self, coroutine_function: Callable[..., Awaitable], *args) -> concurrent.futures.Future:
+        """Run a coroutine function on the event loop of the agent. See :func:`~oef.threadsafe.ThreadSafeAgent.call`."""
+        return self.call(lambda: asyncio.ensure_future(coroutine_function(*args), loop=self._loop))
+
+    def _run_calls(self) -> None:
+        with self._lock:
+            calls = self._calls
+            self._calls = deque()
+            self._wakeup_pending = False
+        for future, function, args in calls:
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                result = function(*args)
+            except Exception as e:
+                future.set_exception(e)
+                continue
+            if isinstance(result, asyncio.Future):
+                result.add_done_callback(lambda done, future=future: _copy_result(done, future))
+            else:
+                future.set_result(result)
+
+    def _fail_pending(self) -> None:
+        with self._lock:
+            calls = self._calls
+            self._calls = deque()
+            self._wakeup_pending = False
+        for future, _, _ in calls:
+            if future.set_running_or_notify_cancel():
+                future.set_exception(RuntimeError("The agent {} stopped.".format(self.agent.public_key)))
+
+    def register_agent(self, msg_id: int, agent_description: Description) -> concurrent.futures.Future:
+        return self.call(self.agent.register_agent, msg_id, agent_description)
+
+    def unregister_agent(self, msg_id: int) -> concurrent.futures.Future:
+        return self.call(self.agent.unregister_agent, msg_id)
+
+    def register_service(self, msg_id: int, service_description: Description,
+                         service_id: str = "") -> concurrent.futures.Future:
+        return self.call(self.agent.register_service, msg_id, service_description, service_id)
+
+    def unregister_service(self, msg_id: int, service_description: Description,
+                           service_id: str = "") -> concurrent.futures.Future:
+        return self.call(self.agent.unregister_service, msg_id, service_description, service_id)
+
+    def search_agents(self, search_id: int, query: Query) -> concurrent.futures.Future:
+        return self.call(self.agent.search_agents, search_id, query)
+
+    def search_services(self, search_id: int, query: Query) -> concurrent.futures.Future:
+        return self.call(self.agent.search_services, search_id, query)
+
+    def search_services_wide(self, search_id: int, query: Query) -> concurrent.futures.Future:
+        return self.call(self.agent.search_services_wide, search_id, query)
+
+    def send_message(self, msg_id: int, dialogue_id: int, destination: str, msg: bytes,
+                     context: Optional[uri.Context] = None) -> concurrent.futures.Future:
+        return self.call(self.agent.send_message, msg_id, dialogue_id, destination, msg, context)
+
+    def send_cfp(self, msg_id: int, dialogue_id: int, destination: str, target: int, query: CFP_TYPES,
+                 context: Optional[uri.Context] = None) -> concurrent.futures.Future:
+        return self.call(self.agent.send_cfp, msg_id, dialogue_id, destination, target, query, context)
+
+    def send_propose(self, msg_id: int, dialogue_id: int, destination: str, target: int, proposals: PROPOSE_TYPES,
+                     context: Optional[uri.Context] = None) -> concurrent.futures.Future:
+        return self.call(self.agent.send_propose, msg_id, dialogue_id, destination, target, proposals, context)
+
+    def send_accept(self, msg_id: int, dialogue_id: int, destination: str, target: int,
+                    context: Optional[uri.Context] = None) -> concurrent.futures.Future:
+        return self.call(self.agent.send_accept, msg_id, dialogue_id, destination, target, context)
+
+    def send_decline(self, msg_id: int, dialogue_id: int, destination: str, target: int,
+                     context: Optional[uri.Context] = None) -> concurrent.futures.Future:
+        return self.call(self.agent.send_decline, msg_id, dialogue_id, destination, target, context)
+
+
+def _copy_result(source: asyncio.Future, target: concurrent.futures.Future) -> None:
+    if source.cancelled():
+        # the target is already running: cancel() would leave it pending forever
+        target.set_exception(concurrent.futures.CancelledError())
+    elif source.exception() is not None:
+        target.set_exception(source.exception())
+    else:
+        target.set_result(source.result())
@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2018 Fetch.AI Limited
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+
+"""
+oef.tracing
+~~~~~~~~~~~
+This module traces the latency of the dialogues between agents, e.g. for a FIPA negotiation:
+CFP sent, Propose received, Accept sent, data Message received.
+
+The messages are correlated by ``(counterparty, dialogue_id)``, both when they are sent and when they are received.
+Each message produces a *step* span, from the previous message of the dialogue to this one, and the end of the
+dialogue produces a *dialogue* span. A dialogue ends when it is declined, when a simple message is exchanged after
+an accept, when :func:`~oef.tracing.DialogueTracer.finish` is called, or after a period of inactivity.
+
+Enable the tracing with :func:`~oef.core.OEFProxy.enable_tracing`.
+"""
+
+import json
+import logging
+import time
+import zlib
+from collections import deque
+from typing import Callable, Dict, Iterable, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+SENT = "sent"
+RECEIVED = "received"
+
+"""the name of the step of each payload case of the received messages"""
+STEP_OF_CASE = {
+    "content.content": "message",
+    "fipa.cfp": "cfp",
+    "fipa.propose": "propose",
+    "fipa.accept": "accept",
+    "fipa.decline": "decline",
+}
+
+EXPORTER = Callable[[Dict], None]
+
+
+class JsonlExporter:
+    """Appends the spans to a file, one JSON object per line."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._file = open(path, "a", encoding="utf-8")
+
+    def __call__(self, span: Dict) -> None:
+        self._file.write(json.dumps(span) + "\n")
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class _Dialogue:
+
+    __slots__ = ("start", "last", "last_step", "steps", "accepted")
+
+    def __init__(self, now: float) -> None:
+        self.start = now
+        self.last = now
+        self.last_step = None
+        self.steps = []
+        self.accepted = False
+
+
+def percentile(values: List[float], p: float) -> float:
+    """
+    The ``p``-th percentile of a list of values, by linear interpolation.
+
+    >>> percentile([1.0, 2.0, 3.0, 4.0], 50)
+    2.5
+    """
+    ordered = sorted(values)
+    if not ordered:
+        return float("nan")
+    position = (len(ordered) - 1) * p / 100.0
+    low = int(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+class DialogueTracer:
+    """Records the spans of the dialogues, and aggregates their duration per counterparty."""
+
+    def __init__(self, sample_rate: float = 1.0,
+                 exporters: Iterable[EXPORTER] = (),
+                 idle_timeout: float = 60.0,
+                 window: int = 1000,
+                 clock: Callable[[], float] = time.time) -> None:
+        """
+        Initialize the tracer.
+
+        :param sample_rate: the fraction of the dialogues to trace, chosen by a hash of ``(counterparty, dialogue_id)``,
+                          | so that the dialogues not traced take no memory.
+        :param exporters: the functions called with every span (a JSON-serializable dictionary),
+                        | e.g. a :class:`~oef.tracing.JsonlExporter`.
+        :param idle_timeout: the time (in seconds) after which an inactive dialogue is ended.
+        :param window: the number of dialogue durations kept per counterparty for the percentiles.
+        :param clock: the clock used for the timestamps.
+        """
+        if not 0.0 <= sample_rate <= 1.0:
+            raise ValueError("Invalid input value for type '{}': sample_rate must be in [0, 1]."
+                             .format(type(self).__name__))
+        self.sample_rate = sample_rate
+        self.exporters = list(exporters)
+        self.idle_timeout = idle_timeout
+        self.window = window
+        self._clock = clock
+        self._open = {}  # type: Dict[Tuple[str, int], _Dialogue]
+        self._durations = {}  # type: Dict[str, deque]
+        self._last_sweep = clock()
+
+    def _export(self, span: Dict) -> None:
+        for exporter in self.exporters:
+            try:
+                exporter(span)
+            except Exception as e:
+                logger.warning("Span exporter {} failed: {}".format(exporter, e))
+
+    def _sampled(self, counterparty: str, dialogue_id: int) -> bool:
+        if self.sample_rate >= 1.0:
+            return True
+        digest = zlib.crc32("{}:{}".format(counterparty, dialogue_id).encode("utf-8"))
+        return digest < self.sample_rate * 2 ** 32
+
+    def record(self, direction: str, step: str, counterparty: str, dialogue_id: int, msg_id: int) -> None:
+        """
+        Record a message of a dialogue.
+
+        :param direction: :data:`~oef.tracing.SENT` or :data:`~oef.tracing.RECEIVED`.
+        :param step: the kind of message: ``"cfp"``, ``"propose"``, ``"accept"``, ``"decline"`` or ``"message"``.
+        :param counterparty: the public key of the other agent.
+        :param dialogue_id: the identifier of the dialogue.
+        :param msg_id: the identifier of the message.
+        :return: ``None``
+        """
+        now = self._clock()
+        if now - self._last_sweep > min(self.idle_timeout, 1.0):
+            self._sweep(now)
+
+        key = (counterparty, dialogue_id)
+        dialogue = self._open.get(key)
+        if dialogue is None:
+            if not self._sampled(counterparty, dialogue_id):
+                return
+            dialogue = self._open[key] = _Dialogue(now)
+
+        span = {
+            "type": "step", "counterparty": counterparty, "dialogue_id": dialogue_id, "msg_id": msg_id,
+            "step": step, "direction": direction, "after": dialogue.last_step,
+            "start": dialogue.last, "end": now, "duration": now - dialogue.last,
+        }
+        dialogue.steps.append(span)
+        dialogue.last = now
+        dialogue.last_step = step
+        self._export(span)
+
+        if step == "accept":
+            dialogue.accepted = True
+        elif step == "decline":
+            self._end(key, "declined", now)
+        elif step == "message" and dialogue.accepted:
+            self._end(key, "completed", now)
+
+    def finish(self, counterparty: str, dialogue_id: int, outcome: str = "finished") -> None:
+        """End a dialogue explicitly, e.g. when it does not follow the usual FIPA steps."""
+        key = (counterparty, dialogue_id)
+        if key in self._open:
+            self._end(key, outcome, self._clock())
+
+    def _end(self, key: Tuple[str, int], outcome: str, now: float) -> None:
+        dialogue = self._open.pop(key)
+        end = dialogue.last if outcome == "timeout" else now
+        duration = end - dialogue.start
+        counterparty, dialogue_id = key
+        if outcome != "timeout":
+            durations = self._durations.get(counterparty)
+            if durations is None:
+                durations = self._durations[counterparty] = deque(maxlen=self.window)
+            durations.append(duration)
+        self._export({
+            "type": "dialogue", "counterparty": counterparty, "dialogue_id": dialogue_id, "outcome": outcome,
+            "start": dialogue.start, "end": end, "duration": duration,
+            "steps": [(s["direction"], s["step"], s["duration"]) for s in dialogue.steps],
+        })
+
+    def _sweep(self, now: float) -> None:
+        self._last_sweep = now
+        expired = [key for key, dialogue in self._open.items()
+                   if now - dialogue.last > self.idle_timeout]
+        for key in expired:
+            self._end(key, "timeout", now)
+
+    @property
+    def open_dialogues(self) -> int:
+        """The number of traced dialogues not ended yet."""
+        return len(self._open)
+
+    def latency_percentiles(self, percentiles: Iterable[float] = (50, 90, 99)) -> Dict[str, Dict[str, float]]:
+        """
+        The percentiles of the duration of the recent dialogues, per counterparty.
+
+        :param percentiles: the percentiles to compute.
+        :return: for every counterparty, ``{"count": n, "p50": ..., "p90": ..., ...}``.
+        """
+        result = {}
+        for counterparty, durations in self._durations.items():
+            values = list(durations)
+            stats = {"count": len(values)}
+            for p in percentiles:
+                stats["p{:g}".format(p)] = percentile(values, p)
+            result[counterparty] = stats
+        return result
+
+    def slow_counterparties(self, threshold: float, p: float = 90, min_count: int = 1) -> List[str]:
+        """
+        The counterparties whose dialogues are slow.
+
+        :param threshold: the maximum acceptable duration (in seconds).
+        :param p: the percentile compared to the threshold.
+        :param min_count: the minimum number of dialogues for a counterparty to be judged.
+        :return: the counterparties whose ``p``-th percentile is above the threshold.
+        """
+        return [counterparty for counterparty, durations in self._durations.items()
+                if len(durations) >= min_count and percentile(list(durations), p) > threshold]
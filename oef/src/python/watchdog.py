@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2018 Fetch.AI Limited
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+
+"""
+oef.watchdog
+~~~~~~~~~~~~
+This module contains a watchdog of the event loop of an agent.
+
+The handlers of the agent run on the same event loop as the proxy: a handler that blocks stalls the whole agent,
+including the pongs to the OEF Node. The watchdog measures the lag of the event loop with a periodic callback,
+times every dispatch of a message to a handler, and, from a helper thread, captures the stack of the event loop
+when it has not run for longer than a threshold. For an ``async`` handler, only the call that creates the coroutine
+is timed: the time it then spends waiting, e.g. for I/O, does not block the loop.
+
+Pass a :class:`~oef.watchdog.LoopWatchdog` to :func:`~oef.agents.Agent.run` or :func:`~oef.agents.Agent.async_run`.
+"""
+
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+STALL = "stall"
+SLOW_HANDLER = "slow_handler"
+
+
+class WatchdogReport:
+    """A stall of the event loop, or a slow handler."""
+
+    __slots__ = ("kind", "handler", "case", "duration", "stack")
+
+    def __init__(self, kind: str, handler: Optional[str], case: Optional[str], duration: float,
+                 stack: Optional[str]) -> None:
+        """
+        :param kind: :data:`~oef.watchdog.STALL`, reported while the loop is blocked,
+                   | or :data:`~oef.watchdog.SLOW_HANDLER`, reported when the handler returns.
+        :param handler: the name of the handler running at the time, if any.
+        :param case: the payload case of the message being handled, if any.
+        :param duration: how long (in seconds) the loop has been blocked, or the handler has run.
+        :param stack: the stack of the event loop thread, when the stall was detected.
+        """
+        self.kind = kind
+        self.handler = handler
+        self.case = case
+        self.duration = duration
+        self.stack = stack
+
+    def __str__(self):
+        what = "handler {} for {}".format(self.handler, self.case) if self.handler is not None else "event loop"
+        text = "{}: {} blocked for {:.3f}s".format(self.kind, what, self.duration)
+        if self.stack is not None:
+            text += "\n" + self.stack
+        return text
+
+
+def _log_report(report: WatchdogReport) -> None:
+    logger.warning(str(report))
+
+
+class LoopWatchdog:
+    """Measures the lag of an event loop and reports its stalls and the slow handlers."""
+
+    def __init__(self, threshold: float = 0.5, interval: float = 0.1,
+                 on_report: Callable[[WatchdogReport], None] = _log_report,
+                 history: int = 100) -> None:
+        """
+        Initialize the watchdog.
+
+        :param threshold: the lag (in seconds) of the event loop, or the duration of a handler,
+                        | above which a report is made.
+        :param interval: the period (in seconds) of the measurement of the lag.
+        :param on_report: the function called with every report. By default, the report is logged as a warning.
+                        | Stall reports are made from the helper thread.
+        :param history: the number of reports kept in :attr:`~oef.watchdog.LoopWatchdog.reports`.
+        :raises ValueError: if the threshold or the interval is not positive.
+        """
+        if threshold <= 0 or interval <= 0:
+            raise ValueError("Invalid input value for type '{}': threshold and interval must be positive."
+                             .format(type(self).__name__))
+        self.threshold = threshold
+        self.interval = interval
+        self.on_report = on_report
+        self.reports = deque(maxlen=history)
+        self.ticks = 0
+        self.max_lag = 0.0
+        self.total_lag = 0.0
+        self._loop = None
+        self._loop_thread = None
+        self._timer = None
+        self._thread = None
+        self._stopped = threading.Event()
+        self._heartbeat = 0.0
+        self._expected = 0.0
+        self._stall_reported = False
+        self._current = None
+        self._stack = None
+
+    @property
+    def mean_lag(self) -> float:
+        """The mean lag (in seconds) of the event loop."""
+        return self.total_lag / self.ticks if self.ticks else 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self, loop: Optional[asyncio.AbstractEventLoop] = None) -> None:
+        """
+        Start watching an event loop. It must be called from the thread that runs the loop.
+
+        :param loop: the event loop. By default, the current one.
+        :return: ``None``
+        """
+        if self._thread is not None:
+            return
+        self._loop = loop if loop is not None else asyncio.get_event_loop()
+        self._loop_thread = threading.get_ident()
+        self._stopped.clear()
+        self._heartbeat = time.monotonic()
+        self._expected = self._heartbeat + self.interval
+        self._timer = self._loop.call_later(self.interval, self._tick)
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop watching the event loop."""
+        if self._thread is None:
+            return
+        self._stopped.set()
+        self._timer.cancel()
+        self._thread.join()
+        self._thread = None
+
+    def _tick(self) -> None:
+        now = time.monotonic()
+        lag = max(0.0, now - self._expected)
+        self.ticks += 1
+        self.total_lag += lag
+        if lag > self.max_lag:
+            self.max_lag = lag
+        self._heartbeat = now
+        self._stall_reported = False
+        self._expected = now + self.interval
+        self._timer = self._loop.call_later(self.interval, self._tick)
+
+    def _watch(self) -> None:
+        while not self._stopped.wait(self.interval):
+            blocked = time.monotonic() - self._heartbeat - self.interval
+            if blocked <= self.threshold or self._stall_reported:
+                continue
+            self._stall_reported = True
+            frame = sys._current_frames().get(self._loop_thread)
+            stack = "".join(traceback.format_stack(frame)) if frame is not None else None
+            current = self._current
+            if current is not None:
+                self._stack = stack
+                self._report(WatchdogReport(STALL, current[0], current[1], blocked, stack))
+            else:
+                self._report(WatchdogReport(STALL, None, None, blocked, stack))
+
+    def _report(self, report: WatchdogReport) -> None:
+        self.reports.append(report)
+        try:
+            self.on_report(report)
+        except Exception as e:
+            logger.error("Watchdog report failed: {}".format(e))
+
+    def begin(self, handler: str, case: str) -> None:
+        """Signal that a handler starts handling a message. Called by the proxy."""
+        self._stack = None
+        self._current = (handler, case, time.monotonic())
+
+    def end(self) -> None:
+        """Signal that the current handler has returned. Called by the proxy."""
+        current = self._current
+        self._current = None
+        if current is None:
+            return
+        elapsed = time.monotonic() - current[2]
+        if elapsed > self.threshold:
+            self._report(WatchdogReport(SLOW_HANDLER, current[0], current[1], elapsed, self._stack))
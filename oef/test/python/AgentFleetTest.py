@@ -0,0 +1,105 @@
+import asyncio
+import unittest
+
+from oef.src.python.agents import OEFAgent
+from oef.src.python.fleet import AgentFleet
+from oef.test.python.doubles import FakeNode
+
+
+class AgentFleetTest(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.node = FakeNode(refuse=["refused"])
+        self.loop.run_until_complete(self.node.start())
+
+    def tearDown(self):
+        self.loop.run_until_complete(self.node.close())
+        asyncio.set_event_loop(None)
+        self.loop.close()
+
+    def _agents(self, count):
+        return [OEFAgent("agent" + "abcdefgh"[i % 8] * (i // 8 + 1), "127.0.0.1", self.node.port, loop=self.loop)
+                for i in range(count)]
+
+    def testStartAndStop(self):
+        agents = self._agents(20)
+        refused = OEFAgent("refused", "127.0.0.1", self.node.port, loop=self.loop)
+        fleet = AgentFleet(agents + [refused], loop=self.loop, max_connecting=4)
+        registry = fleet.enable_metrics()
+
+        async def scenario():
+            while fleet.stats.connected + fleet.stats.failed < 21:
+                await asyncio.sleep(0.01)
+            self.assertEqual(fleet.running, 20)
+            for answer_id, agent in enumerate(agents):
+                self.node.ping(agent.public_key, answer_id)
+            while len(self.node.received) < 20:
+                await asyncio.sleep(0.01)
+            await fleet.async_stop(agents[:5])
+            self.assertEqual(fleet.running, 15)
+            self.assertFalse(agents[0]._oef_proxy.is_connected())
+            self.node.disconnect(agents[5].public_key)
+            while fleet.running > 14:
+                await asyncio.sleep(0.01)
+            fleet.stop()
+
+        async def run():
+            task = asyncio.ensure_future(fleet.async_run())
+            await asyncio.sleep(0)
+            await scenario()
+            return await task
+
+        self.assertEqual(self.loop.run_until_complete(run()), [refused])
+        self.assertEqual(sorted(envelope.WhichOneof("payload") for _, envelope in self.node.received), ["pong"] * 20)
+        self.assertEqual(fleet.stats.exits, {"stopped": 19, "closed": 1})
+        self.assertEqual((fleet.stats.connected, fleet.stats.failed), (20, 1))
+        snapshot = registry.snapshot()
+        self.assertEqual(snapshot["oef_fleet_connect_seconds"][()]["count"], 20)
+        self.assertEqual(snapshot["oef_fleet_exits_total"][(("reason", "closed"),)], 1)
+        self.assertEqual(fleet.running, 0)
+        self.assertTrue(all(not agent._oef_proxy.is_connected() for agent in agents))
+
+    def testStagger(self):
+        fleet = AgentFleet(self._agents(5), loop=self.loop, stagger=0.2)
+        start = self.loop.time()
+        self.assertEqual(self.loop.run_until_complete(fleet.async_start()), [])
+        self.assertGreaterEqual(self.loop.time() - start, 0.15)
+        self.loop.run_until_complete(fleet.async_stop())
+
+    def testHandshakeTimeout(self):
+        connections = []
+
+        async def silent(reader, writer):
+            connections.append(writer)
+
+        server = self.loop.run_until_complete(asyncio.start_server(silent, "127.0.0.1", 0))
+        port = server.sockets[0].getsockname()[1]
+        stuck = OEFAgent("stuck", "127.0.0.1", port, loop=self.loop)
+        agent = OEFAgent("agent", "127.0.0.1", self.node.port, loop=self.loop)
+        fleet = AgentFleet([stuck, agent], loop=self.loop, max_connecting=1, handshake_timeout=0.2)
+        try:
+            failed = self.loop.run_until_complete(asyncio.wait_for(fleet.async_start(), 5))
+            self.assertEqual(failed, [stuck])
+            self.assertEqual((fleet.stats.connected, fleet.stats.failed), (1, 1))
+            self.loop.run_until_complete(fleet.async_stop())
+        finally:
+            for writer in connections:
+                writer.close()
+            server.close()
+            self.loop.run_until_complete(server.wait_closed())
+        with self.assertRaises(ValueError):
+            AgentFleet(loop=self.loop, handshake_timeout=0)
+
+    def testOtherLoop(self):
+        other = asyncio.new_event_loop()
+        try:
+            with self.assertRaises(ValueError):
+                AgentFleet([OEFAgent("agent", "127.0.0.1", loop=other)], loop=self.loop)
+        finally:
+            other.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import asyncio
+import unittest
+
+from oef.src.python.bulk import bulk_connect
+from oef.src.python.proxy import OEFConnectionError, OEFNetworkProxy
+from oef.test.python.doubles import FakeNode
+
+
+class BulkConnectTest(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.node = FakeNode(refuse=["refused"])
+        self.loop.run_until_complete(self.node.start())
+        self.lookups = []
+        getaddrinfo = self.loop.getaddrinfo
+
+        def counting_getaddrinfo(host, port, **kwargs):
+            self.lookups.append(host)
+            return getaddrinfo(host, port, **kwargs)
+
+        self.loop.getaddrinfo = counting_getaddrinfo
+
+    def tearDown(self):
+        self.loop.run_until_complete(self.node.close())
+        asyncio.set_event_loop(None)
+        self.loop.close()
+
+    def _proxy(self, public_key, port=None):
+        return OEFNetworkProxy(public_key, "127.0.0.1", port or self.node.port, loop=self.loop)
+
+    def testBulkConnect(self):
+        proxies = [self._proxy("agent{}".format(i)) for i in range(50)] + [self._proxy("refused")]
+        outcomes = self.loop.run_until_complete(bulk_connect(proxies, max_handshakes=8))
+        self.assertEqual(self.lookups, ["127.0.0.1"])
+        self.assertEqual([outcome.proxy for outcome in outcomes], proxies)
+        self.assertTrue(all(outcome.connected and outcome.error is None for outcome in outcomes[:50]))
+        self.assertFalse(outcomes[50].connected)
+        self.assertIsInstance(outcomes[50].error, OEFConnectionError)
+        self.assertFalse(proxies[50].is_connected())
+        self.assertEqual(self.node.handshakes, 51)
+        for proxy in proxies[:50]:
+            self.loop.run_until_complete(proxy.stop())
+
+    def testTimeoutAndRefusedConnection(self):
+        async def silent(reader, writer):
+            await reader.read()
+            writer.close()
+
+        server = self.loop.run_until_complete(asyncio.start_server(silent, "127.0.0.1", 0))
+        silent_port = server.sockets[0].getsockname()[1]
+        closed = self.loop.run_until_complete(asyncio.start_server(silent, "127.0.0.1", 0))
+        closed_port = closed.sockets[0].getsockname()[1]
+        closed.close()
+        self.loop.run_until_complete(closed.wait_closed())
+
+        proxies = [self._proxy("silent", silent_port), self._proxy("closed", closed_port), self._proxy("agent")]
+        outcomes = self.loop.run_until_complete(bulk_connect(proxies, timeout=0.2))
+        self.assertIsInstance(outcomes[0].error, asyncio.TimeoutError)
+        self.assertIsInstance(outcomes[1].error, OSError)
+        self.assertTrue(outcomes[2].connected)
+        self.assertEqual(len(self.lookups), 3)
+        self.assertFalse(proxies[0].is_connected())
+        self.loop.run_until_complete(proxies[2].stop())
+        server.close()
+        self.loop.run_until_complete(server.wait_closed())
+
+    def testInvalidArguments(self):
+        with self.assertRaises(ValueError):
+            self.loop.run_until_complete(bulk_connect([], max_handshakes=0))
+
+
+if __name__ == '__main__':
+    unittest.main()
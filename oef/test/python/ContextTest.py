@@ -0,0 +1,36 @@
+import unittest
+
+from oef.src.python.dispatch import DispatchRecord
+from utils.src.python import uri
+
+
+class ContextTest(unittest.TestCase):
+
+    target = "tcp://127.0.0.1:10000/core-key/ns1/ns2/agent-b/service-1"
+    source = "tcp://127.0.0.1:10000/core-key//agent-a/alias-a"
+
+    def testFromWireMatchesUpdate(self):
+        expected = uri.Context()
+        expected.update(self.target, self.source)
+        context = uri.Context.fromWire(self.target, self.source)
+        self.assertEqual(context.targetURI.toString(), expected.targetURI.toString())
+        self.assertEqual(context.sourceURI.toString(), expected.sourceURI.toString())
+        self.assertEqual(context.serviceId, "service-1")
+        self.assertEqual(context.agentAlias, "service-1")
+        self.assertEqual(context.targetURI.namespaces, ("ns1", "ns2"))
+
+    def testParsedURIsAreShared(self):
+        first = uri.Context.fromWire(self.target, self.source)
+        second = uri.Context.fromWire(self.target, self.source)
+        self.assertIs(first.targetURI, second.targetURI)
+
+        second.forAgent("agent-c/alias-c", "agent-d")
+        self.assertEqual(first.targetURI.agentKey, "agent-b")
+        self.assertEqual(second.targetURI.agentKey, "agent-c")
+
+    def testRecordIsLazy(self):
+        record = DispatchRecord(self.target, self.source)
+        self.assertIsNone(record.context)
+        context = record.getContext()
+        self.assertIs(record.getContext(), context)
+        self.assertEqual(context.sourceURI.agentKey, "agent-a")
@@ -0,0 +1,119 @@
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+
+from oef.src.python.tracing import DialogueTracer, JsonlExporter, RECEIVED, SENT, percentile
+from oef.test.python.doubles import FakeClock, FakeWriter, ReplayProxy, RecordingAgent, content_message
+
+
+class DialogueTracingTest(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock(100.0)
+        self.spans = []
+
+    def _negotiate(self, tracer, counterparty, dialogue_id, step_time):
+        for direction, step in ((SENT, "cfp"), (RECEIVED, "propose"), (SENT, "accept"), (RECEIVED, "message")):
+            tracer.record(direction, step, counterparty, dialogue_id, 0)
+            self.clock.now += step_time
+
+    def testNegotiation(self):
+        tracer = DialogueTracer(exporters=[self.spans.append], clock=self.clock)
+        self._negotiate(tracer, "seller", 1, 0.5)
+
+        steps = [s for s in self.spans if s["type"] == "step"]
+        self.assertEqual([(s["direction"], s["step"], s["after"]) for s in steps],
+                         [(SENT, "cfp", None), (RECEIVED, "propose", "cfp"),
+                          (SENT, "accept", "propose"), (RECEIVED, "message", "accept")])
+        self.assertEqual([s["duration"] for s in steps], [0.0, 0.5, 0.5, 0.5])
+        dialogue = self.spans[-1]
+        self.assertEqual((dialogue["type"], dialogue["outcome"], dialogue["duration"]), ("dialogue", "completed", 1.5))
+        self.assertEqual(tracer.open_dialogues, 0)
+
+    def testDeclineAndTimeout(self):
+        tracer = DialogueTracer(exporters=[self.spans.append], idle_timeout=5.0, clock=self.clock)
+        tracer.record(SENT, "cfp", "a", 1, 0)
+        tracer.record(RECEIVED, "decline", "a", 1, 0)
+        tracer.record(SENT, "cfp", "b", 2, 0)
+        self.clock.now += 10.0
+        tracer.record(SENT, "cfp", "c", 3, 0)
+
+        outcomes = {(s["counterparty"], s["outcome"]) for s in self.spans if s["type"] == "dialogue"}
+        self.assertEqual(outcomes, {("a", "declined"), ("b", "timeout")})
+        self.assertEqual(set(tracer.latency_percentiles()), {"a"})
+        tracer.finish("c", 3)
+        self.assertEqual(tracer.open_dialogues, 0)
+
+    def testSampling(self):
+        tracer = DialogueTracer(sample_rate=0.0, exporters=[self.spans.append], clock=self.clock)
+        self._negotiate(tracer, "seller", 1, 0.1)
+        self.assertEqual(self.spans, [])
+        self.assertEqual(tracer.open_dialogues, 0)
+        with self.assertRaises(ValueError):
+            DialogueTracer(sample_rate=2.0)
+
+    def testSamplingMemory(self):
+        tracer = DialogueTracer(sample_rate=0.1, exporters=[self.spans.append], clock=self.clock)
+        for dialogue_id in range(10000):
+            tracer.record(SENT, "cfp", "seller", dialogue_id, 0)
+        traced = tracer.open_dialogues
+        self.assertLess(abs(traced - 1000), 200)
+        self.assertEqual(len(tracer._open), traced)
+        for dialogue_id in range(10000):
+            for direction, step in ((RECEIVED, "propose"), (SENT, "accept"), (RECEIVED, "message")):
+                tracer.record(direction, step, "seller", dialogue_id, 0)
+        self.assertEqual(len(tracer._open), 0)
+        completed = [s for s in self.spans if s["type"] == "dialogue"]
+        self.assertEqual(len(completed), traced)
+
+    def testPercentiles(self):
+        tracer = DialogueTracer(clock=self.clock)
+        for dialogue_id in range(4):
+            self._negotiate(tracer, "fast", dialogue_id, 0.1)
+            self._negotiate(tracer, "slow", dialogue_id, 1.0)
+        stats = tracer.latency_percentiles((50, 99))
+        self.assertEqual(stats["slow"]["count"], 4)
+        self.assertAlmostEqual(stats["slow"]["p50"], 3.0)
+        self.assertAlmostEqual(stats["fast"]["p99"], 0.3)
+        self.assertEqual(tracer.slow_counterparties(1.0), ["slow"])
+        self.assertEqual(percentile([1.0, 2.0, 3.0, 4.0], 50), 2.5)
+
+    def testJsonlExporter(self):
+        path = os.path.join(tempfile.mkdtemp(), "spans.jsonl")
+        exporter = JsonlExporter(path)
+        tracer = DialogueTracer(exporters=[exporter], clock=self.clock)
+        self._negotiate(tracer, "seller", 1, 0.5)
+        exporter.close()
+        with open(path) as f:
+            spans = [json.loads(line) for line in f]
+        self.assertEqual([s["type"] for s in spans], ["step"] * 4 + ["dialogue"])
+
+    def testProxy(self):
+        loop = asyncio.new_event_loop()
+        try:
+            propose = content_message(2, dialogue_id=7, origin="seller")
+            propose.content.fipa.target = 1
+            propose.content.fipa.propose.content = b"offer"
+            proxy = ReplayProxy([propose], loop)
+            writer = FakeWriter()
+            proxy._connection = (None, writer)
+            proxy._server_writer = writer
+            agent = RecordingAgent(proxy)
+            tracer = agent.enable_tracing(DialogueTracer(exporters=[self.spans.append]))
+
+            agent.send_cfp(1, 7, "seller", 0, None)
+            loop.run_until_complete(proxy.loop(agent))
+            agent.send_accept(3, 7, "seller", 2)
+            agent.send_message(4, 7, "seller", b"data")
+        finally:
+            loop.close()
+        self.assertEqual([(s["direction"], s["step"]) for s in self.spans if s["type"] == "step"],
+                         [(SENT, "cfp"), (RECEIVED, "propose"), (SENT, "accept"), (SENT, "message")])
+        self.assertEqual(self.spans[-1]["outcome"], "completed")
+        self.assertEqual(tracer.latency_percentiles()["seller"]["count"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import asyncio
+import unittest
+
+from oef.src.python.dispatch import PayloadHandler, payload_case
+from oef.src.python.messages import OEFErrorOperation
+from oef.test.python.doubles import ReplayProxy, RecordingAgent, content_message
+from protocol.src.proto import agent_pb2
+
+
+class DispatchTest(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self):
+        self.loop.close()
+
+    def _run(self, messages, register=None):
+        proxy = ReplayProxy(messages, self.loop)
+        agent = RecordingAgent(proxy)
+        if register is not None:
+            register(proxy)
+        self.loop.run_until_complete(proxy.loop(agent))
+        return proxy, agent
+
+    def testBuiltInCases(self):
+        content = content_message(1)
+        content.content.content = b"hello"
+        content.source_uri = "tcp://127.0.0.1:10000/core//sender/alias"
+        accept = content_message(2)
+        accept.content.fipa.target = 1
+        accept.content.fipa.accept.SetInParent()
+        error = agent_pb2.Server.AgentMessage()
+        error.answer_id = 3
+        error.oef_error.operation = agent_pb2.Server.AgentMessage.OEFError.SEARCH_AGENTS
+        error.oef_error.cause = "bad query"
+
+        self.assertEqual(payload_case(content), "content.content")
+        self.assertEqual(payload_case(accept), "fipa.accept")
+
+        proxy, agent = self._run([content, accept, error])
+        self.assertEqual(agent.calls, [("message", 1, 1, "peer", b"hello", "sender"),
+                                       ("async_accept", 2, 1),
+                                       ("oef_error", 3, OEFErrorOperation.SEARCH_AGENTS, "bad query")])
+        self.assertEqual(proxy._context_store, {})
+        self.assertEqual(proxy._error_details, {})
+
+    def testUnknownCaseIsCounted(self):
+        decline = content_message(1)
+        decline.content.fipa.target = 0
+        decline.content.fipa.decline.SetInParent()
+        empty = content_message(2)
+        proxy, agent = self._run([empty, empty, decline],
+                                 register=lambda proxy: proxy._dispatch.unregister("fipa.decline"))
+        self.assertEqual(proxy.unknown_payloads, {"content.None": 2, "fipa.decline": 1})
+        self.assertEqual(agent.calls, [])
+
+    def testRegisterHandler(self):
+        received = []
+        handler = PayloadHandler(lambda proxy, msg: ((msg.answer_id, msg.content.origin),), received.append)
+        proxy, agent = self._run([content_message(5, origin="someone")],
+                                 register=lambda proxy: proxy.register_payload_handler("content.None", handler))
+        self.assertEqual(received, [(5, "someone")])
+        self.assertEqual(proxy.unknown_payloads, {})
@@ -0,0 +1,163 @@
+import asyncio
+import struct
+import unittest
+
+from oef.src.python.agents import OEFAgent
+from oef.src.python.failover import OEFMultiNodeProxy, probe_node
+from oef.src.python.proxy import OEFConnectionError
+from oef.src.python.reconnect import ReconnectPolicy
+from oef.src.python.schema import Description
+from oef.test.python.doubles import FakeNode
+
+
+class FailoverTest(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.nodes = [FakeNode() for _ in range(3)]
+        for node in self.nodes:
+            self.loop.run_until_complete(node.start())
+
+    def tearDown(self):
+        for node in self.nodes:
+            self.loop.run_until_complete(node.close())
+        asyncio.set_event_loop(None)
+        self.loop.close()
+
+    async def _until(self, condition, timeout=5.0):
+        deadline = self.loop.time() + timeout
+        while not condition():
+            self.assertLess(self.loop.time(), deadline, "timed out")
+            await asyncio.sleep(0.01)
+
+    def _node(self, endpoint):
+        return next(node for node in self.nodes if node.port == endpoint[1])
+
+    def _endpoints(self):
+        return [("127.0.0.1", node.port) for node in self.nodes]
+
+    def testProbe(self):
+        probe, connection = self.loop.run_until_complete(probe_node("agent", self._endpoints()[0]))
+        self.assertTrue(probe.ok)
+        self.assertGreaterEqual(probe.handshake_time, 0.0)
+        connection[1].close()
+        self.loop.run_until_complete(self.nodes[2].close())
+        probe, connection = self.loop.run_until_complete(probe_node("agent", self._endpoints()[2]))
+        self.assertFalse(probe.ok)
+        self.assertIsNone(connection)
+
+    def testInvalidEndpoints(self):
+        with self.assertRaises(ValueError):
+            OEFMultiNodeProxy("agent", [], loop=self.loop)
+        with self.assertRaises(ValueError):
+            OEFMultiNodeProxy("agent", self._endpoints(), loop=self.loop, heartbeat_timeout=0)
+
+    def testNoNodeAvailable(self):
+        for node in self.nodes:
+            self.loop.run_until_complete(node.close())
+        proxy = OEFMultiNodeProxy("agent", self._endpoints(), loop=self.loop, probe_timeout=1.0)
+        with self.assertRaises(OEFConnectionError):
+            self.loop.run_until_complete(proxy.connect())
+        self.assertEqual(proxy.probes, [])
+
+    def testFailover(self):
+        agent = OEFAgent("agent", self._endpoints(), loop=self.loop)
+        proxy = agent._oef_proxy
+        stats = proxy.reconnect_stats
+
+        async def scenario():
+            await agent.async_connect()
+            task = asyncio.ensure_future(agent.async_run())
+            self.assertEqual(len(proxy.probes), 3)
+            active, standby = proxy.active_endpoint, proxy.standby_endpoint
+            self.assertIsNotNone(standby)
+            self.assertNotEqual(active, standby)
+            # the third node is probed, then disconnected
+            await self._until(lambda: sum(len(node.writers) for node in self.nodes) == 2)
+
+            # the standby connection answers the pings
+            self._node(standby).ping("agent", 42)
+            await self._until(lambda: self._node(standby).received)
+            self.assertEqual(self._node(standby).received[0][1].WhichOneof("payload"), "pong")
+
+            agent.register_agent(1, Description({"name": "agent"}))
+            await self._until(lambda: self._node(active).received)
+            self._node(active).disconnect("agent")
+            await self._until(lambda: len(self._node(standby).received) == 2)
+            self.assertEqual(proxy.active_endpoint, standby)
+            self.assertEqual(self._node(standby).received[1][1].WhichOneof("payload"), "register_description")
+            # a new standby is chosen in the background
+            await self._until(lambda: proxy.standby_endpoint is not None)
+            self.assertNotEqual(proxy.standby_endpoint, standby)
+
+            agent.send_message(2, 0, "other", b"hello")
+            await self._until(lambda: len(self._node(standby).received) == 3)
+            agent.stop()
+            await task
+            await agent.async_disconnect()
+
+        self.loop.run_until_complete(scenario())
+        self.assertEqual((stats.drops, stats.failovers, stats.reconnects, stats.replayed), (1, 1, 0, 1))
+        self.assertLess(stats.last_outage, 1.0)
+        self.assertIsNone(proxy.standby_endpoint)
+
+    def testHeartbeatTimeout(self):
+        agent = OEFAgent("agent", self._endpoints()[:2], loop=self.loop, heartbeat_timeout=0.3)
+        proxy = agent._oef_proxy
+
+        async def scenario():
+            await agent.async_connect()
+            task = asyncio.ensure_future(agent.async_run())
+            active, standby = proxy.active_endpoint, proxy.standby_endpoint
+            # the active node stays silent: the agent fails over to the standby node
+            await self._until(lambda: proxy.reconnect_stats.failovers == 1)
+            self.assertEqual(proxy.active_endpoint, standby)
+            # the first node is the only other one: it becomes the new standby
+            await self._until(lambda: proxy.standby_endpoint == active)
+            agent.stop()
+            await task
+            await agent.async_disconnect()
+
+        self.loop.run_until_complete(scenario())
+
+    def testStallMidFrame(self):
+        agent = OEFAgent("agent", self._endpoints()[:2], loop=self.loop, heartbeat_timeout=0.3)
+        proxy = agent._oef_proxy
+
+        async def scenario():
+            await agent.async_connect()
+            task = asyncio.ensure_future(agent.async_run())
+            active, standby = proxy.active_endpoint, proxy.standby_endpoint
+            await self._until(lambda: "agent" in self._node(active).writers)
+            # the active node sends a part of a frame, then stays silent without closing the connection
+            self._node(active).writers["agent"].write(struct.pack("I", 10) + b"abc")
+            await self._until(lambda: proxy.reconnect_stats.failovers == 1)
+            self.assertEqual(proxy.active_endpoint, standby)
+            agent.stop()
+            await task
+            await agent.async_disconnect()
+
+        self.loop.run_until_complete(asyncio.wait_for(scenario(), 5))
+
+    def testFallbackToReconnection(self):
+        agent = OEFAgent("agent", self._endpoints()[:1], loop=self.loop)
+        proxy = agent._oef_proxy
+        agent.enable_reconnect(ReconnectPolicy(initial_delay=0.01, rng=lambda: 0.0))
+
+        async def scenario():
+            await agent.async_connect()
+            task = asyncio.ensure_future(agent.async_run())
+            self.assertIsNone(proxy.standby_endpoint)
+            self.nodes[0].disconnect("agent")
+            await self._until(lambda: proxy.reconnect_stats.reconnects == 1)
+            agent.stop()
+            await task
+            await agent.async_disconnect()
+
+        self.loop.run_until_complete(scenario())
+        self.assertEqual(self.nodes[0].handshakes, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+import asyncio
+import unittest
+
+from oef.src.python.inbound import FairInboundQueue, OverflowPolicy
+from oef.test.python.doubles import ReplayProxy, RecordingAgent, content_message
+
+
+def _content(answer_id, origin):
+    msg = content_message(answer_id, origin=origin)
+    msg.content.content = b""
+    return msg
+
+
+class FairInboundQueueTest(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self):
+        self.loop.close()
+
+    def _order(self, queue, messages):
+        async def scenario():
+            for case, msg in messages:
+                await queue.put(case, msg)
+            queue.close()
+            order = []
+            while True:
+                item = await queue.get()
+                if item is None:
+                    return order
+                order.append(item[1].answer_id)
+        return self.loop.run_until_complete(scenario())
+
+    def testRoundRobinAndPriority(self):
+        messages = [("content.content", _content(i, "spammer")) for i in range(5)]
+        messages += [("content.content", _content(10, "buyer-1")), ("content.content", _content(20, "buyer-2"))]
+        messages += [("agents", content_message(99))]
+        self.assertEqual(self._order(FairInboundQueue(), messages), [99, 0, 10, 20, 1, 2, 3, 4])
+
+    def testWeights(self):
+        messages = [("content.content", _content(i, "a")) for i in range(4)]
+        messages += [("content.content", _content(10 + i, "b")) for i in range(4)]
+        queue = FairInboundQueue(weights={"a": 2})
+        self.assertEqual(self._order(queue, messages), [0, 1, 10, 2, 3, 11, 12, 13])
+
+    def testLimits(self):
+        messages = [("content.content", _content(i, "spammer")) for i in range(5)]
+        messages += [("content.content", _content(10, "buyer"))]
+        queue = FairInboundQueue(default_limit=2)
+        self.assertEqual(self._order(queue, messages), [3, 10, 4])
+        self.assertEqual(queue.stats.dropped, {"content.content": 3})
+
+    def testDropFromLongestOrigin(self):
+        messages = [("content.content", _content(i, "spammer")) for i in range(3)]
+        messages += [("content.content", _content(10, "buyer"))]
+        queue = FairInboundQueue(capacity=3, policy=OverflowPolicy.DROP_OLDEST)
+        self.assertEqual(self._order(queue, messages), [1, 10, 2])
+
+    def testInvalidWeight(self):
+        with self.assertRaises(ValueError):
+            FairInboundQueue(weights={"a": 0})
+
+    def testProxy(self):
+        messages = [_content(i, "spammer") for i in range(3)] + [_content(10, "buyer")]
+        proxy = ReplayProxy(messages, self.loop)
+        proxy.configure_fair_scheduling(default_limit=10)
+        agent = RecordingAgent(proxy)
+        self.loop.run_until_complete(proxy.loop(agent))
+        self.assertEqual(sorted(call[1] for call in agent.calls), [0, 1, 2, 10])
+        self.assertIsInstance(proxy._inbound, FairInboundQueue)
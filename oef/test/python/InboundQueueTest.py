@@ -0,0 +1,75 @@
+import asyncio
+import unittest
+
+from oef.src.python.inbound import InboundQueue, OverflowPolicy
+from oef.test.python.doubles import ReplayProxy, RecordingAgent, content_message
+
+
+class InboundQueueTest(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self):
+        self.loop.close()
+
+    def _drain(self, queue):
+        queue.close()
+        items = []
+        while True:
+            item = self.loop.run_until_complete(queue.get())
+            if item is None:
+                return items
+            items.append(item)
+
+    def testDropOldest(self):
+        async def fill():
+            queue = InboundQueue(capacity=2, policy=OverflowPolicy.DROP_OLDEST)
+            for i, case in enumerate(["ping", "agents", "ping"]):
+                self.assertTrue(await queue.put(case, i))
+            return queue
+        queue = self.loop.run_until_complete(fill())
+        self.assertEqual(self._drain(queue), [("agents", 1), ("ping", 2)])
+        self.assertEqual(queue.stats.dropped, {"ping": 1})
+        self.assertEqual((queue.stats.received, queue.stats.dispatched, queue.stats.max_depth), (3, 2, 2))
+
+    def testRejectByCase(self):
+        async def fill():
+            queue = InboundQueue(capacity=1, policy=OverflowPolicy.REJECT, reject_cases=["agents"])
+            self.assertTrue(await queue.put("ping", 0))
+            self.assertFalse(await queue.put("agents", 1))
+            return queue
+        queue = self.loop.run_until_complete(fill())
+        self.assertEqual(queue.stats.rejected, {"agents": 1})
+        self.assertEqual(self._drain(queue), [("ping", 0)])
+
+    def testBlockUntilConsumed(self):
+        async def scenario():
+            queue = InboundQueue(capacity=1)
+            await queue.put("ping", 0)
+            producer = asyncio.ensure_future(queue.put("ping", 1))
+            await asyncio.sleep(0)
+            self.assertFalse(producer.done())
+            self.assertEqual(await queue.get(), ("ping", 0))
+            await producer
+            self.assertEqual(queue.depth, 1)
+        self.loop.run_until_complete(scenario())
+
+    def testInvalidCapacity(self):
+        with self.assertRaises(ValueError):
+            InboundQueue(capacity=0)
+
+    def testProxyDispatchesInOrder(self):
+        messages = []
+        for i in range(10):
+            msg = content_message(i)
+            msg.content.content = str(i).encode()
+            messages.append(msg)
+        proxy = ReplayProxy(messages, self.loop)
+        proxy.configure_inbound_queue(capacity=3)
+        agent = RecordingAgent(proxy)
+        self.loop.run_until_complete(proxy.loop(agent))
+        self.assertEqual([call[1] for call in agent.calls], list(range(10)))
+        self.assertEqual(proxy.inbound_stats.dispatched, 10)
+        self.assertLessEqual(proxy.inbound_stats.max_depth, 3)
+        self.assertEqual(proxy.inbound_depth, 0)
@@ -0,0 +1,56 @@
+import copy
+import logging
+import os
+import tempfile
+import unittest
+
+from protocol.src.python.Wrappers import Location
+from utils.src.python import Logging
+
+
+class Expensive:
+
+    def __init__(self):
+        self.formatted = 0
+
+    def __str__(self):
+        self.formatted += 1
+        return "expensive"
+
+
+class LoggingTest(unittest.TestCase):
+
+    def testSharedLogger(self):
+        first = Location(1.0, 2.0)
+        second = Location(3.0, 4.0)
+        self.assertIs(first.log, second.log)
+        self.assertNotIn("log", vars(first))
+        self.assertIs(copy.deepcopy(first).log, first.log)
+        self.assertIs(Logging.get_logger("Location"), first.log)
+
+    def testLazyFormatting(self):
+        log = Logging.get_logger("LoggingTest.lazy")
+        log.setLevel(logging.INFO)
+        value = Expensive()
+        log.debug("value:", value)
+        log.debug("value: %s", value)
+        self.assertEqual(value.formatted, 0)
+        with self.assertLogs("LoggingTest.lazy", logging.INFO) as logs:
+            log.info("value:", value)
+        self.assertEqual(value.formatted, 1)
+        self.assertIn("value: expensive", logs.output[0])
+
+    def testFileSink(self):
+        path = os.path.join(tempfile.mkdtemp(), "oef.log")
+        Logging.configure(level=logging.CRITICAL, file=path, file_level=logging.INFO)
+        try:
+            Logging.get_logger("LoggingTest.file").info("hello", "file")
+        finally:
+            Logging.shutdown()
+        with open(path) as f:
+            self.assertIn("hello file", f.read())
+        self.assertNotIn(path, Logging._HANDLERS)
+
+
+if __name__ == '__main__':
+    unittest.main()
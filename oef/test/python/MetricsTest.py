@@ -0,0 +1,92 @@
+import asyncio
+import unittest
+import urllib.request
+
+from oef.src.python.messages import Message
+from oef.src.python.metrics import MetricsRegistry, ProxyMetrics
+from oef.src.python.proxy import OEFNetworkProxy
+from oef.test.python.doubles import FakeWriter, ReplayProxy, RecordingAgent, content_message
+from protocol.src.proto import agent_pb2
+
+
+class MetricsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self):
+        self.loop.close()
+
+    def testRegistry(self):
+        registry = MetricsRegistry()
+        registry.counter("requests_total", "Requests.", kind="a").inc()
+        registry.counter("requests_total", "Requests.", kind="a").inc(2)
+        registry.gauge("depth", function=lambda: 7)
+        histogram = registry.histogram("latency_seconds", buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 5.0):
+            histogram.observe(value)
+
+        snapshot = registry.snapshot()
+        self.assertEqual(snapshot["requests_total"], {(("kind", "a"),): 3})
+        self.assertEqual(snapshot["depth"], {(): 7})
+        self.assertEqual(snapshot["latency_seconds"][()]["buckets"], {0.1: 1, 1.0: 2, float("inf"): 3})
+
+        text = registry.to_prometheus()
+        self.assertIn('requests_total{kind="a"} 3', text)
+        self.assertIn('latency_seconds_bucket{le="+Inf"} 3', text)
+        self.assertIn("# TYPE latency_seconds histogram", text)
+
+        with self.assertRaises(ValueError):
+            registry.gauge("requests_total")
+
+    def testExporter(self):
+        registry = MetricsRegistry()
+        registry.counter("up").inc()
+        server = registry.serve(0)
+        try:
+            url = "http://127.0.0.1:{}/metrics".format(server.server_address[1])
+            body = urllib.request.urlopen(url, timeout=5).read().decode()
+        finally:
+            registry.stop_serving()
+        self.assertIn("up 1", body)
+
+    def testProxyInstrumentation(self):
+        content = content_message(1)
+        content.content.content = b"hello"
+        ping = agent_pb2.Server.AgentMessage()
+        ping.answer_id = 2
+        ping.ping.dummy = 1
+        proxy = ReplayProxy([content, ping], self.loop)
+        writer = FakeWriter()
+        proxy._connection = (None, writer)
+        proxy._server_writer = writer
+        agent = RecordingAgent(proxy)
+        registry = agent.enable_metrics()
+
+        self.loop.run_until_complete(proxy.loop(agent))
+        proxy.send_message(3, 1, "peer", b"data")
+        snapshot = registry.snapshot()
+        self.assertEqual(snapshot["oef_frames_in_total"][(("case", "content.content"),)], 1)
+        self.assertEqual(snapshot["oef_frames_out_total"][(("case", "pong"),)], 1)
+        self.assertEqual(snapshot["oef_bytes_out_total"][(("case", "send_message"),)],
+                         len(Message(3, 1, "peer", b"data").to_pb().SerializeToString()) + 4)
+        self.assertEqual(snapshot["oef_handler_seconds"][(("handler", "on_message"),)]["count"], 1)
+        self.assertEqual(snapshot["oef_pong_latency_seconds"][()]["count"], 1)
+        self.assertEqual(snapshot["oef_stored_contexts"][()], 0)
+        self.assertEqual(snapshot["oef_write_buffer_bytes"][()], writer.transport.buffered)
+
+    def testPendingSearchesExpire(self):
+        metrics = ProxyMetrics(MetricsRegistry(), search_timeout=60.0)
+        for msg_id in range(3):
+            metrics.sent("search_agents", msg_id, 10, 0.0)
+        metrics.handled("on_search_result", "agents", 1, 0.0)
+        self.assertEqual(list(metrics.pending_searches), [0, 2])
+        # never answered: forgotten once older than the timeout
+        metrics.pending_searches[0] -= 120.0
+        metrics.sent("search_services", 3, 10, 0.0)
+        self.assertEqual(list(metrics.pending_searches), [2, 3])
+        self.assertEqual(metrics.registry.snapshot()["oef_pending_searches"][()], 2)
+
+    def testDisabledByDefault(self):
+        proxy = OEFNetworkProxy("agent", "127.0.0.1", loop=self.loop)
+        self.assertIsNone(proxy.metrics)
@@ -0,0 +1,65 @@
+import asyncio
+import os
+import signal
+import threading
+import time
+import unittest
+
+from oef.src.python.agents import OEFAgent
+from oef.src.python.metrics import merge_snapshots
+from oef.src.python.runner import AgentSpec, MultiProcessRunner
+from oef.test.python.doubles import FakeNode
+
+
+class MultiProcessRunnerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+        self.node = FakeNode()
+        asyncio.run_coroutine_threadsafe(self.node.start(), self.loop).result(5)
+
+    def tearDown(self):
+        asyncio.run_coroutine_threadsafe(self.node.close(), self.loop).result(5)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+    def _wait_running(self, runner, count, timeout=30.0):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            health = runner.check()
+            if all(h is not None for h in health.values()) and sum(h["running"] for h in health.values()) == count:
+                return health
+            time.sleep(0.1)
+        self.fail("the agents did not start: {}".format(health))
+
+    def testRunner(self):
+        specs = [AgentSpec(OEFAgent, "agent" + letter, "127.0.0.1", self.node.port) for letter in "abcdef"]
+        runner = MultiProcessRunner(specs, workers=2, health_timeout=5.0)
+        runner.start()
+        try:
+            health = self._wait_running(runner, 6)
+            self.assertEqual([h["agents"] for h in health.values()], [3, 3])
+            self.assertEqual(runner.metrics()["oef_fleet_running_agents"][()], 6)
+
+            os.kill(health[0]["pid"], signal.SIGKILL)
+            runner._workers[0].process.join(5)
+            health = self._wait_running(runner, 6)
+            self.assertEqual(runner.restarts(), {0: 1, 1: 0})
+            self.assertEqual(runner.failed_agents(), [])
+        finally:
+            exits = runner.stop()
+        self.assertEqual(exits, {0: {"stopped": 3}, 1: {"stopped": 3}})
+
+    def testMergeSnapshots(self):
+        first = {"frames": {(("case", "a"),): 1}, "latency": {(): {"count": 1, "sum": 0.5, "buckets": {1.0: 1}}}}
+        second = {"frames": {(("case", "a"),): 2}, "latency": {(): {"count": 2, "sum": 1.5, "buckets": {1.0: 2}}}}
+        merged = merge_snapshots([first, second])
+        self.assertEqual(merged["frames"], {(("case", "a"),): 3})
+        self.assertEqual(merged["latency"][()], {"count": 3, "sum": 2.0, "buckets": {1.0: 3}})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+import asyncio
+import unittest
+
+from oef.src.python.messages import Message, Accept, SearchAgents
+from oef.src.python.outbound import OutboundScheduler, Priority, envelope_priority
+from oef.src.python.query import Query, Constraint, Eq
+from oef.test.python.doubles import FakeWriter
+from protocol.src.proto import agent_pb2
+
+
+class OutboundSchedulerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self):
+        self.loop.close()
+
+    def testPriorities(self):
+        pong = agent_pb2.Envelope()
+        pong.msg_id = 1
+        pong.pong.dummy = 1
+        self.assertEqual(envelope_priority(pong), Priority.CONTROL)
+        self.assertEqual(envelope_priority(agent_pb2.Agent.Server.Answer()), Priority.CONTROL)
+        self.assertEqual(envelope_priority(Accept(1, 1, "b", 0).to_pb()), Priority.NEGOTIATION)
+        self.assertEqual(envelope_priority(SearchAgents(1, Query([Constraint("a", Eq(1))])).to_pb()),
+                         Priority.DIRECTORY)
+        self.assertEqual(envelope_priority(Message(1, 1, "b", b"data").to_pb()), Priority.BULK)
+
+    def testUrgentFramesOvertakeQueuedBulk(self):
+        writer = FakeWriter()
+        scheduler = OutboundScheduler(writer, self.loop, high_water=100)
+        self.assertEqual(writer.transport.high, 100)
+
+        scheduler.send(b"B" * 150, Priority.BULK)   # written directly, the buffer is now above the mark
+        scheduler.send(b"b1", Priority.BULK)
+        scheduler.send(b"b2", Priority.BULK)
+        scheduler.send(b"accept", Priority.NEGOTIATION)
+        scheduler.send(b"pong", Priority.CONTROL)
+        self.assertEqual(writer.written, [b"B" * 150])
+        self.assertEqual(scheduler.depth, 4)
+
+        self.loop.run_until_complete(scheduler.flush())
+        self.assertEqual(writer.written, [b"B" * 150, b"pong", b"accept", b"b1", b"b2"])
+        self.assertEqual(scheduler.depth, 0)
+        self.assertEqual(scheduler.stats.deferred[Priority.BULK], 2)
+        self.assertEqual(scheduler.stats.max_depth, 4)
@@ -0,0 +1,49 @@
+import random
+import unittest
+
+from oef.src.python.parallel import ColumnarDescriptions, ParallelQueryEvaluator
+from oef.src.python.query import Query, Constraint, And, Or, Not, Eq, NotEq, Lt, LtEq, Gt, GtEq, Range, In, NotIn, \
+    Distance
+from oef.src.python.schema import Description
+from protocol.src.python.Wrappers import Location
+
+
+class ParallelQueryTest(unittest.TestCase):
+
+    def setUp(self):
+        rng = random.Random(7)
+        self.descriptions = []
+        for i in range(500):
+            values = {"price": rng.randint(0, 100), "rating": rng.random() * 5.0, "used": rng.random() < 0.5}
+            if rng.random() < 0.8:
+                values["author"] = rng.choice(["Austen", "Borges", "Calvino", "Dickens", "Eco"])
+            if rng.random() < 0.8:
+                values["position"] = Location(rng.uniform(40.0, 50.0), rng.uniform(0.0, 10.0))
+            if i % 50 == 0:
+                values["price"] = "not a number"
+            self.descriptions.append(Description(values))
+
+        self.queries = [
+            Query([Constraint("price", Lt(30))]),
+            Query([Constraint("price", Range((10, 20))), Constraint("used", Eq(True))]),
+            Query([Or([Constraint("author", Eq("Borges")), Constraint("rating", GtEq(4.5))])]),
+            Query([Not(Constraint("author", In(["Austen", "Eco", "Kafka"])))]),
+            Query([Constraint("author", NotIn(["Calvino"])), Constraint("author", NotEq("Zola"))]),
+            Query([Constraint("author", Gt("Borges")), Constraint("author", LtEq("Dickens"))]),
+            Query([Constraint("author", Range(("Bo", "D")))]),
+            Query([Constraint("author", Lt("A"))]),
+            Query([Constraint("position", Distance(Location(45.0, 5.0), 300.0))]),
+            Query([And([Constraint("rating", Gt(1.0)), Constraint("missing", Eq(1))])]),
+        ]
+
+    def testMatchesCheck(self):
+        expected = [[i for i, d in enumerate(self.descriptions) if q.check(d)] for q in self.queries]
+        with ColumnarDescriptions(self.descriptions) as columns:
+            with ParallelQueryEvaluator(columns, self.queries, max_workers=2, chunk_size=64) as evaluator:
+                self.assertEqual(evaluator.run(), expected)
+                self.assertEqual(evaluator.run(), expected)
+
+    def testEmpty(self):
+        with ColumnarDescriptions([]) as columns:
+            with ParallelQueryEvaluator(columns, self.queries[:2], max_workers=1) as evaluator:
+                self.assertEqual(evaluator.run(), [[], []])
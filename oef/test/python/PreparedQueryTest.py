@@ -0,0 +1,66 @@
+import unittest
+
+from oef.src.python.query import Query, Constraint, Eq, Lt, Range, Distance, Placeholder, PreparedQuery
+from oef.src.python.messages import SearchServices
+from protocol.src.python.Wrappers import Location
+
+
+class PreparedQueryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.prepared = PreparedQuery(Query([
+            Constraint("author", Eq(Placeholder("author", str))),
+            Constraint("price", Lt(Placeholder("max_price", float))),
+            Constraint("rating", Range(Placeholder("rating", float))),
+            Constraint("position", Distance(Placeholder("center", Location), Placeholder("radius", float))),
+        ]))
+
+    def testBindMatchesFreshQuery(self):
+        center = Location(48.8581064, 2.29447)
+        expected = Query([
+            Constraint("author", Eq("Stephen King")),
+            Constraint("price", Lt(10.5)),
+            Constraint("rating", Range((3.0, 5.0))),
+            Constraint("position", Distance(center, 1.0)),
+        ]).to_pb()
+
+        bound = self.prepared.bind(author="Stephen King", max_price=10.5, rating=(3.0, 5.0),
+                                   center=center, radius=1.0)
+        self.assertEqual(bound.to_pb(), expected)
+
+    def testRebind(self):
+        first = self.prepared.bind(author="A", max_price=1.0, rating=(1.0, 2.0),
+                                   center=Location(0.0, 0.0), radius=1.0)
+        second = self.prepared.bind(author="B", max_price=2.0, rating=(1.0, 2.0),
+                                    center=Location(0.0, 0.0), radius=1.0)
+        self.assertEqual(first.to_pb().constraints[0].query_field_value.s, "A")
+        self.assertEqual(second.to_pb().constraints[0].query_field_value.s, "B")
+        self.assertEqual(list(second.to_pb().constraints[2].query_field_value.v_d), [1.0, 2.0])
+
+    def testInvalidParameters(self):
+        with self.assertRaises(ValueError):
+            self.prepared.bind(author="A")
+        with self.assertRaises(ValueError):
+            self.prepared.bind(author="A", max_price=1.0, rating=(1.0, 2.0),
+                               center=Location(0.0, 0.0), radius=1.0, unknown=3)
+
+    def testInvalidTypes(self):
+        valid = dict(author="A", max_price=1.0, rating=(1.0, 2.0), center=Location(0.0, 0.0), radius=1.0)
+        before = self.prepared.bind(**valid).to_pb()
+        for name, value in (("author", 3), ("max_price", "abc"), ("rating", 1.0), ("rating", (1.0, "x")),
+                            ("center", (0.0, 0.0)), ("radius", True)):
+            with self.assertRaises(ValueError):
+                self.prepared.bind(**dict(valid, **{name: value}))
+        # the template is untouched by the failed binds
+        self.assertEqual(self.prepared._template, before)
+        self.assertEqual(self.prepared.bind(**dict(valid, max_price=2)).to_pb().constraints[1].query_field_value.d,
+                         2.0)
+
+    def testPlaceholderHash(self):
+        self.assertEqual(len({Placeholder("a", int), Placeholder("a", int), Placeholder("a", str)}), 2)
+
+    def testSearchMessage(self):
+        bound = self.prepared.bind(author="A", max_price=1.0, rating=(1.0, 2.0),
+                                   center=Location(0.0, 0.0), radius=1.0)
+        envelope = SearchServices(1, bound).to_pb()
+        self.assertEqual(envelope.search_services.query_v2, bound.to_pb())
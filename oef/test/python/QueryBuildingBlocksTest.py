@@ -45,3 +45,59 @@ class LeafTest(unittest.TestCase):
         self.info("Branch Proto: ", r.toProto(""))
 
         assert True
+
+    def testCopy(self):
+        r = QueryBuildingBlocks.Branch(combiner=ProtoHelpers.COMBINER_ALL)
+        child = QueryBuildingBlocks.Branch(combiner=ProtoHelpers.COMBINER_NONE)
+        child.Add(QueryBuildingBlocks.Leaf(
+            operator=ProtoHelpers.OPERATOR_LT,
+            query_field_value=10,
+            query_field_type="int64",
+            target_field_name="price",
+        ))
+        r.Add(child)
+        r.Add(QueryBuildingBlocks.Leaf(
+            operator=ProtoHelpers.OPERATOR_EQ,
+            query_field_value="HelloWorld",
+            query_field_type="string",
+            target_field_name="example_attribute",
+        ))
+
+        c = r.Copy()
+        self.assertEqual(c.toProto(""), r.toProto(""))
+
+        c.subnodes[0].leaves[0].dap_names.add("dap")
+        c.subnodes[0].Clear()
+        self.assertEqual(len(r.subnodes[0].leaves), 1)
+        self.assertEqual(r.subnodes[0].leaves[0].dap_names, set())
+
+    def testDeepTree(self):
+        depth = 300
+        root = QueryBuildingBlocks.Branch(combiner=ProtoHelpers.COMBINER_ALL)
+        node = root
+        for i in range(depth):
+            node.Add(QueryBuildingBlocks.Leaf(
+                operator=ProtoHelpers.OPERATOR_EQ,
+                query_field_value=i,
+                query_field_type="int64",
+                target_field_name="level",
+            ))
+            child = QueryBuildingBlocks.Branch(combiner=ProtoHelpers.COMBINER_ANY)
+            node.Add(child)
+            node = child
+
+        pb = root.toProto("")
+        # compared level by level: the pure-Python protobuf __eq__ recurses, and overflows the stack on this tree
+        levels = self._levels(pb)
+        self.assertEqual(len(levels), depth + 1)
+        self.assertEqual([values for _, values in levels[:depth]], [[i] for i in range(depth)])
+        self.assertEqual(self._levels(QueryBuildingBlocks.Branch().fromProto(pb).toProto("")), levels)
+        self.assertEqual(self._levels(root.Copy().toProto("")), levels)
+
+    @staticmethod
+    def _levels(pb):
+        levels = []
+        while pb is not None:
+            levels.append((pb.operator, [c.query_field_value.i64 for c in pb.constraints]))
+            pb = pb.children[0] if len(pb.children) else None
+        return levels
@@ -1,3 +1,4 @@
+import tempfile
 import unittest
 import sys
 from utils.src.python.Logging import has_logger
@@ -37,5 +38,6 @@ class QueryVisTest(unittest.TestCase):
         #print(q.root.toProto())
 
         g = q.getGraph()
-        g.view()
+        with tempfile.TemporaryDirectory() as directory:
+            g.view(directory=directory)
         assert True
@@ -0,0 +1,121 @@
+import asyncio
+import unittest
+
+from oef.src.python.proxy import OEFNetworkProxy
+from oef.src.python.query import Query, Constraint, Eq
+from oef.src.python.ratelimit import RateLimiter, TokenBucket, SEARCH, MESSAGE
+from oef.test.python.doubles import FakeClock, FakeWriter
+
+
+class RateLimitTest(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.clock = FakeClock()
+        self.calls = []
+
+    def tearDown(self):
+        self.loop.close()
+
+    def testTokenBucket(self):
+        bucket = TokenBucket(rate=2.0, burst=3, clock=self.clock)
+        for _ in range(3):
+            self.assertEqual(bucket.delay(), 0.0)
+            bucket.take()
+        self.assertAlmostEqual(bucket.delay(), 0.5)
+        self.clock.now = 10.0
+        self.assertEqual(bucket.tokens, 3)
+        with self.assertRaises(ValueError):
+            TokenBucket(rate=0, burst=1)
+
+    def testOverLimitCallsAreDeferredInOrder(self):
+        limiter = RateLimiter({SEARCH: (10.0, 2)}, loop=self.loop, clock=self.clock)
+        futures = [limiter.submit(SEARCH, None, self.calls.append, i) for i in range(4)]
+        self.assertEqual(self.calls, [0, 1])
+        self.assertTrue(futures[1].done())
+        self.assertFalse(futures[2].done())
+        self.assertEqual(limiter.pending(SEARCH), 2)
+
+        self.clock.now = 0.1
+        self.loop.run_until_complete(futures[2])
+        self.assertEqual(self.calls, [0, 1, 2])
+        self.clock.now = 0.2
+        self.loop.run_until_complete(futures[3])
+        self.assertEqual(self.calls, [0, 1, 2, 3])
+
+        snapshot = limiter.snapshot()[SEARCH]
+        self.assertEqual((snapshot["allowed"], snapshot["delayed"], snapshot["pending"]), (4, 2, 0))
+
+    def testCancelledCallsUseNoToken(self):
+        limiter = RateLimiter({SEARCH: (10.0, 1)}, loop=self.loop, clock=self.clock)
+        limiter.submit(SEARCH, None, self.calls.append, 0)
+        dropped = limiter.submit(SEARCH, None, self.calls.append, 1)
+        live = limiter.submit(SEARCH, None, self.calls.append, 2)
+        dropped.cancel()
+        self.clock.now = 0.1
+        self.loop.run_until_complete(asyncio.wait_for(live, 1))
+        self.assertEqual(self.calls, [0, 2])
+        self.assertEqual(limiter.snapshot()[SEARCH]["allowed"], 2)
+
+    def testUnlimitedKind(self):
+        limiter = RateLimiter({SEARCH: (1.0, 1)}, loop=self.loop, clock=self.clock)
+        self.assertIsNone(limiter.submit(MESSAGE, None, self.calls.append, "x"))
+        self.assertEqual(self.calls, ["x"])
+
+    def testPerDestination(self):
+        limiter = RateLimiter({}, per_destination=(1.0, 1), loop=self.loop, clock=self.clock)
+        limiter.submit(MESSAGE, "a", self.calls.append, "a1")
+        limiter.submit(MESSAGE, "b", self.calls.append, "b1")
+        pending = limiter.submit(MESSAGE, "a", self.calls.append, "a2")
+        self.assertEqual(self.calls, ["a1", "b1"])
+        limiter.cancel()
+        self.assertTrue(pending.cancelled())
+        self.assertEqual(limiter.pending(MESSAGE), 0)
+
+    def testThrottledDestinationDoesNotDelayOthers(self):
+        limiter = RateLimiter({}, per_destination=(1.0, 1), loop=self.loop, clock=self.clock)
+        limiter.submit(MESSAGE, "a", self.calls.append, "a1")
+        throttled = limiter.submit(MESSAGE, "a", self.calls.append, "a2")
+        other = limiter.submit(MESSAGE, "b", self.calls.append, "b1")
+        self.assertFalse(throttled.done())
+        self.assertTrue(other.done())
+        self.assertEqual(self.calls, ["a1", "b1"])
+        self.clock.now = 1.0
+        self.loop.run_until_complete(throttled)
+        self.assertEqual(self.calls, ["a1", "b1", "a2"])
+        self.assertEqual(limiter._queues, {})
+
+    def testProxy(self):
+        proxy = OEFNetworkProxy("agent", "127.0.0.1", loop=self.loop)
+        writer = FakeWriter()
+        proxy._connection = (None, writer)
+        proxy._server_writer = writer
+        proxy.configure_rate_limits(search=(1000.0, 1))
+
+        self.assertIsNone(proxy.send_message(1, 1, "destination", b"hello"))
+        first = proxy.search_agents(2, Query([Constraint("a", Eq(1))]))
+        second = proxy.search_agents(3, Query([Constraint("a", Eq(1))]))
+        self.assertTrue(first.done())
+        self.assertEqual(len(writer.written), 2)
+        self.loop.run_until_complete(second)
+        self.assertEqual(len(writer.written), 3)
+        self.assertEqual(proxy.rate_limit_stats[SEARCH]["delayed"], 1)
+
+    def testProxyMetrics(self):
+        proxy = OEFNetworkProxy("agent", "127.0.0.1", loop=self.loop)
+        writer = FakeWriter()
+        proxy._connection = (None, writer)
+        proxy._server_writer = writer
+        registry = proxy.enable_metrics()
+        self.assertEqual(registry.snapshot()["oef_rate_limit_pending"][(("kind", SEARCH),)], 0)
+
+        proxy.configure_rate_limits(search=(0.001, 1))
+        proxy.search_agents(1, Query([Constraint("a", Eq(1))]))
+        proxy.search_agents(2, Query([Constraint("a", Eq(1))]))
+        snapshot = registry.snapshot()
+        self.assertEqual(snapshot["oef_rate_limit_pending"][(("kind", SEARCH),)], 1)
+        self.assertEqual(snapshot["oef_rate_limit_allowed_total"][(("kind", SEARCH),)], 1)
+        self.assertEqual(snapshot["oef_rate_limit_delayed_total"][(("kind", SEARCH),)], 1)
+        self.assertLess(snapshot["oef_rate_limit_tokens"][(("kind", SEARCH),)], 1)
+        self.assertEqual(snapshot["oef_rate_limit_pending"][(("kind", MESSAGE),)], 0)
+        proxy.configure_rate_limits()
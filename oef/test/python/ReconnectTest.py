@@ -0,0 +1,165 @@
+import asyncio
+import struct
+import unittest
+
+from oef.src.python.agents import OEFAgent
+from oef.src.python.proxy import OEFConnectionError
+from oef.src.python.query import Constraint, Eq, Query
+from oef.src.python.reconnect import ReconnectPolicy, Session
+from oef.src.python.schema import Description
+from oef.src.python.messages import RegisterService, SearchAgents, UnregisterService
+from oef.test.python.doubles import FakeNode
+from protocol.src.proto import agent_pb2
+from utils.src.python import uri
+
+
+class ReconnectTest(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.node = FakeNode()
+        self.loop.run_until_complete(self.node.start())
+
+    def tearDown(self):
+        self.loop.run_until_complete(self.node.close())
+        asyncio.set_event_loop(None)
+        self.loop.close()
+
+    async def _until(self, condition, timeout=5.0):
+        deadline = self.loop.time() + timeout
+        while not condition():
+            self.assertLess(self.loop.time(), deadline, "timed out")
+            await asyncio.sleep(0.01)
+
+    def _payloads(self, start=0):
+        return [envelope.WhichOneof("payload") for _, envelope in self.node.received[start:]]
+
+    def testReplay(self):
+        agent = OEFAgent("agent", "127.0.0.1", self.node.port, loop=self.loop)
+        stats = agent.enable_reconnect(ReconnectPolicy(initial_delay=0.05, rng=lambda: 0.0))
+        query = Query([Constraint("price", Eq(1))])
+        results = []
+        agent.on_search_result = lambda search_id, agents: results.append((search_id, agents))
+
+        async def scenario():
+            await agent.async_connect()
+            task = asyncio.ensure_future(agent.async_run())
+            agent.register_agent(1, Description({"name": "agent"}))
+            agent.register_service(2, Description({"price": 1}))
+            agent.register_service(3, Description({"price": 2}))
+            agent.unregister_service(4, Description({"price": 2}))
+            agent.search_agents(5, query)
+            agent.search_services(6, query)
+            await self._until(lambda: len(self.node.received) == 6)
+            result = agent_pb2.Server.AgentMessage()
+            result.answer_id = 6
+            result.agents.agents.append("other")
+            self.node.send("agent", result)
+            await self._until(lambda: results)
+
+            self.node.disconnect("agent")
+            await self._until(lambda: agent._oef_proxy._outage is not None)
+            agent.send_message(7, 0, "other", b"hello")
+            agent.search_agents(8, query)
+            await self._until(lambda: len(self.node.received) == 11)
+            self.assertTrue(agent._oef_proxy.is_connected())
+            agent.stop()
+            await task
+            await agent.async_disconnect()
+
+        self.loop.run_until_complete(scenario())
+        self.assertEqual(results, [(6, ["other"])])
+        self.assertEqual(self.node.handshakes, 2)
+        self.assertEqual(self._payloads(6), ["register_description", "register_service", "search_agents",
+                                             "search_agents", "send_message"])
+        self.assertEqual([envelope.msg_id for _, envelope in self.node.received[6:]], [1, 2, 5, 8, 7])
+        self.assertEqual((stats.drops, stats.reconnects, stats.replayed, stats.buffered), (1, 1, 4, 1))
+
+    def testGiveUp(self):
+        agent = OEFAgent("agent", "127.0.0.1", self.node.port, loop=self.loop)
+        stats = agent.enable_reconnect(ReconnectPolicy(initial_delay=0.01, max_attempts=3, buffer_limit=1))
+
+        async def scenario():
+            await agent.async_connect()
+            task = asyncio.ensure_future(agent.async_run())
+            await self._until(lambda: "agent" in self.node.writers)
+            self.node.refuse.add("agent")
+            self.node.disconnect("agent")
+            await self._until(lambda: agent._oef_proxy._outage is not None)
+            agent.send_message(1, 0, "other", b"buffered")
+            with self.assertRaises(OEFConnectionError):
+                agent.send_message(2, 0, "other", b"overflow")
+            await asyncio.wait_for(task, 5)
+
+        self.loop.run_until_complete(scenario())
+        self.assertEqual((stats.drops, stats.attempts, stats.failures, stats.reconnects), (1, 3, 1, 0))
+        self.assertEqual((stats.buffered, stats.overflows), (1, 1))
+        self.assertEqual(self.node.handshakes, 4)
+        self.assertFalse(agent._oef_proxy.is_connected())
+
+    def testDropMidFrame(self):
+        agent = OEFAgent("agent", "127.0.0.1", self.node.port, loop=self.loop)
+        stats = agent.enable_reconnect(ReconnectPolicy(initial_delay=0.01, rng=lambda: 0.0))
+
+        async def scenario():
+            await agent.async_connect()
+            task = asyncio.ensure_future(agent.async_run())
+            await self._until(lambda: "agent" in self.node.writers)
+            # the header announces 10 bytes, the node closes the connection after 3
+            self.node.writers["agent"].write(struct.pack("I", 10) + b"abc")
+            self.node.disconnect("agent")
+            await self._until(lambda: stats.reconnects == 1)
+            agent.stop()
+            await task
+            await agent.async_disconnect()
+
+        self.loop.run_until_complete(asyncio.wait_for(scenario(), 5))
+        self.assertEqual((stats.drops, stats.reconnects), (1, 1))
+        self.assertEqual(self.node.handshakes, 2)
+
+    def testStaleResolvedAddress(self):
+        agent = OEFAgent("agent", "127.0.0.1", self.node.port, loop=self.loop)
+        stats = agent.enable_reconnect(ReconnectPolicy(initial_delay=0.01, rng=lambda: 0.0))
+        proxy = agent._oef_proxy
+
+        async def scenario():
+            await agent.async_connect()
+            task = asyncio.ensure_future(agent.async_run())
+            await self._until(lambda: "agent" in self.node.writers)
+            # e.g. the DNS record of the node changed: the pinned address is no longer reachable
+            proxy._resolved_addr = "127.0.0.2"
+            self.node.disconnect("agent")
+            await self._until(lambda: stats.reconnects == 1)
+            self.assertIsNone(proxy._resolved_addr)
+            agent.stop()
+            await task
+            await agent.async_disconnect()
+
+        self.loop.run_until_complete(asyncio.wait_for(scenario(), 5))
+        self.assertGreaterEqual(stats.attempts, 2)
+
+    def testPolicy(self):
+        policy = ReconnectPolicy(initial_delay=1.0, max_delay=5.0, jitter=0.5, rng=lambda: 1.0)
+        self.assertEqual([policy.delay(attempt) for attempt in range(5)], [0.5, 1.0, 2.0, 2.5, 2.5])
+        policy = ReconnectPolicy(initial_delay=1.0, max_delay=5.0, rng=lambda: 0.0)
+        self.assertEqual(policy.delay(1000), 5.0)
+        with self.assertRaises(ValueError):
+            ReconnectPolicy(jitter=2.0)
+
+    def testSession(self):
+        session = Session()
+        service = Description({"price": 1})
+        self.assertTrue(session.record(RegisterService(1, service, uri.agentURI("agent", "a"))))
+        self.assertTrue(session.record(SearchAgents(2, Query([Constraint("price", Eq(1))]))))
+        self.assertEqual([msg.msg_id for msg in session.replay()], [1, 2])
+        session.received("oef_error", 1)
+        session.received("agents", 2)
+        self.assertEqual(session.replay(), [])
+        session.record(RegisterService(3, service, uri.agentURI("agent", "a")))
+        session.record(UnregisterService(4, Description({"price": 1}), uri.agentURI("agent", "a")))
+        self.assertEqual(session.replay(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
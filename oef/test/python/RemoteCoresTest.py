@@ -0,0 +1,124 @@
+import asyncio
+import time
+import unittest
+
+from oef.src.python.agents import OEFAgent
+from oef.src.python.query import SearchResultItem
+from oef.src.python.remote import RemoteCores, parse_core
+from oef.test.python.doubles import FakeNode
+from protocol.src.proto import agent_pb2
+from utils.src.python import uri
+
+
+class RecordingAgent(OEFAgent):
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.messages = []
+        self.search_results = []
+
+    def on_message(self, msg_id, dialogue_id, origin, content):
+        self.messages.append((origin, content))
+
+    def on_search_result_wide(self, search_id, agents):
+        self.search_results.append((search_id, [item.public_key for item in agents]))
+
+
+class RemoteCoresTest(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.local = FakeNode()
+        self.remote = FakeNode()
+        self.other = FakeNode()
+        for node in (self.local, self.remote, self.other):
+            self.loop.run_until_complete(node.start())
+        self.manager = RemoteCores(max_connections=1, loop=self.loop)
+        self.agent = RecordingAgent("agent", "127.0.0.1", self.local.port, loop=self.loop)
+        self.agent.enable_remote_cores(self.manager)
+        self.loop.run_until_complete(self.agent.async_connect())
+        self.task = asyncio.ensure_future(self.agent.async_run(), loop=self.loop)
+        self._until(lambda: self.agent._task is not None)
+
+    def tearDown(self):
+        self.agent.stop()
+        self.loop.run_until_complete(self.task)
+        self.loop.run_until_complete(self.manager.close())
+        self.loop.run_until_complete(self.agent.async_disconnect())
+        for node in (self.local, self.remote, self.other):
+            self.loop.run_until_complete(node.close())
+        asyncio.set_event_loop(None)
+        self.loop.close()
+
+    def _until(self, condition, timeout=5.0):
+        async def wait():
+            deadline = self.loop.time() + timeout
+            while not condition():
+                self.assertLess(self.loop.time(), deadline, "timed out")
+                await asyncio.sleep(0.01)
+        self.loop.run_until_complete(wait())
+
+    def _payloads(self, node):
+        return [(key, envelope.WhichOneof("payload")) for key, envelope in node.received]
+
+    def testRouting(self):
+        result = agent_pb2.Server.AgentMessage()
+        result.answer_id = 1
+        item = result.agents_wide.result.add()
+        item.key = b"remote_core"
+        item.ip = "127.0.0.1"
+        item.port = self.remote.port
+        item.agents.add().key = b"remote_agent"
+        self.local.send("agent", result)
+        self._until(lambda: self.agent.search_results)
+        self.assertEqual(self.agent.search_results, [(1, ["remote_agent"])])
+
+        first = self.agent.send_message(1, 0, "remote_agent", b"hello")
+        self.loop.run_until_complete(first)
+        self.assertIsNone(self.agent.send_message(2, 0, "remote_agent", b"again"))
+        self.assertIsNone(self.agent.send_message(3, 0, "local_agent", b"local"))
+        self._until(lambda: len(self.remote.received) == 2 and len(self.local.received) == 1)
+        self.assertEqual(self._payloads(self.remote), [("agent", "send_message")] * 2)
+        self.assertEqual([envelope.send_message.destination for _, envelope in self.local.received], ["local_agent"])
+        self.assertEqual((self.manager.stats.opened, self.manager.stats.sent), (1, 2))
+
+        # the remote core pings and sends messages on the connection of the agent
+        self.remote.ping("agent", 7)
+        message = agent_pb2.Server.AgentMessage()
+        message.answer_id = 8
+        message.content.dialogue_id = 0
+        message.content.origin = "remote_agent"
+        message.content.content = b"reply"
+        self.remote.send("agent", message)
+        self._until(lambda: self.agent.messages and len(self.remote.received) == 3)
+        self.assertEqual(self.agent.messages, [("remote_agent", b"reply")])
+        self.assertEqual(self._payloads(self.remote)[2], ("agent", "pong"))
+
+    def testContextRouteAndEviction(self):
+        context = uri.Context()
+        context.targetURI = uri.OEFURI.Builder().coreAddress("127.0.0.1", self.other.port).agentKey("x").build()
+        self.loop.run_until_complete(self.agent.send_message(1, 0, "x", b"hello", context))
+        self.manager.learn([SearchResultItem("y", "core", "127.0.0.1", self.remote.port, 1)])
+        self.loop.run_until_complete(self.agent.send_message(2, 0, "y", b"hello"))
+        self._until(lambda: len(self.other.received) == 1 and len(self.remote.received) == 1)
+        self.assertEqual(self.manager.stats.evicted, 1)
+        self.assertEqual(len(self.manager), 1)
+        self._until(lambda: "agent" not in self.other.writers)
+
+        self.assertEqual(self.manager.close_idle(time.monotonic() + 1000), 1)
+        self.assertEqual(len(self.manager), 0)
+
+    def testConnectionFailure(self):
+        self.manager.learn([SearchResultItem("z", "core", "127.0.0.1", 1, 1)])
+        with self.assertRaises(OSError):
+            self.loop.run_until_complete(self.agent.send_message(1, 0, "z", b"hello"))
+        self.assertEqual((self.manager.stats.failed, len(self.manager)), (1, 0))
+
+    def testParseCore(self):
+        self.assertEqual(parse_core("127.0.0.1:3333"), ("127.0.0.1", 3333))
+        self.assertIsNone(parse_core("127.0.0.1"))
+
+
+if __name__ == '__main__':
+    unittest.main()
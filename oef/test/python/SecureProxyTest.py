@@ -0,0 +1,72 @@
+import asyncio
+import os
+import ssl
+import struct
+import unittest
+
+from oef.src.python.proxy import OEFSecureNetworkProxy, clear_ssl_contexts, ssl_context
+from protocol.src.proto import agent_pb2
+
+KEY_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tls_test.pem")
+
+
+class SecureProxyTest(unittest.TestCase):
+
+    def setUp(self):
+        clear_ssl_contexts()
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        server_ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        server_ctx.load_cert_chain(KEY_FILE)
+        self.server = self.loop.run_until_complete(
+            asyncio.start_server(self._handle, "127.0.0.1", 0, ssl=server_ctx))
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    def tearDown(self):
+        self.server.close()
+        self.loop.run_until_complete(self.server.wait_closed())
+        asyncio.set_event_loop(None)
+        self.loop.close()
+        clear_ssl_contexts()
+
+    @staticmethod
+    async def _handle(reader, writer):
+        try:
+            size = struct.unpack("I", await reader.readexactly(4))[0]
+            await reader.readexactly(size)
+            data = agent_pb2.Server.Connected(status=True).SerializeToString()
+            writer.write(struct.pack("I", len(data)) + data)
+            await reader.read()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    def _connect(self):
+        proxy = OEFSecureNetworkProxy(KEY_FILE, "127.0.0.1", KEY_FILE, self.port, loop=self.loop)
+        self.assertTrue(self.loop.run_until_complete(proxy.connect()))
+        self.loop.run_until_complete(proxy.stop())
+        return proxy
+
+    def testContextCache(self):
+        context = ssl_context(KEY_FILE, KEY_FILE)
+        self.assertIs(ssl_context(KEY_FILE, KEY_FILE), context)
+        stat = os.stat(KEY_FILE)
+        os.utime(KEY_FILE, (stat.st_atime, stat.st_mtime + 1))
+        try:
+            self.assertIsNot(ssl_context(KEY_FILE, KEY_FILE), context)
+        finally:
+            os.utime(KEY_FILE, (stat.st_atime, stat.st_mtime))
+
+    def testSessionResumption(self):
+        first = self._connect()
+        self.assertFalse(first.tls_session_reused)
+        second = self._connect()
+        self.assertTrue(second.tls_session_reused)
+        self.assertIs(first._ssl_ctx, second._ssl_ctx)
+        clear_ssl_contexts()
+        self.assertFalse(self._connect().tls_session_reused)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import random
+import unittest
+from collections import defaultdict
+
+from oef.src.python.query import Query, Constraint, And, Or, Not, Eq, NotEq, Lt, GtEq, Range, In
+from oef.src.python.schema import Description
+from oef.src.python.standing import StandingQueryEngine
+
+
+class StandingQueryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = StandingQueryEngine()
+        self.matches = defaultdict(set)
+
+    def _subscribe(self, query):
+        def callback(sub_id, key, description, matched):
+            if matched:
+                self.assertNotIn(key, self.matches[sub_id])
+                self.matches[sub_id].add(key)
+            else:
+                self.assertIn(key, self.matches[sub_id])
+                self.matches[sub_id].discard(key)
+        return self.engine.subscribe(query, callback)
+
+    def testMatchesBruteForce(self):
+        rnd = random.Random(42)
+        queries = [
+            Query([Constraint("price", Lt(50))]),
+            Query([Constraint("price", GtEq(20)), Constraint("genre", Eq("horror"))]),
+            Query([Constraint("price", Range((10, 30)))]),
+            Query([Constraint("genre", In(["horror", "novel"])), Constraint("price", Range((0, 90)))]),
+            Query([Or([Constraint("price", Lt(5)), Constraint("genre", Eq("novel"))])]),
+            Query([Not(Constraint("genre", Eq("horror")))]),
+            Query([Constraint("genre", NotEq("novel"))]),
+            Query([And([Constraint("price", Range((40, 60))), Constraint("rating", GtEq(3.0))])]),
+        ]
+        sub_ids = [self._subscribe(q) for q in queries]
+
+        descriptions = {}
+        for _ in range(2000):
+            key = rnd.randrange(50)
+            if key in descriptions and rnd.random() < 0.2:
+                del descriptions[key]
+                self.engine.remove(key)
+                continue
+            values = {"price": rnd.randrange(100), "genre": rnd.choice(["horror", "novel", "comedy"])}
+            if rnd.random() < 0.5:
+                values["rating"] = rnd.random() * 5
+            descriptions[key] = Description(values)
+            self.engine.update(key, descriptions[key])
+
+            if rnd.random() < 0.05:
+                self.engine.unsubscribe(sub_ids[0])
+                del self.matches[sub_ids[0]]
+                sub_ids[0] = self._subscribe(queries[0])
+
+        for sub_id, query in zip(sub_ids, queries):
+            expected = {k for k, d in descriptions.items() if query.check(d)}
+            self.assertEqual(self.matches[sub_id], expected)
+            self.assertEqual(self.engine.matches(sub_id), expected)
+
+    def testOnlyAffectedSubscriptionsChecked(self):
+        checked = []
+
+        class CountingQuery(Query):
+            def check(self, description):
+                checked.append(self)
+                return super().check(description)
+
+        for price in range(1000):
+            self._subscribe(CountingQuery([Constraint("price", Eq(price))]))
+        self.engine.add("offer", Description({"price": 10}))
+        self.assertEqual(len(checked), 1)
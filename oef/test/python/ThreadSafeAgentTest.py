@@ -0,0 +1,100 @@
+import asyncio
+import concurrent.futures
+import threading
+import time
+import unittest
+
+from oef.src.python.agents import OEFAgent
+from oef.src.python.threadsafe import ThreadSafeAgent
+from oef.test.python.doubles import FakeNode
+
+
+class ThreadSafeAgentTest(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+        self.node = FakeNode(refuse=["refused"])
+        asyncio.run_coroutine_threadsafe(self.node.start(), self.loop).result(5)
+
+    def tearDown(self):
+        asyncio.run_coroutine_threadsafe(self.node.close(), self.loop).result(5)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+    def _agent(self, public_key="agent"):
+        return ThreadSafeAgent(OEFAgent(public_key, "127.0.0.1", self.node.port, loop=asyncio.new_event_loop()))
+
+    def _wait_received(self, count, timeout=10.0):
+        deadline = time.monotonic() + timeout
+        while len(self.node.received) < count and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(len(self.node.received), count)
+
+    def testSendFromThreads(self):
+        with self._agent() as agent:
+            def send(first):
+                return [agent.send_message(msg_id, 0, "other", b"hello") for msg_id in range(first, first + 250)]
+
+            results = []
+            senders = [threading.Thread(target=lambda i=i: results.extend(send(i * 250))) for i in range(4)]
+            for sender in senders:
+                sender.start()
+            for sender in senders:
+                sender.join()
+            for future in results:
+                self.assertIsNone(future.result(5))
+            self._wait_received(1000)
+        self.assertFalse(agent.running)
+        msg_ids = sorted(envelope.msg_id for _, envelope in self.node.received)
+        self.assertEqual(msg_ids, list(range(1000)))
+        self.assertEqual(agent.calls, 1001)
+        self.assertLessEqual(agent.wakeups, agent.calls)
+
+    def testBatching(self):
+        with self._agent() as agent:
+            blocked = agent.call(time.sleep, 0.2)
+            time.sleep(0.05)
+            futures = [agent.send_message(msg_id, 0, "other", b"hello") for msg_id in range(100)]
+            blocked.result(5)
+            for future in futures:
+                future.result(5)
+            self.assertEqual(agent.wakeups, 2)
+            self._wait_received(100)
+
+    def testResults(self):
+        with self._agent() as agent:
+            self.assertEqual(agent.call(lambda: agent.agent.public_key).result(5), "agent")
+            self.assertIsInstance(agent.call(lambda: 1 / 0).exception(5), ZeroDivisionError)
+
+            async def ping():
+                await asyncio.sleep(0.01)
+                return "pong"
+
+            self.assertEqual(agent.call_async(ping).result(5), "pong")
+        self.assertIsInstance(agent.send_message(0, 0, "other", b"late").exception(5), RuntimeError)
+
+    def testCancelledSend(self):
+        with self._agent() as agent:
+            proxy = agent.agent._oef_proxy
+            agent.call(proxy.configure_rate_limits, None, None, (1.0, 1.0)).result(5)
+            sent = agent.send_message(0, 0, "other", b"hello")
+            pending = agent.send_message(1, 0, "other", b"hello")
+            self.assertIsNone(sent.result(5))
+            # dropped by the new limits, while waiting for a token
+            agent.call(proxy.configure_rate_limits).result(5)
+            with self.assertRaises(concurrent.futures.CancelledError):
+                pending.result(5)
+
+    def testConnectionFailure(self):
+        agent = self._agent("refused")
+        with self.assertRaises(OSError):
+            agent.start(5)
+        self.assertFalse(agent.running)
+        agent.stop()
+
+
+if __name__ == '__main__':
+    unittest.main()
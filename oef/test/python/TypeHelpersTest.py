@@ -0,0 +1,57 @@
+import logging
+import unittest
+
+from protocol.src.python import TypeHelpers
+from protocol.src.python.Wrappers import Location
+from oef.src.python.query import Query, Constraint, Range, In
+
+
+class TypeHelpersTest(unittest.TestCase):
+
+    def setUp(self):
+        self.logger = logging.getLogger(__name__)
+
+    def testRoundTrip(self):
+        values = [
+            (True, 'bool'),
+            ("hello", 'string'),
+            (1.5, 'double'),
+            (7, 'int32'),
+            (2 ** 40, 'int64'),
+            ([True, False], 'bool_list'),
+            (["a", "b"], 'string_list'),
+            ([1.5, 2.5], 'double_list'),
+            ([1, 2], 'int32_list'),
+            ([1, 2 ** 40], 'int64_list'),
+            (("a", "b"), 'string_pair'),
+            ([("a", "b"), ("c", "d")], 'string_pair_list'),
+            (("a", "b"), 'string_range'),
+            ((1.5, 2.5), 'double_range'),
+            ((1, 2), 'int32_range'),
+            ((1, 2 ** 40), 'int64_range'),
+            (("latlon", "deg", [1.0, 2.0]), 'location'),
+        ]
+        for data, typecode in values:
+            decoded = TypeHelpers.decodeConstraintValue(TypeHelpers.encodeConstraintValue(data, typecode, self.logger))
+            self.assertEqual(list(decoded) if isinstance(data, list) else decoded,
+                             data if typecode != 'location' else ("latlon", "deg", [1.0, 2.0]))
+
+    def testAliases(self):
+        for alias, typecode in [('i32_list', 'int32_list'), ('i64_list', 'int64_list'),
+                                ('i64_range', 'int64_range'), ('int', 'int64')]:
+            data = 5 if alias == 'int' else [1, 2]
+            vm = TypeHelpers.encodeConstraintValue(data, alias, self.logger)
+            self.assertEqual(vm.typecode, typecode)
+
+    def testMany(self):
+        values = [(1, 'int64'), ("x", 'string'), ([1.0], 'double_list')]
+        encoded = TypeHelpers.encodeMany(values, self.logger)
+        self.assertEqual(len(encoded), 3)
+        self.assertEqual(TypeHelpers.decodeMany(encoded), [1, "x", [1.0]])
+
+    def testQueryValues(self):
+        pb = Query([Constraint("year", Range((1990, 2000))),
+                    Constraint("position", In([Location(1.0, 2.0), Location(3.0, 4.0)]))]).to_pb()
+        self.assertEqual(TypeHelpers.decodeConstraintValue(pb.constraints[0].query_field_value), (1990, 2000))
+        self.assertEqual(TypeHelpers.decodeConstraintValue(pb.constraints[1].query_field_value),
+                         [("latlon", "deg", [1.0, 2.0]), ("latlon", "deg", [3.0, 4.0])])
@@ -0,0 +1,46 @@
+import copy
+import pickle
+import unittest
+
+from oef.src.python.messages import Message
+from utils.src.python import uri
+
+
+class URITest(unittest.TestCase):
+
+    def testParseRoundTrip(self):
+        for string in ["tcp://127.0.0.1:10000/core-key//agent/alias",
+                       "tcp://127.0.0.1:10000/core-key/ns1/ns2/agent/alias"]:
+            self.assertEqual(uri.OEFURI.parse(string).toString(), string)
+        self.assertTrue(uri.OEFURI.parse("agent/alias").empty)
+        with self.assertRaises(TypeError):
+            uri.OEFURI().parse("tcp://127.0.0.1:10000/core-key//agent/alias")
+        with self.assertRaises(TypeError):
+            uri.OEFURI().parseAgent("agent/alias")
+
+    def testParseAgent(self):
+        oef_uri = uri.OEFURI.parseAgent("agent/alias")
+        self.assertEqual((oef_uri.agentKey, oef_uri.agentAlias), ("agent", "alias"))
+        self.assertEqual(uri.OEFURI.parseAgent("agent").agentAlias, "")
+        self.assertTrue(uri.OEFURI.parseAgent("a/b/c").empty)
+
+    def testImmutableValue(self):
+        oef_uri = uri.OEFURI.Builder().agentKey("agent").agentAlias("alias").build()
+        with self.assertRaises(AttributeError):
+            oef_uri.agentAlias = "other"
+        self.assertEqual(oef_uri, uri.OEFURI.parseAgent("agent/alias"))
+        self.assertEqual(len({oef_uri, uri.OEFURI.parseAgent("agent/alias")}), 1)
+        self.assertEqual(oef_uri.replace(agentAlias="other").agentAlias, "other")
+        self.assertIs(copy.deepcopy(oef_uri), oef_uri)
+        self.assertEqual(pickle.loads(pickle.dumps(oef_uri)), oef_uri)
+
+    def testIntern(self):
+        oef_uri = uri.agentURI("agent", "service")
+        self.assertIs(uri.agentURI("agent", "service"), oef_uri)
+        self.assertIs(uri.intern(uri.OEFURI.parseAgent("agent/service")), oef_uri)
+        self.assertIs(uri._interned.get(oef_uri.toString()), oef_uri)
+
+    def testDefaultContext(self):
+        first = Message(1, 1, "destination", b"hello").to_pb()
+        self.assertEqual(first.send_message.source_uri, "")
+        self.assertEqual(first.send_message.target_uri, "")
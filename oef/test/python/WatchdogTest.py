@@ -0,0 +1,82 @@
+import asyncio
+import time
+import unittest
+
+from oef.src.python.watchdog import LoopWatchdog, SLOW_HANDLER, STALL
+from oef.test.python.doubles import ReplayProxy, RecordingAgent, content_message
+
+
+class BlockingAgent(RecordingAgent):
+
+    def on_message(self, msg_id, dialogue_id, origin, content):
+        time.sleep(0.4)
+
+
+class WaitingAgent(RecordingAgent):
+
+    async def on_message(self, msg_id, dialogue_id, origin, content):
+        await asyncio.sleep(0.3)
+
+
+class WatchdogTest(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self):
+        self.loop.close()
+
+    def testSlowHandler(self):
+        content = content_message(1)
+        content.content.content = b"hello"
+        proxy = ReplayProxy([content], self.loop)
+        agent = BlockingAgent(proxy)
+        reports = []
+        watchdog = LoopWatchdog(threshold=0.1, interval=0.02, on_report=reports.append)
+
+        agent.run(watchdog)
+
+        self.assertFalse(watchdog.running)
+        self.assertIsNone(proxy._watchdog)
+        self.assertEqual([r.kind for r in reports], [STALL, SLOW_HANDLER])
+        for report in reports:
+            self.assertEqual((report.handler, report.case), ("on_message", "content.content"))
+            self.assertIn("in on_message", report.stack)
+        self.assertGreaterEqual(reports[1].duration, 0.4)
+        self.assertIn("on_message for content.content", str(reports[1]))
+
+    def testAsyncHandlerWaiting(self):
+        content = content_message(1)
+        content.content.content = b"hello"
+        proxy = ReplayProxy([content], self.loop)
+        agent = WaitingAgent(proxy)
+        reports = []
+        watchdog = LoopWatchdog(threshold=0.1, interval=0.02, on_report=reports.append)
+
+        agent.run(watchdog)
+
+        self.assertEqual(reports, [])
+
+    def testLoopLag(self):
+        reports = []
+        watchdog = LoopWatchdog(threshold=0.1, interval=0.02, on_report=reports.append)
+
+        async def block():
+            watchdog.start()
+            await asyncio.sleep(0.05)
+            time.sleep(0.3)
+            await asyncio.sleep(0.05)
+            watchdog.stop()
+
+        self.loop.run_until_complete(block())
+        self.assertEqual([(r.kind, r.handler) for r in reports], [(STALL, None)])
+        self.assertGreaterEqual(watchdog.max_lag, 0.25)
+        self.assertGreater(watchdog.ticks, 1)
+
+    def testInvalid(self):
+        with self.assertRaises(ValueError):
+            LoopWatchdog(threshold=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
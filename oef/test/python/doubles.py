@@ -0,0 +1,159 @@
+"""Test doubles shared by the tests: fake clocks, writers, proxies, agents and OEF Nodes."""
+
+import asyncio
+import struct
+
+from oef.src.python.agents import Agent
+from oef.src.python.proxy import OEFNetworkProxy
+from protocol.src.proto import agent_pb2
+
+
+class FakeClock:
+    """A clock that only moves when the test sets ``now``."""
+
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class FakeTransport:
+
+    def __init__(self):
+        self.buffered = 0
+        self.high = None
+
+    def set_write_buffer_limits(self, high=None, low=None):
+        self.high = high
+
+    def get_write_buffer_size(self):
+        return self.buffered
+
+
+class FakeWriter:
+    """A writer whose buffer is only emptied when drain() is awaited."""
+
+    def __init__(self):
+        self.transport = FakeTransport()
+        self.written = []
+
+    def write(self, data):
+        self.written.append(data)
+        self.transport.buffered += len(data)
+
+    async def drain(self):
+        await asyncio.sleep(0)
+        self.transport.buffered = 0
+
+
+class ReplayProxy(OEFNetworkProxy):
+    """A proxy that receives a fixed list of messages, then behaves as if the connection dropped."""
+
+    def __init__(self, messages, loop):
+        super().__init__("replay", "127.0.0.1", loop=loop)
+        self._frames = [m.SerializeToString() for m in messages]
+
+    async def _receive(self):
+        if not self._frames:
+            raise struct.error()
+        return self._frames.pop(0)
+
+
+class RecordingAgent(Agent):
+
+    def __init__(self, oef_proxy):
+        super().__init__(oef_proxy)
+        self.calls = []
+
+    def on_message(self, msg_id, dialogue_id, origin, content):
+        self.calls.append(("message", msg_id, dialogue_id, origin, content,
+                           self.getContext(msg_id, dialogue_id, origin).sourceURI.agentKey))
+
+    async def async_on_accept(self, msg_id, dialogue_id, origin, target):
+        self.calls.append(("async_accept", msg_id, target))
+
+    def on_oef_error(self, answer_id, operation):
+        self.calls.append(("oef_error", answer_id, operation, self.getErrorDetail(answer_id)["cause"]))
+
+
+def content_message(answer_id, dialogue_id=1, origin="peer"):
+    msg = agent_pb2.Server.AgentMessage()
+    msg.answer_id = answer_id
+    msg.content.dialogue_id = dialogue_id
+    msg.content.origin = origin
+    return msg
+
+
+class FakeNode:
+    """A minimal OEF Node on localhost: it accepts the handshake of every agent, except the refused ones."""
+
+    def __init__(self, refuse=()):
+        self.refuse = set(refuse)
+        self.writers = {}
+        self.received = []
+        self.handshakes = 0
+        self.server = None
+        self.port = None
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    @staticmethod
+    async def _read(reader):
+        size = struct.unpack("I", await reader.readexactly(4))[0]
+        return await reader.readexactly(size)
+
+    @staticmethod
+    def _write(writer, msg):
+        data = msg.SerializeToString()
+        writer.write(struct.pack("I", len(data)) + data)
+
+    async def _handle(self, reader, writer):
+        public_key = None
+        try:
+            agent_id = agent_pb2.Agent.Server.ID()
+            agent_id.ParseFromString(await self._read(reader))
+            public_key = agent_id.public_key
+            self.handshakes += 1
+            phrase = agent_pb2.Server.Phrase()
+            if public_key in self.refuse:
+                phrase.failure.SetInParent()
+                self._write(writer, phrase)
+                return
+            phrase.phrase = "phrase"
+            self._write(writer, phrase)
+            await self._read(reader)
+            connected = agent_pb2.Server.Connected()
+            connected.status = True
+            self._write(writer, connected)
+            self.writers[public_key] = writer
+            while True:
+                envelope = agent_pb2.Envelope()
+                envelope.ParseFromString(await self._read(reader))
+                self.received.append((public_key, envelope))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            if self.writers.get(public_key) is writer:
+                del self.writers[public_key]
+            writer.close()
+
+    def send(self, public_key, msg):
+        self._write(self.writers[public_key], msg)
+
+    def ping(self, public_key, answer_id):
+        msg = agent_pb2.Server.AgentMessage()
+        msg.answer_id = answer_id
+        msg.ping.dummy = 1
+        self.send(public_key, msg)
+
+    def disconnect(self, public_key):
+        self.writers.pop(public_key).close()
+
+    async def close(self):
+        self.server.close()
+        for writer in list(self.writers.values()):
+            writer.close()
+        await self.server.wait_closed()
@@ -2,6 +2,29 @@ import unittest
 
 from oef.test.python.QueryBuildingBlocksTest import LeafTest
 from oef.test.python.QueryVisTest import QueryVisTest
+from oef.test.python.PreparedQueryTest import PreparedQueryTest
+from oef.test.python.TypeHelpersTest import TypeHelpersTest
+from oef.test.python.StandingQueryTest import StandingQueryTest
+from oef.test.python.ParallelQueryTest import ParallelQueryTest
+from oef.test.python.ContextTest import ContextTest
+from oef.test.python.URITest import URITest
+from oef.test.python.DispatchTest import DispatchTest
+from oef.test.python.InboundQueueTest import InboundQueueTest
+from oef.test.python.FairInboundQueueTest import FairInboundQueueTest
+from oef.test.python.OutboundSchedulerTest import OutboundSchedulerTest
+from oef.test.python.RateLimitTest import RateLimitTest
+from oef.test.python.MetricsTest import MetricsTest
+from oef.test.python.DialogueTracingTest import DialogueTracingTest
+from oef.test.python.WatchdogTest import WatchdogTest
+from oef.test.python.LoggingTest import LoggingTest
+from oef.test.python.AgentFleetTest import AgentFleetTest
+from oef.test.python.MultiProcessRunnerTest import MultiProcessRunnerTest
+from oef.test.python.ThreadSafeAgentTest import ThreadSafeAgentTest
+from oef.test.python.ReconnectTest import ReconnectTest
+from oef.test.python.BulkConnectTest import BulkConnectTest
+from oef.test.python.SecureProxyTest import SecureProxyTest
+from oef.test.python.RemoteCoresTest import RemoteCoresTest
+from oef.test.python.FailoverTest import FailoverTest
 
 from utils.src.python.Logging import configure as configure_logging
 configure_logging()
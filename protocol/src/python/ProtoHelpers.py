@@ -36,19 +36,24 @@ def rangeOf(x):
     return("{}_range".format(x))
 
 
+PYTHON_TYPE_TO_STRING = {
+    int: TYPE_INT64,
+    float: TYPE_DOUBLE,
+    str: TYPE_STRING,
+    bool: TYPE_BOOL,
+    Location: TYPE_LOCATION,
+}
+
+
+def pythonTypeToTypeString(python_type):
+    return PYTHON_TYPE_TO_STRING.get(python_type)
+
+
 def pythonTypeToString(value):
-    if type(value) == int:
-        return TYPE_INT64
-    elif type(value) == float:
-        return TYPE_DOUBLE
-    elif type(value) == str:
-        return TYPE_STRING
-    elif type(value) == bool:
-        return TYPE_BOOL
-    elif type(value) == Location:
-        return TYPE_LOCATION
-    else:
+    type_string = PYTHON_TYPE_TO_STRING.get(type(value))
+    if type_string is None:
         print("pythonTypeToString, type not supported: ", type(value), ". value=", value)
+    return type_string
 
 
 def populateUpdateTFV(tfv, fieldname, data, typename=None):
@@ -74,21 +79,26 @@ def populateUpdateTFV(tfv, fieldname, data, typename=None):
     raise ValueError("TFV type bad")
 
 
+ATTRIBUTE_VALUE_INFO = {
+    0: (None, lambda x: None),
+    1: (None, lambda x: None),
+    2: (TYPE_STRING, lambda x: x.s),
+    3: (TYPE_INT64, lambda x: x.i),
+    4: (TYPE_FLOAT, lambda x: x.f),
+    5: (TYPE_DOUBLE, lambda x: x.d),
+    6: (TYPE_DATA_MODEL, lambda x: x.dm), # not impl yet
+    7: (TYPE_INT32, lambda x: x.i32),
+    8: (TYPE_BOOL, lambda x: x.b),
+    9: (TYPE_LOCATION, lambda x: x.l),
+    10: (TYPE_ADDRESS, lambda x: x.a),
+    11: (TYPE_KEYVALUE, lambda x: x.kv)
+}
+
+_UNKNOWN_INFO = (None, lambda x: None)
+
+
 def decodeAttributeValueToInfo(av):
-    return {
-        0: ( None, lambda x: None),
-        1: ( None, lambda x: None),
-        2: ( TYPE_STRING,lambda x: x.s),
-        3: ( TYPE_INT64,lambda x: x.i),
-        4: ( TYPE_FLOAT,lambda x: x.f),
-        5: ( TYPE_DOUBLE,lambda x: x.d),
-        6: ( TYPE_DATA_MODEL, lambda x: x.dm), # not impl yet
-        7: ( TYPE_INT32,lambda x: x.i32),
-        8: ( TYPE_BOOL,lambda x: x.b),
-        9: ( TYPE_LOCATION,lambda x: x.l),
-        10: (TYPE_ADDRESS, lambda x: x.a),
-        11: (TYPE_KEYVALUE, lambda x: x.kv)
-    }.get(av.type, ( None, lambda x: None))
+    return ATTRIBUTE_VALUE_INFO.get(av.type, _UNKNOWN_INFO)
 
 
 def decodeKeyValuesToKVTs(kv_list):
@@ -113,20 +123,23 @@ def decodeKeyValuesToKVTs(kv_list):
     return r
 
 
+PYTHON_TYPE_CONVERTERS = {
+    TYPE_STRING     : ("string",   lambda x: x),
+    TYPE_INT64      : ("int",      lambda x: x),
+    TYPE_FLOAT      : ("double",   lambda x: x),
+    TYPE_DOUBLE     : ("double",   lambda x: x),
+    #TYPE_DATA_MODEL : (None, lambda x: None), # not impl yet
+    TYPE_INT32      : ("int",      lambda x: x),
+    TYPE_BOOL       : ("bool",     lambda x: x),
+    TYPE_LOCATION   : ("location", lambda x: (x.lat, x.lon)),
+    TYPE_KEYVALUE   : ("key-type-value_list", lambda x: decodeKeyValuesToKVTs(x))
+}
+
+
 # Produce a value which can be fed into the operator factory system.
 def decodeAttributeValueInfoToPythonType(av):
     t, data = decodeAttributeValueToTypeValue(av)
-    type_string, converter_function = {
-        TYPE_STRING     : ("string",   lambda x: x),
-        TYPE_INT64      : ("int",      lambda x: x),
-        TYPE_FLOAT      : ("double",   lambda x: x),
-        TYPE_DOUBLE     : ("double",   lambda x: x),
-        #TYPE_DATA_MODEL : (None, lambda x: None), # not impl yet
-        TYPE_INT32      : ("int",      lambda x: x),
-        TYPE_BOOL       : ("bool",     lambda x: x),
-        TYPE_LOCATION   : ("location", lambda x: (x.lat, x.lon)),
-        TYPE_KEYVALUE   : ("key-type-value_list", lambda x: decodeKeyValuesToKVTs(x))
-    }.get(t, ( None, lambda x: None))
+    type_string, converter_function = PYTHON_TYPE_CONVERTERS.get(t, _UNKNOWN_INFO)
     return type_string, converter_function(data)
 
 
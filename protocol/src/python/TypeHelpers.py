@@ -3,129 +3,192 @@ from protocol.src.proto import dap_interface_pb2
 
 def _set_location(target, data):
     """
-    Updates location part of a ValueMessage protobuf.
+    Updates a ValueMessage.Location protobuf.
 
-    :param target: ValueMessage protobuf
+    :param target: ValueMessage.Location protobuf
     :param data: source data, format: data[0]=coordinate_system, data[1]=unit, data[2]=list of doubles
     :return:
     """
-    if type(target.l) == type(data):
-        target.l.CopyFrom(data)
+    if hasattr(data, "to_pb"):
+        data = data.to_pb()
+    if type(target) == type(data):
+        target.CopyFrom(data)
         return
-    target.l.coordinate_system = data[0]
-    target.l.unit = data[1]
-    target.l.v.append(data[2][0])
-    target.l.v.append(data[2][1])
+    target.coordinate_system = data[0]
+    target.unit = data[1]
+    target.v.append(data[2][0])
+    target.v.append(data[2][1])
 
 
 def _get_location(src):
     return src.coordinate_system, src.unit, src.v[:],
 
 
-def encodeConstraintValue(data, typecode, logger):
-    valueMessage = dap_interface_pb2.ValueMessage()
-    valueMessage.typecode = typecode
+def _scalar(field):
+    def encode(valueMessage, data):
+        setattr(valueMessage, field, data)
+    return encode
 
-    if typecode == 'string':
-        valueMessage.s = data
-    elif typecode == 'bool':
-        valueMessage.b = data
-    elif typecode == 'float':
-        valueMessage.f = data
-    elif typecode == 'double':
-        valueMessage.d = data
-    elif typecode == 'int32':
-        valueMessage.i32 = data
-    elif typecode == 'int' or typecode == 'int64':
-        valueMessage.typecode = 'int64'
-        valueMessage.i64 = data
-
-    elif typecode == 'location':
-        _set_location(valueMessage, data)
-
-    elif typecode == 'data_model':
-        valueMessage.dm.CopyFrom(data)
-
-    elif typecode == 'string_list':
-        valueMessage.v_s.extend(data)
-    elif typecode == 'float_list':
-        valueMessage.v_f.extend(data)
-    elif typecode == 'double_list':
-        valueMessage.v_d.extend(data)
-    elif typecode == 'i32_list':
-        valueMessage.v_i32.extend(data)
-    elif typecode == 'i64_list':
-        valueMessage.v_i64.extend(data)
-
-    elif typecode == 'location_list':
-        for d in data:
-            _set_location(valueMessage.v_l.add(), d)
 
-    elif typecode == 'string_pair':
-        valueMessage.d.append(data[0])
-        valueMessage.d.append(data[1])
+def _repeated(field):
+    def encode(valueMessage, data):
+        getattr(valueMessage, field).extend(data)
+    return encode
+
+
+def _pair(field):
+    def encode(valueMessage, data):
+        getattr(valueMessage, field).extend((data[0], data[1]))
+    return encode
+
 
-    elif typecode == 'string_pair_list':
+def _pair_list(field):
+    def encode(valueMessage, data):
+        target = getattr(valueMessage, field)
         for d in data:
-            valueMessage.d.append(d[0])
-            valueMessage.d.append(d[1])
-
-    elif typecode == 'string_range':
-        valueMessage.v_s.append(data[0])
-        valueMessage.v_s.append(data[1])
-    elif typecode == 'float_range':
-        valueMessage.v_f.append(data[0])
-        valueMessage.v_f.append(data[1])
-    elif typecode == 'double_range':
-        valueMessage.v_d.append(data[0])
-        valueMessage.v_d.append(data[1])
-    elif typecode == 'i32_range':
-        valueMessage.v_i32.append(data[0])
-        valueMessage.v_i32.append(data[1])
-    elif typecode == 'i64_range':
-        valueMessage.v_i64.append(data[0])
-        valueMessage.v_i64.append(data[1])
-
-    elif typecode == 'location_range':
-        _set_location(valueMessage.v_l.add(), data[0])
-        _set_location(valueMessage.v_l.add(), data[1])
-
-    else:
-        logger.error("encodeConstraintValue doesn't know how to write a '{}'".format(typecode))
+            target.extend((d[0], d[1]))
+    return encode
+
+
+def _encode_location(valueMessage, data):
+    _set_location(valueMessage.l, data)
+
+
+def _encode_location_list(valueMessage, data):
+    for d in data:
+        _set_location(valueMessage.v_l.add(), d)
+
+
+def _encode_location_range(valueMessage, data):
+    _set_location(valueMessage.v_l.add(), data[0])
+    _set_location(valueMessage.v_l.add(), data[1])
+
+
+def _encode_data_model(valueMessage, data):
+    valueMessage.dm.CopyFrom(data)
+
+
+# Older writers used these names; they are normalised to the names produced by ProtoHelpers.typeToSet/typeToRange.
+TYPECODE_ALIASES = {
+    'int':       'int64',
+    'i32_list':  'int32_list',
+    'i64_list':  'int64_list',
+    'i32_range': 'int32_range',
+    'i64_range': 'int64_range',
+}
+
+ENCODERS = {
+    'bool':             _scalar('b'),
+    'string':           _scalar('s'),
+    'float':            _scalar('f'),
+    'double':           _scalar('d'),
+    'int32':            _scalar('i32'),
+    'int64':            _scalar('i64'),
+
+    'bool_list':        _repeated('v_b'),
+    'string_list':      _repeated('v_s'),
+    'float_list':       _repeated('v_f'),
+    'double_list':      _repeated('v_d'),
+    'int32_list':       _repeated('v_i32'),
+    'int64_list':       _repeated('v_i64'),
+
+    'data_model':       _encode_data_model,
+    'embedding':        _repeated('v_d'),
+
+    'string_pair':      _pair('v_s'),
+    'string_pair_list': _pair_list('v_s'),
+
+    'string_range':     _pair('v_s'),
+    'float_range':      _pair('v_f'),
+    'double_range':     _pair('v_d'),
+    'int32_range':      _pair('v_i32'),
+    'int64_range':      _pair('v_i64'),
+
+    'location':         _encode_location,
+    'location_range':   _encode_location_range,
+    'location_list':    _encode_location_list,
+}
+
+DECODERS = {
+    'bool':             lambda x: x.b,
+    'string':           lambda x: x.s,
+    'float':            lambda x: x.f,
+    'double':           lambda x: x.d,
+    'int32':            lambda x: x.i32,
+    'int64':            lambda x: x.i64,
 
+    'bool_list':        lambda x: x.v_b,
+    'string_list':      lambda x: x.v_s,
+    'float_list':       lambda x: x.v_f,
+    'double_list':      lambda x: x.v_d,
+    'int32_list':       lambda x: x.v_i32,
+    'int64_list':       lambda x: x.v_i64,
+
+    'data_model':       lambda x: x.dm,
+    'embedding':        lambda x: x.v_d,
+
+    'string_pair':      lambda x: (x.v_s[0], x.v_s[1],),
+    'string_pair_list': lambda x: [(x.v_s[i], x.v_s[i+1],) for i in range(0, len(x.v_s), 2)],
+
+    'string_range':     lambda x: (x.v_s[0], x.v_s[1],),
+    'float_range':      lambda x: (x.v_f[0], x.v_f[1],),
+    'double_range':     lambda x: (x.v_d[0], x.v_d[1],),
+    'int32_range':      lambda x: (x.v_i32[0], x.v_i32[1],),
+    'int64_range':      lambda x: (x.v_i64[0], x.v_i64[1],),
+
+    'location':         lambda x: _get_location(x.l),
+    'location_range':   lambda x: (_get_location(x.v_l[0]), _get_location(x.v_l[1])),
+    'location_list':    lambda x: [_get_location(y) for y in x.v_l],
+}
+
+for _alias, _typecode in TYPECODE_ALIASES.items():
+    ENCODERS[_alias] = ENCODERS[_typecode]
+    DECODERS[_alias] = DECODERS[_typecode]
+
+
+def encodeConstraintValue(data, typecode, logger):
+    valueMessage = dap_interface_pb2.ValueMessage()
+    encodeConstraintValueInto(valueMessage, data, typecode, logger)
     return valueMessage
 
 
+def encodeConstraintValueInto(valueMessage, data, typecode, logger):
+    typecode = TYPECODE_ALIASES.get(typecode, typecode)
+    valueMessage.typecode = typecode
+    encoder = ENCODERS.get(typecode)
+    if encoder is None:
+        logger.error("encodeConstraintValue doesn't know how to write a '{}'".format(typecode))
+        return
+    encoder(valueMessage, data)
+
+
 def decodeConstraintValue(valueMessage):
-    return {
-        'bool':          lambda x: x.b,
-        'string':        lambda x: x.s,
-        'float':         lambda x: x.f,
-        'double':        lambda x: x.d,
-        'int32':         lambda x: x.i32,
-        'int64':         lambda x: x.i64,
-
-        'bool_list':     lambda x: x.b_s,
-        'string_list':   lambda x: x.v_s,
-        'float_list':    lambda x: x.v_f,
-        'double_list':   lambda x: x.v_d,
-        'int32_list':    lambda x: x.v_i32,
-        'int64_list':    lambda x: x.v_i64,
-
-        'data_model':    lambda x: x.dm,
-        'embedding':     lambda x: x.v_d,
-
-        'string_pair':      lambda x: (x.v_s[0], x.v_s[1],),
-        'string_pair_list': lambda x: [ ( x.v_d[i], x.v_d[i+1], ) for i in range(0, len(x.v_d), 2) ],
-
-        'string_range':  lambda x: (x.v_s[0], x.v_s[1],),
-        'float_range':   lambda x: (x.v_f[0], x.v_f[1],),
-        'double_range':  lambda x: (x.v_d[0], x.v_d[1],),
-        'int32_range':   lambda x: (x.v_i32[0], x.v_i32[1],),
-        'int64_range':   lambda x: (x.v_i64[0], x.v_i64[1],),
-
-        'location':       lambda x: _get_location(x.l),
-        'location_range': lambda x: (_get_location(x.v_l[0]), _get_location(x.v_l[1])),
-        'location_list':  lambda x: [_get_location(y) for y in x.v_l],
-
-    }[valueMessage.typecode](valueMessage)
+    return DECODERS[valueMessage.typecode](valueMessage)
+
+
+def encodeMany(values, logger, target=None):
+    """
+    Encode a list of values.
+
+    :param values: iterable of (data, typecode) pairs.
+    :param logger: logger used to report unknown typecodes.
+    :param target: optional repeated ValueMessage field; if given the values are added to it in place.
+    :return: the list of encoded ValueMessage protobufs
+    """
+    encoded = []
+    for data, typecode in values:
+        valueMessage = target.add() if target is not None else dap_interface_pb2.ValueMessage()
+        encodeConstraintValueInto(valueMessage, data, typecode, logger)
+        encoded.append(valueMessage)
+    return encoded
+
+
+def decodeMany(valueMessages):
+    """
+    Decode a list of ValueMessage protobufs.
+
+    :param valueMessages: iterable of ValueMessage protobufs (e.g. a repeated field).
+    :return: the list of decoded values
+    """
+    decoders = DECODERS
+    return [decoders[vm.typecode](vm) for vm in valueMessages]
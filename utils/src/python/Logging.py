@@ -1,14 +1,19 @@
+import atexit
 import logging
+import logging.handlers
 import functools
-import colorlog
-import functools
+import queue
 
 _HANDLERS = {}
+_LISTENERS = {}
+_LOGGERS = {}
 _MIN_LEVEL = logging.INFO
+_LOG_METHODS = ("debug", "info", "warning", "error", "critical", "exception")
 
 
 def configure(level=logging.ERROR, file="", file_level=logging.INFO):
     global _MIN_LEVEL, _HANDLERS
+    import colorlog  # only needed for the console output, so not imported with the module
     log_format = '%(asctime)s, %(levelname)s:  - %(name)s ] %(message)s'
     bold_seq = '\033[1m'  #f'{bold_seq} '
     colorlog_format = (
@@ -24,10 +29,17 @@ def configure(level=logging.ERROR, file="", file_level=logging.INFO):
         _HANDLERS["console"] = console_handler
 
     if len(file) > 0 and file not in _HANDLERS:
+        # the file is written by a listener thread, so that logging never waits for the disk
         file_handler = logging.FileHandler(file, mode='w')
         file_handler.setLevel(file_level)
         file_handler.setFormatter(log_formatter)
-        _HANDLERS[file] = file_handler
+        records = queue.SimpleQueue()
+        queue_handler = logging.handlers.QueueHandler(records)
+        queue_handler.setLevel(file_level)
+        listener = logging.handlers.QueueListener(records, file_handler, respect_handler_level=True)
+        listener.start()
+        _HANDLERS[file] = queue_handler
+        _LISTENERS[file] = listener
     else:
         console = _HANDLERS.get("console", None)
         if console:
@@ -37,74 +49,113 @@ def configure(level=logging.ERROR, file="", file_level=logging.INFO):
         _MIN_LEVEL = file_level
     else:
         _MIN_LEVEL = level
+    for lazy_logger in _LOGGERS.values():
+        lazy_logger.attach(_HANDLERS, _MIN_LEVEL)
     #colorlog.basicConfig(format=colorlog_format, level=level)
     #logging.basicConfig(format=log_format, level=level)
 
 
-class Logger:
-    def __init__(self, global_name, handlers, local_name=None, level=logging.INFO):
-        self._logger = None
-        self._global_name = global_name
-        self._local_name = local_name
-        self._handlers = handlers
-        self._level = level
-        self._set_logger()
-        self._target_obj = None
-
-    def _set_logger(self):
-        name = self._global_name
-        if self._local_name is not None:
-            name += ": {}".format(self._local_name)
-        self._logger = colorlog.getLogger(name)
-        self._logger.setLevel(self._level)
-        for key, handler in self._handlers.items():
+def shutdown():
+    """Write the pending records of the file sinks, stop their threads and remove them."""
+    for file, listener in _LISTENERS.items():
+        handler = _HANDLERS.pop(file)
+        for lazy_logger in _LOGGERS.values():
+            lazy_logger.removeHandler(handler)
+        listener.stop()
+        listener.handlers[0].close()
+    _LISTENERS.clear()
+
+
+atexit.register(shutdown)
+
+
+class LazyLogger:
+    """
+    A logger shared by all the objects of a class.
+    The messages are formatted only if their level is enabled, so disabled log calls cost a level check.
+    """
+
+    __slots__ = ("_logger",)
+
+    def __init__(self, name, handlers, level=logging.INFO):
+        self._logger = logging.getLogger(name)
+        self.attach(handlers, level)
+
+    def attach(self, handlers, level):
+        self._logger.setLevel(level)
+        for handler in handlers.values():
             self._logger.addHandler(handler)
 
     def __getattr__(self, item):
+        if item == "_logger":
+            raise AttributeError(item)
         return getattr(self._logger, item)
 
-    def update_local_name(self, local_name):
-        if local_name == self._local_name:
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        return get_logger, (self._logger.name,)
+
+    def _log(self, level, args, kwargs):
+        if not self._logger.isEnabledFor(level):
             return
-        self._local_name = local_name
-        self._set_logger()
-        if self._target_obj is not None:
-            self.expose_log_calls(self._target_obj)
-
-    def expose_log_calls(self, target):
-        def wrapper(func_name):
-            func = getattr(self._logger, func_name)
-
-            @functools.wraps(func)
-            def inner_wrapper(*args, **kwargs):
-                if len(args) > 1:
-                    if isinstance(args[0], str):
-                        if args[0].find("%") == -1:
-                            return func(("{} "*len(args)).format(*args), **kwargs)
-                    else:
-                        return func(("{} " * len(args)).format(*args), **kwargs)
-                return func(*args, **kwargs)
-            return inner_wrapper
-        for func_name in ["debug", "info", "warning", "error", "critical", "exception"]:
-            setattr(target, func_name,  wrapper(func_name))
-        self._target_obj = target
+        if len(args) > 1 and (not isinstance(args[0], str) or args[0].find("%") == -1):
+            args = (("{} " * len(args)).format(*args),)
+        self._logger.log(level, *args, **kwargs)
+
+    def debug(self, *args, **kwargs):
+        self._log(logging.DEBUG, args, kwargs)
+
+    def info(self, *args, **kwargs):
+        self._log(logging.INFO, args, kwargs)
+
+    def warning(self, *args, **kwargs):
+        self._log(logging.WARNING, args, kwargs)
+
+    def error(self, *args, **kwargs):
+        self._log(logging.ERROR, args, kwargs)
+
+    def critical(self, *args, **kwargs):
+        self._log(logging.CRITICAL, args, kwargs)
+
+    def exception(self, *args, **kwargs):
+        kwargs.setdefault("exc_info", True)
+        self._log(logging.ERROR, args, kwargs)
+
+
+def _expose_log_calls(target, lazy_logger):
+    target.log = lazy_logger
+    for func_name in _LOG_METHODS:
+        current = getattr(target, func_name, None)
+        if current is None or isinstance(getattr(current, "__self__", None), LazyLogger):
+            setattr(target, func_name, getattr(lazy_logger, func_name))
 
 
 def has_logger(func):
+    """
+    Give a ``log`` attribute, and the ``debug``, ``info``, ... methods, to the objects of a class.
+    The logger is created once per class and stored on the class, unless the object is created with an ``id``
+    keyword argument: then the object gets the logger of that id.
+    """
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
-        global _HANDLERS, _MIN_LEVEL
         self = args[0]
-        name = self.__class__.__name__
-        local_name = None
+        cls = self.__class__
         if "id" in kwargs:
-            local_name = kwargs["id"]
-        self.log = Logger(name, _HANDLERS, local_name, level=_MIN_LEVEL)
-        self.log.expose_log_calls(self)
+            _expose_log_calls(self, get_logger("{}: {}".format(cls.__name__, kwargs["id"])))
+        elif "log" not in cls.__dict__:
+            _expose_log_calls(cls, get_logger(cls.__name__))
         return func(*args, **kwargs)
     return wrapper
 
 
 def get_logger(name):
-    global _HANDLERS, _MIN_LEVEL
-    return Logger(name, _HANDLERS, level=_MIN_LEVEL)
+    """The shared :class:`LazyLogger` of a name."""
+    lazy_logger = _LOGGERS.get(name)
+    if lazy_logger is None:
+        lazy_logger = _LOGGERS[name] = LazyLogger(name, _HANDLERS, level=_MIN_LEVEL)
+    return lazy_logger
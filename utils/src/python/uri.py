@@ -18,101 +18,195 @@
 #
 # ------------------------------------------------------------------------------
 
-import copy
+import functools
+import logging
+import weakref
+
+logger = logging.getLogger(__name__)
+
+_FORMAT = "{}://{}/{}/{}/{}/{}"
+
+
+class _constructor(classmethod):
+    """
+    A classmethod that cannot be called on an instance. The parse methods of :class:`OEFURI` used to fill in
+    the instance they were called on: now that it is immutable, such a call would silently leave it empty.
+    """
+
+    def __get__(self, instance, owner=None):
+        if instance is not None:
+            name = self.__func__.__name__
+
+            def fail(*args, **kwargs):
+                raise TypeError("OEFURI is immutable: use OEFURI.{}(...), which returns a new OEFURI, instead of "
+                                "calling {}() on an instance.".format(name, name))
+            return fail
+        return super().__get__(instance, owner)
 
 
 class OEFURI:
+    """
+    Immutable URI of an agent (or of one of its services) on an OEF node.
+    The string form is computed once, and is also used for equality and hashing.
+    """
 
-    def __init__(self):
-        self.protocol = "tcp"
-        self.coreURI = ""
-        self.coreKey = ""
-        self.namespaces = []
-        self.agentKey = ""
-        self.agentAlias = ""
-        self.empty = True
+    __slots__ = ("protocol", "coreURI", "coreKey", "namespaces", "agentKey", "agentAlias", "empty",
+                 "_string", "_hash", "__weakref__")
+
+    def __init__(self, protocol: str = "tcp", coreURI: str = "", coreKey: str = "", namespaces=(),
+                 agentKey: str = "", agentAlias: str = "", empty: bool = True):
+        init = object.__setattr__
+        init(self, "protocol", protocol)
+        init(self, "coreURI", coreURI)
+        init(self, "coreKey", coreKey)
+        init(self, "namespaces", tuple(namespaces))
+        init(self, "agentKey", agentKey)
+        init(self, "agentAlias", agentAlias)
+        init(self, "empty", empty)
+        string = "" if empty else _FORMAT.format(protocol, coreURI, coreKey, "/".join(namespaces), agentKey, agentAlias)
+        init(self, "_string", string)
+        init(self, "_hash", hash(string))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("OEFURI is immutable, use replace() instead")
+
+    def __delattr__(self, name):
+        raise AttributeError("OEFURI is immutable")
+
+    def __eq__(self, other):
+        return isinstance(other, OEFURI) and self._string == other._string
+
+    def __hash__(self):
+        return self._hash
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        return OEFURI, (self.protocol, self.coreURI, self.coreKey, self.namespaces, self.agentKey, self.agentAlias,
+                        self.empty)
+
+    def __repr__(self):
+        return "OEFURI({!r})".format(self._string)
 
     def toString(self) -> str:
-        if self.empty:
-            return ""
-        return "{}://{}/{}/{}/{}/{}".format(self.protocol, self.coreURI, self.coreKey, "/".join(self.namespaces),
-                                            self.agentKey, self.agentAlias)
+        return self._string
 
     def __str__(self):
-        return self.toString()
-
-    def parse(self, uri: str):
+        return self._string
+
+    def replace(self, **fields) -> "OEFURI":
+        """Return a copy of this URI with some fields changed, e.g. ``uri.replace(agentAlias="service")``."""
+        values = {name: getattr(self, name) for name in OEFURI.__slots__[:7]}
+        values.update(fields)
+        return OEFURI(**values)
+
+    @_constructor
+    def parse(cls, uri: str) -> "OEFURI":
+        """
+        Parse a full URI: ``protocol://coreURI/coreKey/namespaces.../agentKey/agentAlias``.
+        An invalid URI gives an empty OEFURI.
+        It returns a new OEFURI: unlike before, ``uri.parse(string)`` on an instance raises a :class:`TypeError`
+        instead of filling it in.
+        """
         parts = uri.split("/")
-        size = len(parts)
-        if size < 7:
-            #print("OEFURI parse failed! Invalid URI: '", uri, "'")
-            return
-        self.empty = False
-        self.protocol = parts[0].replace(":", "")
-        self.coreURI = parts[2]
-        self.coreKey = parts[3]
-        self.agentAlias = parts[size-1]
-        self.agentKey = parts[size-2]
-        for i in range(4, size-2):
-            self.namespaces.append(parts[i])
-
-    def parseAgent(self, agent: str):
-        self.empty = False
-        if agent.find("/") == -1:
-            self.agentKey = agent
-            return
-        parts = agent.split("/")
-        if len(parts) != 2:
-            print("OEFURI::parseAgent got invalid arguments: {} ({})".format(agent, len(parts)))
-            self.empty = True
-            return
-        self.agentKey = parts[0]
-        self.agentAlias = parts[1]
+        if len(parts) < 7:
+            return cls()
+        return cls(parts[0].replace(":", ""), parts[2], parts[3], parts[4:-2], parts[-2], parts[-1], False)
+
+    @_constructor
+    def parseAgent(cls, agent: str) -> "OEFURI":
+        """Parse an ``agentKey`` or ``agentKey/agentAlias`` string. An invalid string gives an empty OEFURI."""
+        key, separator, alias = agent.partition("/")
+        if separator and "/" in alias:
+            logger.warning("OEFURI::parseAgent got invalid arguments: {}".format(agent))
+            return cls()
+        return cls(agentKey=key, agentAlias=alias, empty=False)
 
     class Builder:
         def __init__(self):
-            self._uri = OEFURI()
-            self._uri.empty = False
+            self._fields = {"namespaces": []}
 
         def protocol(self, protocol: str):
-            self._uri.protocol = protocol
+            self._fields["protocol"] = protocol
             return self
 
         def coreAddress(self, core_address: str, core_port: int):
-            self._uri.coreURI = "{}:{}".format(core_address, core_port)
+            self._fields["coreURI"] = "{}:{}".format(core_address, core_port)
             return self
 
         def coreKey(self, core_key: str):
-            self._uri.coreKey = core_key
+            self._fields["coreKey"] = core_key
             return self
 
         def agentKey(self, agent_key: str):
-            self._uri.agentKey = agent_key
+            self._fields["agentKey"] = agent_key
             return self
 
         def agentAlias(self, agent_alias: str):
-            self._uri.agentAlias = agent_alias
+            self._fields["agentAlias"] = agent_alias
             return self
 
         def addNamespace(self, nspace: str):
-            self._uri.namespaces.append(nspace)
+            self._fields["namespaces"].append(nspace)
             return self
 
-        def build(self):
-            print("Built URI: ", self._uri.toString())
-            return self._uri
+        def build(self) -> "OEFURI":
+            return OEFURI(empty=False, **self._fields)
+
+
+"""the empty URI"""
+EMPTY = OEFURI()
+
+_interned = weakref.WeakValueDictionary()
+
+
+def intern(oef_uri: OEFURI) -> OEFURI:
+    """
+    Return the canonical instance of a URI: equal URIs that are alive at the same time share one object.
+    The pool does not keep URIs alive on its own.
+    """
+    return _interned.setdefault(oef_uri.toString(), oef_uri)
+
+
+def agentURI(agent_key: str, agent_alias: str = "") -> OEFURI:
+    """The interned URI of an agent, or of one of its services if ``agent_alias`` is given."""
+    key = _FORMAT.format("tcp", "", "", "", agent_key, agent_alias)
+    oef_uri = _interned.get(key)
+    if oef_uri is None:
+        oef_uri = intern(OEFURI(agentKey=agent_key, agentAlias=agent_alias, empty=False))
+    return oef_uri
+
+
+@functools.lru_cache(maxsize=256)
+def parseCached(uri: str) -> OEFURI:
+    """Parse a URI, reusing the result for URIs seen recently (peers keep sending the same ones)."""
+    return intern(OEFURI.parse(uri))
 
 
 class Context:
     def __init__(self):
-        self.targetURI = OEFURI()
-        self.sourceURI = OEFURI()
+        self.targetURI = EMPTY
+        self.sourceURI = EMPTY
         self.serviceId = ""
         self.agentAlias = ""
 
+    @classmethod
+    def fromWire(cls, target: str, source: str):
+        """Build the context of a received message from its raw target and source URIs."""
+        context = cls()
+        context.targetURI = parseCached(target)
+        context.sourceURI = parseCached(source)
+        context.serviceId = context.targetURI.agentAlias
+        context.agentAlias = context.targetURI.agentAlias
+        return context
+
     def update(self, target: str, source: str):
-        self.targetURI.parse(target)
-        self.sourceURI.parse(source)
+        self.targetURI = OEFURI.parse(target)
+        self.sourceURI = OEFURI.parse(source)
         self.serviceId = self.targetURI.agentAlias
         self.agentAlias = self.targetURI.agentAlias
 
@@ -122,10 +216,10 @@ class Context:
         self.sourceURI = tmp
 
     def forAgent(self, target: str, source: str, same_alias: bool = False):
-        self.targetURI.parseAgent(target)
-        self.sourceURI.parseAgent(source)
+        self.targetURI = OEFURI.parseAgent(target)
+        self.sourceURI = OEFURI.parseAgent(source)
         if same_alias:
-            self.sourceURI.agentAlias = self.targetURI.agentAlias
+            self.sourceURI = self.sourceURI.replace(agentAlias=self.targetURI.agentAlias)
         self.serviceId = self.targetURI.agentAlias
 
     def print(self):